@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Post-Processing Benchmark
+=========================
+Generates synthetic dist/ trees from the pages in dist/ (1k, 10k and 100k
+pages by default) and times every registered transform on its own and the
+whole postprocess.py chain on each tree.
+
+Each size is built in four variants: pretty-printed or minified markup,
+with the patterns the fixers look for present (the raw Astro output) or
+absent (pages that have already been post-processed). For every transform
+and for the chain the results record pages/s, MB/s and the share of time
+spent inside regular expressions (measured with cProfile on a sample of
+pages). Each case runs in a fresh process so its peak RSS is its own.
+
+Results are written as JSON, with the commit they were measured at, so two
+runs can be compared with --compare. A 100k-page tree of the current pages
+takes about 4 GB of disk while it is being measured.
+"""
+
+import argparse
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+
+import postprocess
+from minify_html import BLOCK_ELEMENTS, TOKEN_RE, minify_html
+from parallel_pages import add_jobs_argument, resolve_jobs
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+LAYOUTS = ('pretty', 'minified')
+PATTERNS = ('present', 'absent')
+RESULTS_VERSION = 1
+# Pages per transform timed in memory; throughput is per page, so a sample suffices
+TRANSFORM_PAGES = 1000
+# Pages run under cProfile to measure the regex share
+PROFILE_PAGES = 100
+
+VOID_ELEMENTS = frozenset('area base br col embed hr img input link meta source track wbr'.split())
+# Profiler entries counted as regular-expression time
+REGEX_FUNCTIONS = ("of 're.Pattern' objects", "<built-in method _sre.")
+
+def pretty_print(content):
+    """Re-indent a page with one block-level tag per line."""
+    out = []
+    depth = 0
+    for match in TOKEN_RE.finditer(minify_html(content)):
+        token = match.group(0)
+        if match.lastgroup == 'text':
+            out.append(token)
+            continue
+        name = (match.group('rawtag') or match.group('name') or '').lower()
+        if name not in BLOCK_ELEMENTS:
+            out.append(token)
+            continue
+        closing = token.startswith('</')
+        if closing:
+            depth = max(depth - 1, 0)
+        out.append(f"\n{'  ' * depth}{token}")
+        if not closing and not match.group('raw') and name not in VOID_ELEMENTS and not token.endswith('/>'):
+            depth += 1
+    return ''.join(out).lstrip('\n') + '\n'
+
+def read_templates(dist_dir):
+    """Return {dist-relative path: content} for every page in dist_dir."""
+    dist_dir = Path(dist_dir)
+    return {path.relative_to(dist_dir).as_posix(): path.read_text(encoding='utf-8')
+            for path in sorted(dist_dir.rglob("*.html"))}
+
+def processed_templates(dist_dir):
+    """Return the templates after a full post-processing run (patterns absent)."""
+    with tempfile.TemporaryDirectory(prefix='pp-bench-') as tmp:
+        copy = Path(tmp) / "dist"
+        shutil.copytree(dist_dir, copy)
+        with redirect_stdout(io.StringIO()):
+            postprocess.run(copy)
+        return read_templates(copy)
+
+def synthetic_page(template_path, index):
+    """Return a unique dist-relative path for copy number `index` of a template."""
+    parts = list(PurePosixPath(template_path).parts)
+    if len(parts) >= 2:
+        parts[-2] = f"{parts[-2]}-{index}"
+    elif parts[0] == 'index.html':
+        parts = [f"home-{index}", 'index.html']
+    else:
+        stem, dot, ext = parts[0].rpartition('.')
+        parts = [f"{stem}-{index}.{ext}"]
+    return '/'.join(parts)
+
+def build_tree(root, source_dist, templates, count):
+    """Write a synthetic dist/ of `count` pages under root. Returns (dir, bytes)."""
+    tree = Path(root) / "dist"
+    shutil.copytree(source_dist, tree, ignore=shutil.ignore_patterns('*.html', '.*'))
+    names = sorted(templates)
+    total = 0
+    for i in range(count):
+        name = names[i % len(names)]
+        content = templates[name].replace('</title>', f" #{i}</title>", 1)
+        path = tree / synthetic_page(name, i)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = content.encode('utf-8')
+        path.write_bytes(data)
+        total += len(data)
+    return tree, total
+
+def regex_share(func):
+    """Run func() under cProfile; return (seconds, share spent in regexes)."""
+    profile = cProfile.Profile()
+    start = time.perf_counter()
+    profile.runcall(func)
+    elapsed = time.perf_counter() - start
+    stats = pstats.Stats(profile)
+    total = sum(row[2] for row in stats.stats.values())
+    regex = sum(row[2] for (_, _, name), row in stats.stats.items()
+                if any(marker in name for marker in REGEX_FUNCTIONS))
+    return elapsed, regex / total if total else 0.0
+
+def rate(count, size, seconds):
+    return {
+        'seconds': round(seconds, 4),
+        'pages_per_s': round(count / seconds, 1) if seconds else None,
+        'mb_per_s': round(size / 1e6 / seconds, 2) if seconds else None,
+    }
+
+def time_transforms(tree, transforms, max_pages, prepare_seconds):
+    """Time each transform on its own over up to max_pages pages of tree.
+    
+    prepare_seconds maps transform names to the time their prepare step
+    took on the whole tree; it is recorded alongside the per-page rates.
+    """
+    pages = sorted(tree.rglob("*.html"))[:max_pages]
+    results = {}
+    for transform in transforms:
+        applicable = [p for p in pages if postprocess.applies_to(transform, p.relative_to(tree).as_posix())]
+        size = 0
+        changed = 0
+        seconds = 0.0
+        for path in applicable:
+            content = path.read_text(encoding='utf-8')
+            page = path.relative_to(tree).as_posix()
+            size += len(content.encode('utf-8'))
+            start = time.perf_counter()
+            updated = transform.func(content, page, tree)
+            seconds += time.perf_counter() - start
+            changed += updated != content
+        
+        sample = [(p.relative_to(tree).as_posix(), p.read_text(encoding='utf-8'))
+                  for p in applicable[:PROFILE_PAGES]]
+        _, share = regex_share(lambda: [transform.func(content, page, tree) for page, content in sample])
+        results[transform.name] = dict(rate(len(applicable), size, seconds), pages=len(applicable),
+                                       changed=changed, prepare_seconds=prepare_seconds.get(transform.name),
+                                       regex_share=round(share, 3),
+                                       regex_seconds=round(seconds * share, 4))
+    return results
+
+def time_chain(tree, transforms, jobs, total_bytes):
+    """Run the whole chain over tree and profile it on a sample of pages."""
+    pages = sorted(tree.rglob("*.html"))
+    sample = [(p.relative_to(tree).as_posix(), p.read_text(encoding='utf-8')) for p in pages[:PROFILE_PAGES]]
+    
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        counts = postprocess.run(tree, transforms, jobs)
+        seconds = time.perf_counter() - start
+
+    def chain_sample():
+        for page, content in sample:
+            for transform in transforms:
+                if postprocess.applies_to(transform, page):
+                    content = transform.func(content, page, tree)
+    _, share = regex_share(chain_sample)
+    return dict(rate(len(pages), total_bytes, seconds), processed=counts['processed'],
+                errors=counts['error'], regex_share=round(share, 3), regex_seconds=round(seconds * share, 4))
+
+def peak_rss_mb(who):
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    usage = resource.getrusage(who).ru_maxrss
+    return round(usage / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run_case(source_dist, templates, count, layout, patterns, jobs, transform_pages, work_dir, keep):
+    """Build one synthetic tree and measure it. Runs in its own process."""
+    root = Path(tempfile.mkdtemp(prefix=f"pp-bench-{count}-{layout}-{patterns}-", dir=work_dir))
+    try:
+        start = time.perf_counter()
+        tree, total_bytes = build_tree(root, source_dist, templates, count)
+        generate_seconds = time.perf_counter() - start
+        
+        transforms = postprocess.get_transforms()
+        prepare_seconds = {}
+        with redirect_stdout(io.StringIO()):
+            for transform in transforms:
+                if transform.prepare is not None:
+                    start = time.perf_counter()
+                    transform.prepare(tree)
+                    prepare_seconds[transform.name] = round(time.perf_counter() - start, 4)
+        
+        result = {
+            'pages': count,
+            'layout': layout,
+            'patterns': patterns,
+            'bytes': total_bytes,
+            'generate_seconds': round(generate_seconds, 2),
+            'transforms': time_transforms(tree, transforms, transform_pages, prepare_seconds),
+            'chain': time_chain(tree, transforms, jobs, total_bytes),
+        }
+        result['peak_rss_mb'] = peak_rss_mb(resource.RUSAGE_SELF)
+        result['peak_worker_rss_mb'] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+        if keep:
+            result['tree'] = str(tree)
+        return result
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def case_key(case):
+    return (case['pages'], case['layout'], case['patterns'])
+
+def print_case(case):
+    chain = case['chain']
+    print(f"📏 {case['pages']:>6} pages, {case['layout']:<8} patterns {case['patterns']:<7} "
+          f"{case['bytes'] / 1e6:8.1f} MB | chain {chain['pages_per_s']:>8} pages/s "
+          f"{chain['mb_per_s']:>7} MB/s, regex {chain['regex_share']:.0%} | peak RSS {case['peak_rss_mb']} MB")
+    for name, stats in case['transforms'].items():
+        print(f"     {name:<20} {stats['pages_per_s'] or 0:>10} pages/s {stats['mb_per_s'] or 0:>8} MB/s "
+              f"regex {stats['regex_share']:.0%}, changed {stats['changed']}/{stats['pages']}"
+              + (f", prepare {stats['prepare_seconds']}s" if stats['prepare_seconds'] is not None else ''))
+
+def compare(old, new):
+    """Print the chain and per-transform throughput change between two result files."""
+    before = {case_key(case): case for case in old['cases']}
+    print(f"📊 {old.get('commit')} -> {new.get('commit')} (pages/s, + is faster)")
+    for case in new['cases']:
+        previous = before.get(case_key(case))
+        if previous is None:
+            continue
+        rows = [('chain', previous['chain'], case['chain'])]
+        rows += [(name, previous['transforms'][name], stats) for name, stats in case['transforms'].items()
+                 if name in previous['transforms']]
+        print(f"  {case['pages']} pages, {case['layout']}, patterns {case['patterns']}")
+        for name, a, b in rows:
+            if a['pages_per_s'] and b['pages_per_s']:
+                change = b['pages_per_s'] / a['pages_per_s'] - 1
+                flag = '⚠️ ' if change < -0.1 else '  '
+                print(f"    {flag}{name:<20} {a['pages_per_s']:>10} -> {b['pages_per_s']:>10} ({change:+.1%})")
+
+def main():
+    """Benchmark the transforms and the chain on synthetic sites."""
+    parser = argparse.ArgumentParser(description="Benchmark post-processing on synthetic large sites")
+    parser.add_argument('--dist', type=Path, default=postprocess.DIST_DIR,
+                        help="Built site whose pages are used as templates (default: dist/)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), metavar='N',
+                        help="Page counts to generate (default: 1000 10000 100000)")
+    parser.add_argument('--layouts', nargs='+', choices=LAYOUTS, default=list(LAYOUTS))
+    parser.add_argument('--patterns', nargs='+', choices=PATTERNS, default=list(PATTERNS))
+    parser.add_argument('--transform-pages', type=int, default=TRANSFORM_PAGES, metavar='N',
+                        help=f"Pages per transform timed on their own (default: {TRANSFORM_PAGES})")
+    parser.add_argument('--work-dir', type=Path, help="Where to build the trees (default: system temp dir)")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated trees")
+    parser.add_argument('--output', type=Path, help="Results file (default: benchmark-<commit>.json)")
+    parser.add_argument('--compare', type=Path, metavar='OLD_JSON',
+                        help="Compare the new results with an earlier results file")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("⏱  POST-PROCESSING BENCHMARK")
+    print("=" * 60)
+    raw = read_templates(args.dist)
+    base = {'present': raw}
+    if 'absent' in args.patterns:
+        base['absent'] = processed_templates(args.dist)
+    templates = {}
+    for patterns in args.patterns:
+        for layout in args.layouts:
+            convert = minify_html if layout == 'minified' else pretty_print
+            templates[layout, patterns] = {name: convert(content) for name, content in base[patterns].items()}
+    print(f"🧩 {len(raw)} template pages from {args.dist}, "
+          f"{len(args.sizes) * len(templates)} cases, {resolve_jobs(args.jobs)} worker(s) for the chain")
+    
+    commit = git_commit()
+    results = {
+        'version': RESULTS_VERSION,
+        'commit': commit,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'jobs': resolve_jobs(args.jobs),
+        'cases': [],
+    }
+    for count in args.sizes:
+        for (layout, patterns), case_templates in templates.items():
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                case = executor.submit(run_case, args.dist, case_templates, count, layout, patterns,
+                                       args.jobs, args.transform_pages, args.work_dir, args.keep).result()
+            print_case(case)
+            results['cases'].append(case)
+    
+    output = args.output or Path(f"benchmark-{commit or 'results'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+    print(f"💾 Results written to {output}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), results)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Search Index Builder
+====================
+Turns search-data.json and the text of every post into a tokenized inverted
+index under dist/search/, and ships a search script that looks query terms
+up in it instead of scanning every post on each keystroke.
+
+The index is sharded by the first character of each term: the browser only
+fetches the shard for what is being typed, and finds matching terms by
+binary search over its sorted term list, so neither the payload nor the
+per-keystroke work grows with the number of posts.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+from collections import Counter, defaultdict
+from html.parser import HTMLParser
+from pathlib import Path
+
+from page_stream import write_page
+
+INDEX_DIR = "search"
+INDEX_VERSION = 1
+SEARCH_DATA = "search-data.json"
+OLD_SEARCH_SCRIPT = '/_astro/Search.astro_astro_type_script_index_0_lang.CsPf_NSL.js'
+
+# Score per occurrence of a term in each field (occurrences are capped)
+FIELD_WEIGHTS = {'title': 10, 'tags': 8, 'description': 4, 'body': 1}
+MAX_OCCURRENCES = 3
+# Only the most frequent body terms of each post are indexed
+BODY_TERMS_PER_POST = 60
+
+STOPWORDS = frozenset('''
+    a about an and are as at be but by can do for from has have how i if in
+    into is it its just more not of on or our so than that the their them
+    then there these they this to was we what when which who will with you
+    your
+'''.split())
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric terms (mirrored by the client)."""
+    return TOKEN_RE.findall(text.lower())
+
+def shard_key(term):
+    """Return the shard a term lives in: its first character."""
+    return term[0]
+
+class _ArticleText(HTMLParser):
+    """Collect the text inside the element with class "article-content"."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.depth = 0
+        self.skip = 0
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.depth:
+            if tag not in ('br', 'img', 'hr', 'input', 'meta', 'link', 'source', 'wbr'):
+                self.depth += 1
+            if tag in ('script', 'style'):
+                self.skip += 1
+        elif 'article-content' in (dict(attrs).get('class') or '').split():
+            self.depth = 1
+
+    def handle_endtag(self, tag):
+        if self.depth:
+            self.depth -= 1
+            if tag in ('script', 'style') and self.skip:
+                self.skip -= 1
+
+    def handle_data(self, data):
+        if self.depth and not self.skip:
+            self.parts.append(data)
+
+def post_body(dist_dir, url):
+    """Return the article text of a post, or '' if its page is missing."""
+    page = Path(dist_dir) / url.strip('/') / "index.html"
+    try:
+        content = page.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return ''
+    parser = _ArticleText()
+    parser.feed(content)
+    parser.close()
+    return ' '.join(parser.parts)
+
+def score_post(post, body):
+    """Return {term: score} for one post, weighting each field."""
+    scores = Counter()
+    fields = {
+        'title': tokenize(post.get('title', '')),
+        'tags': [t for tag in post.get('tags', []) for t in tokenize(tag)],
+        'description': tokenize(post.get('description', '')),
+    }
+    body_terms = Counter(t for t in tokenize(body) if t not in STOPWORDS and len(t) > 1)
+    fields['body'] = [t for t, count in body_terms.most_common(BODY_TERMS_PER_POST)
+                      for _ in range(min(count, MAX_OCCURRENCES))]
+    for field, terms in fields.items():
+        for term, count in Counter(terms).items():
+            scores[term] += FIELD_WEIGHTS[field] * min(count, MAX_OCCURRENCES)
+    return scores
+
+def build_index(posts, bodies):
+    """Build the document table and per-shard term/postings lists.
+    
+    Returns (docs, shards) where docs is a list of
+    [title, description, url, date, tags] rows and shards maps a shard key
+    to {'terms': [...sorted], 'postings': [[doc, score, doc, score, ...], ...]}.
+    """
+    docs = []
+    postings = defaultdict(list)
+    for doc_id, (post, body) in enumerate(zip(posts, bodies)):
+        docs.append([post.get('title', ''), post.get('description', ''), post.get('url', ''),
+                     post.get('date', ''), post.get('tags', [])])
+        for term, score in score_post(post, body).items():
+            postings[term].extend((doc_id, score))
+    
+    shards = defaultdict(lambda: {'terms': [], 'postings': []})
+    for term in sorted(postings):
+        shard = shards[shard_key(term)]
+        shard['terms'].append(term)
+        shard['postings'].append(postings[term])
+    return docs, dict(shards)
+
+def write_json(path, data):
+    """Write compact JSON atomically."""
+    write_page(path, json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+
+SEARCH_CLIENT_JS = r'''(function(){
+const INDEX="/search/",MAX_TERMS=64,shards={};let docs=null,timer;
+function tokenize(s){return s.toLowerCase().match(/[a-z0-9]+/g)||[]}
+function load(url){return fetch(url).then(r=>r.ok?r.json():null).catch(()=>null)}
+function shard(key){return shards[key]||(shards[key]=load(`${INDEX}terms-${key}.json`))}
+function lowerBound(a,x){let lo=0,hi=a.length;while(lo<hi){const m=(lo+hi)>>1;a[m]<x?lo=m+1:hi=m}return lo}
+async function search(query){
+  const tokens=tokenize(query);
+  if(!tokens.length)return[];
+  if(!docs)docs=((await load(`${INDEX}docs.json`))||{}).docs||[];
+  let total=null;
+  for(const token of tokens){
+    const s=await shard(token[0]),scores=new Map();
+    if(s)for(let i=lowerBound(s.terms,token),n=0;i<s.terms.length&&n<MAX_TERMS&&s.terms[i].startsWith(token);i++,n++){
+      const p=s.postings[i],exact=s.terms[i]===token;
+      for(let j=0;j<p.length;j+=2){const v=exact?p[j+1]*2:p[j+1];if(v>(scores.get(p[j])||0))scores.set(p[j],v)}
+    }
+    if(total===null)total=scores;
+    else{for(const d of total.keys())scores.has(d)?total.set(d,total.get(d)+scores.get(d)):total.delete(d)}
+    if(!total.size)break;
+  }
+  return[...total].sort((a,b)=>b[1]-a[1]||(docs[b[0]][3]>docs[a[0]][3]?1:-1)).map(([d])=>{
+    const[title,description,url,date,tags]=docs[d];return{title,description,url,date,tags};
+  });
+}
+function escapeRegExp(s){return s.replace(/[.*+?^${}()|[\]\\]/g,"\\$&")}
+function highlight(text,query){
+  const tokens=tokenize(query);
+  return tokens.length?text.replace(new RegExp(`(${tokens.map(escapeRegExp).join("|")})`,"gi"),'<span class="highlight">$1</span>'):text;
+}
+function hide(){const r=document.getElementById("search-results");r&&(r.style.display="none")}
+function render(results,query){
+  const box=document.getElementById("search-results"),count=document.getElementById("results-count"),
+    term=document.getElementById("search-term"),list=document.getElementById("results-list"),none=document.getElementById("no-results");
+  if(!box)return;
+  box.style.display="block";
+  count.textContent=`${results.length} result${results.length!==1?"s":""}`;
+  term.textContent=`for "${query}"`;
+  if(!results.length){list.style.display="none";none.style.display="block";return}
+  list.style.display="block";none.style.display="none";
+  list.innerHTML=results.map(s=>`
+        <a href="${s.url}" class="result-item">
+          <div class="result-title">${highlight(s.title,query)}</div>
+          <div class="result-description">${highlight(s.description,query)}</div>
+          <div class="result-meta">
+            <span>${new Date(s.date).toLocaleDateString("en-US",{year:"numeric",month:"short",day:"numeric"})}</span>
+            ${s.tags.slice(0,2).map(t=>`<span class="result-tag">#${t}</span>`).join("")}
+          </div>
+        </a>
+      `).join("");
+}
+document.addEventListener("DOMContentLoaded",function(){
+  const input=document.getElementById("search-input"),clear=document.getElementById("clear-search");
+  if(!input)return;
+  input.addEventListener("input",function(e){
+    const query=e.target.value.trim();
+    if(!query){hide();clear.style.display="none";return}
+    clear.style.display="block";
+    clearTimeout(timer);
+    timer=setTimeout(async()=>{const results=await search(query);input.value.trim()===query&&render(results,query)},150);
+  });
+  clear.addEventListener("click",function(){input.value="";hide();clear.style.display="none";input.focus()});
+  document.addEventListener("click",function(e){e.target.closest(".search-container")||hide()});
+});
+})();
+'''
+
+def search_script_href():
+    """Return the content-hashed URL the search script is written to."""
+    digest = hashlib.sha256(SEARCH_CLIENT_JS.encode('utf-8')).hexdigest()[:8]
+    return f"/_astro/search.{digest}.js"
+
+def write_search_index(dist_dir):
+    """Build the index from dist/search-data.json and write it with the script.
+    
+    Returns (posts, terms, bytes written), or None if search-data.json is
+    missing.
+    """
+    dist_dir = Path(dist_dir)
+    try:
+        with open(dist_dir / SEARCH_DATA, 'r', encoding='utf-8') as f:
+            posts = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️  {SEARCH_DATA} not found - search index not built")
+        return None
+    
+    bodies = [post_body(dist_dir, post.get('url', '')) for post in posts]
+    docs, shards = build_index(posts, bodies)
+    
+    out_dir = dist_dir / INDEX_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for stale in out_dir.glob("terms-*.json"):
+        if stale.stem[len('terms-'):] not in shards:
+            stale.unlink()
+    write_json(out_dir / "docs.json", {'version': INDEX_VERSION, 'docs': docs})
+    for key, shard in shards.items():
+        write_json(out_dir / f"terms-{key}.json", shard)
+    
+    script = dist_dir / search_script_href().lstrip('/')
+    script.parent.mkdir(parents=True, exist_ok=True)
+    script.write_text(SEARCH_CLIENT_JS, encoding='utf-8')
+    
+    size = sum(p.stat().st_size for p in out_dir.glob("*.json"))
+    return len(docs), sum(len(s['terms']) for s in shards.values()), size
+
+def use_search_index(content):
+    """Point a page's search script tag at the index-backed script."""
+    if OLD_SEARCH_SCRIPT not in content:
+        return content
+    return content.replace(f'"{OLD_SEARCH_SCRIPT}"', f'"{search_script_href()}"')
+
+def main():
+    """Build the search index and switch pages to the index-backed script."""
+    parser = argparse.ArgumentParser(description="Build the inverted search index")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("🔎 BUILDING SEARCH INDEX")
+    print("=" * 60)
+    built = write_search_index(args.dist)
+    if built is None:
+        return 1
+    posts, terms, size = built
+    print(f"✅ Indexed {posts} posts, {terms} terms ({size / 1024:.1f} KB across all shards)")
+    print(f"📜 Search script: {search_script_href()}")
+    
+    updated = 0
+    for html_file in sorted(args.dist.rglob("*.html")):
+        content = html_file.read_text(encoding='utf-8')
+        updated_content = use_search_index(content)
+        if updated_content != content:
+            write_page(html_file, updated_content)
+            print(f"✅ Switched search script in: {html_file}")
+            updated += 1
+    
+    print("-" * 40)
+    print(f"✅ Updated {updated} pages")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
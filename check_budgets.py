@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Performance Budget Gate
+=======================
+Measures the critical-path weight of every page in dist/ and fails (exit
+status 1) when a page exceeds its budget from budgets.json:
+
+- html_bytes / html_transfer_bytes: the page itself, raw and compressed
+- inline_css_bytes: <style> blocks in the page
+- blocking_css_bytes: stylesheets that block rendering (compressed)
+- blocking_js_bytes: classic <script src> without async/defer (compressed)
+- blocking_requests: stylesheet and script requests that block rendering
+- hero_image_bytes: the LCP image, resolved from <link rel="preload"
+  as="image">, fetchpriority="high" or the article hero, taking the
+  largest candidate of the <picture> source a modern browser picks
+- third_party_origins: distinct non-site origins the page loads from
+- critical_path_bytes: HTML + blocking CSS/JS + hero image, as transferred
+
+Budgets are looked up per route: the "default" block, overridden by the
+first entry in "routes" whose pattern matches the page's URL path (fnmatch
+syntax, e.g. "/blog/*"). A budget of null disables that check, and an
+entry may carry a "comment" string explaining it.
+
+Compressed sizes use brotli when installed, gzip otherwise.
+"""
+
+import argparse
+import fnmatch
+import json
+import re
+from functools import lru_cache, partial
+from pathlib import Path, PurePosixPath
+from urllib.parse import urlsplit
+
+from compress_assets import brotli, compress_brotli, compress_gzip
+from fingerprint_assets import SITE_URL
+from html_tree import parse_html
+from parallel_pages import add_jobs_argument, run_pages
+
+BUDGETS_FILE = Path(__file__).parent / "budgets.json"
+COMPRESSIBLE = ('.html', '.css', '.js', '.json', '.svg', '.xml', '.webmanifest')
+METRICS = ('html_bytes', 'html_transfer_bytes', 'inline_css_bytes', 'blocking_css_bytes',
+           'blocking_js_bytes', 'blocking_requests', 'hero_image_bytes', 'third_party_origins',
+           'critical_path_bytes')
+
+# Elements whose URL attribute makes the browser fetch something
+FETCH_SELECTORS = [
+    ('script[src]', 'src'),
+    ('link[rel~=stylesheet][href]', 'href'),
+    ('link[rel=preload][href]', 'href'),
+    ('link[rel=modulepreload][href]', 'href'),
+    ('link[rel~=icon][href]', 'href'),
+    ('img[src]', 'src'),
+    ('iframe[src]', 'src'),
+    ('video[src]', 'src'),
+    ('source[src]', 'src'),
+]
+SRCSET_RE = re.compile(r'\s*([^\s,]+)(?:\s+(\d+)w)?[^,]*,?')
+
+def compressed_size(data):
+    return len(compress_brotli(data) if brotli is not None else compress_gzip(data))
+
+@lru_cache(maxsize=None)
+def transfer_size(path):
+    """Bytes sent for a file in dist/: compressed for text, raw otherwise; None if missing."""
+    path = Path(path)
+    try:
+        data = path.read_bytes()
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+    return compressed_size(data) if path.suffix.lower() in COMPRESSIBLE else len(data)
+
+def local_file(dist_dir, url, page):
+    """Map a same-origin URL to its file in dist_dir, or None for other origins."""
+    if url.startswith(SITE_URL):
+        url = url[len(SITE_URL):] or '/'
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or url.startswith('data:'):
+        return None
+    path = parts.path
+    if not path.startswith('/'):
+        path = (PurePosixPath('/' + page).parent / path).as_posix()
+    return Path(dist_dir) / path.lstrip('/')
+
+def origin(url):
+    parts = urlsplit(url)
+    if parts.netloc:
+        return f"{parts.scheme or 'https'}://{parts.netloc}".lower()
+    return None
+
+def largest_candidate(srcset):
+    """Return the URL of the widest candidate in a srcset."""
+    candidates = [(int(width or 0), url) for url, width in SRCSET_RE.findall(srcset or '')]
+    return max(candidates)[1] if candidates else None
+
+def hero_image_url(document):
+    """Return the URL of the page's LCP image, or None."""
+    preload = document.select_one('link[rel=preload][as=image]')
+    if preload is not None:
+        return largest_candidate(preload.attrs.get('imagesrcset')) or preload.attrs.get('href')
+    img = document.select_one('img[fetchpriority=high]') or document.select_one('.article-hero img')
+    if img is None:
+        return None
+    picture = img.parent if img.parent is not None and img.parent.tag == 'picture' else None
+    if picture is not None:
+        for source in picture.children:
+            if source.tag == 'source' and source.attrs.get('srcset'):
+                return largest_candidate(source.attrs['srcset'])
+    return largest_candidate(img.attrs.get('srcset')) or img.attrs.get('src')
+
+def is_blocking_stylesheet(link):
+    media = link.attrs.get('media', 'all').strip().lower()
+    return (not link.has_ancestor('noscript') and media in ('', 'all', 'screen')
+            and 'disabled' not in link.attrs)
+
+def is_blocking_script(script):
+    if script.has_ancestor('noscript') or 'async' in script.attrs or 'defer' in script.attrs:
+        return False
+    return script.attrs.get('type', 'text/javascript').lower() in ('', 'text/javascript', 'application/javascript')
+
+def measure_page(file_path, dist_dir):
+    """Return {metric: value} for one page."""
+    dist_dir = Path(dist_dir)
+    page = Path(file_path).relative_to(dist_dir).as_posix()
+    raw = Path(file_path).read_bytes()
+    document = parse_html(raw.decode('utf-8'))
+    
+    blocking_css = blocking_js = requests = 0
+    for link in document.select('link[rel~=stylesheet][href]'):
+        if is_blocking_stylesheet(link):
+            requests += 1
+            path = local_file(dist_dir, link.attrs['href'], page)
+            blocking_css += (transfer_size(path) or 0) if path else 0
+    for script in document.select('head script[src]'):
+        if is_blocking_script(script):
+            requests += 1
+            path = local_file(dist_dir, script.attrs['src'], page)
+            blocking_js += (transfer_size(path) or 0) if path else 0
+    
+    hero = hero_image_url(document)
+    hero_path = local_file(dist_dir, hero, page) if hero else None
+    hero_bytes = (transfer_size(hero_path) or 0) if hero_path else 0
+    
+    origins = set()
+    for selector, attr in FETCH_SELECTORS:
+        for element in document.select(selector):
+            found = origin(element.attrs[attr])
+            if found and found != SITE_URL:
+                origins.add(found)
+    
+    html_transfer = compressed_size(raw)
+    return {
+        'html_bytes': len(raw),
+        'html_transfer_bytes': html_transfer,
+        'inline_css_bytes': sum(len(document.inner_html(style).encode('utf-8'))
+                                for style in document.select('style')),
+        'blocking_css_bytes': blocking_css,
+        'blocking_js_bytes': blocking_js,
+        'blocking_requests': requests,
+        'hero_image': hero,
+        'hero_image_bytes': hero_bytes,
+        'third_party_origins': len(origins),
+        'origins': sorted(origins),
+        'critical_path_bytes': html_transfer + blocking_css + blocking_js + hero_bytes,
+    }
+
+def page_route(page):
+    """Return the URL path a dist-relative page is served at, e.g. /blog/my-post."""
+    path = PurePosixPath(page)
+    if path.name == 'index.html':
+        parent = path.parent.as_posix()
+        return '/' if parent == '.' else f"/{parent}"
+    return f"/{path.as_posix()}"
+
+def load_budgets(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def route_budget(budgets, route):
+    """Merge the default budget with the first route entry matching `route`."""
+    budget = dict(budgets.get('default', {}))
+    for entry in budgets.get('routes', []):
+        if fnmatch.fnmatchcase(route, entry['pattern']):
+            budget.update({k: v for k, v in entry.items() if k not in ('pattern', 'comment')})
+            break
+    return budget
+
+def over_budget(metrics, budget):
+    """Return [(metric, value, limit)] for every exceeded budget."""
+    return [(metric, metrics[metric], budget[metric]) for metric in METRICS
+            if budget.get(metric) is not None and metrics[metric] > budget[metric]]
+
+def format_value(metric, value):
+    if metric.endswith('_bytes'):
+        return f"{value / 1024:.1f} KB"
+    return str(value)
+
+def main():
+    """Check every page in dist/ against budgets.json."""
+    parser = argparse.ArgumentParser(description="Fail when pages exceed their performance budget")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    parser.add_argument('--budgets', type=Path, default=BUDGETS_FILE,
+                        help="Budget file (default: budgets.json)")
+    parser.add_argument('--json', type=Path, metavar='PATH',
+                        help="Also write every page's metrics and violations to PATH")
+    parser.add_argument('--verbose', '-v', action='store_true', help="Print the metrics of every page")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    budgets = load_budgets(args.budgets)
+    
+    print("📏 PERFORMANCE BUDGETS")
+    print("=" * 60)
+    html_files = sorted(args.dist.rglob("*.html"))
+    worker = partial(measure_page, dist_dir=args.dist)
+    
+    report = {}
+    failures = 0
+    for page in run_pages(worker, html_files, args.jobs):
+        name = page.path.relative_to(args.dist).as_posix()
+        metrics = page.result
+        if not metrics:
+            failures += 1
+            print(f"❌ Could not measure {name}")
+            continue
+        route = page_route(name)
+        violations = over_budget(metrics, route_budget(budgets, route))
+        report[name] = {'route': route, 'metrics': metrics,
+                        'violations': [{'metric': m, 'value': v, 'budget': b} for m, v, b in violations]}
+        if violations:
+            failures += 1
+            print(f"❌ {route} ({name})")
+            for metric, value, limit in violations:
+                print(f"     {metric:<22} {format_value(metric, value):>10} > {format_value(metric, limit)}")
+        elif args.verbose:
+            print(f"✅ {route}")
+        if args.verbose:
+            print("     " + ", ".join(f"{m}={format_value(m, metrics[m])}" for m in METRICS))
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    
+    print("-" * 40)
+    encoding = 'brotli' if brotli is not None else 'gzip'
+    if failures:
+        print(f"❌ {failures} of {len(html_files)} pages over budget (compressed sizes: {encoding})")
+        return 1
+    print(f"✅ All {len(html_files)} pages within budget (compressed sizes: {encoding})")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
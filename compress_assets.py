@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Precompressed Asset Generation
+==============================
+Writes maximum-level .gz and .br siblings next to every text asset in dist/
+so the self-hosted nginx mirror can serve them with gzip_static/brotli_static
+instead of compressing on every request.
+
+Siblings that no longer pay off (the source shrank below --min-size or
+stopped compressing) are deleted, as are orphaned ones whose source is
+gone, so nginx never serves an outdated copy.
+
+Brotli output needs the optional `brotli` package (pip install brotli);
+without it only .gz files are produced.
+"""
+
+import argparse
+import gzip
+import os
+from functools import partial
+from pathlib import Path
+
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TEXT_EXTENSIONS = ('.html', '.css', '.js', '.xml', '.json', '.webmanifest')
+FORMATS = ('gz', 'br')
+
+def compress_gzip(data):
+    # mtime=0 keeps the output byte-identical between runs
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def compress_brotli(data):
+    return brotli.compress(data, mode=brotli.MODE_TEXT, quality=11, lgwin=24)
+
+def is_fresh(source, target):
+    """Check whether a compressed sibling exists and is newer than its source."""
+    try:
+        return os.stat(target).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+def remove_sibling(target):
+    """Delete a compressed sibling if present; return whether one was removed."""
+    try:
+        os.remove(target)
+        return True
+    except FileNotFoundError:
+        return False
+
+def compress_file(file_path, formats=FORMATS, min_size=256):
+    """Write compressed siblings for one file.
+    
+    Returns a dict with the original size and, per format, the compressed
+    size, or None when the file is too small or compressing it would not
+    make it smaller; an existing sibling is then deleted. Formats whose
+    sibling was already up to date are listed under 'fresh', deleted
+    siblings under 'removed'. Outdated siblings in a format not being
+    written (.br without the brotli package) are deleted too.
+    """
+    result = {'bytes': os.path.getsize(file_path)}
+    data = None
+    for fmt in FORMATS:
+        target = f"{file_path}.{fmt}"
+        if fmt not in formats and not is_fresh(file_path, target) and remove_sibling(target):
+            result.setdefault('removed', []).append(fmt)
+    for fmt in formats:
+        target = f"{file_path}.{fmt}"
+        if result['bytes'] < min_size:
+            result[fmt] = None
+            if remove_sibling(target):
+                result.setdefault('removed', []).append(fmt)
+            continue
+        if is_fresh(file_path, target):
+            result[fmt] = os.path.getsize(target)
+            result.setdefault('fresh', []).append(fmt)
+            continue
+        if data is None:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        compressed = compress_gzip(data) if fmt == 'gz' else compress_brotli(data)
+        if len(compressed) >= len(data):
+            result[fmt] = None
+            if remove_sibling(target):
+                result.setdefault('removed', []).append(fmt)
+            continue
+        write_page(target, compressed)
+        result[fmt] = len(compressed)
+    return result
+
+def find_assets(dist_dir):
+    """Return every compressible text asset under dist_dir, sorted."""
+    return sorted(
+        path for path in Path(dist_dir).rglob("*")
+        if path.is_file() and path.suffix in TEXT_EXTENSIONS and not path.name.startswith('.')
+    )
+
+def remove_orphans(dist_dir):
+    """Delete .gz/.br siblings of text assets that no longer exist; return how many."""
+    removed = 0
+    for fmt in FORMATS:
+        for path in Path(dist_dir).rglob(f"*.{fmt}"):
+            source = path.with_suffix('')
+            if source.suffix in TEXT_EXTENSIONS and not source.name.startswith('.') and not source.exists():
+                path.unlink()
+                removed += 1
+    return removed
+
+def main():
+    """Precompress every text asset in dist/."""
+    parser = argparse.ArgumentParser(description="Write .gz and .br siblings for text assets")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    parser.add_argument('--min-size', type=int, default=256,
+                        help="Skip files smaller than this many bytes (default: 256)")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    formats = ('gz', 'br') if brotli is not None else ('gz',)
+    if brotli is None:
+        print("⚠️  brotli package not installed - writing .gz files only (pip install brotli)")
+    
+    assets = find_assets(args.dist)
+    print(f"🗜  Compressing {len(assets)} text assets ({', '.join(formats)})")
+    print("-" * 40)
+    
+    worker = partial(compress_file, formats=formats, min_size=args.min_size)
+    totals = {'bytes': 0, 'written': 0, 'fresh': 0, 'removed': remove_orphans(args.dist)}
+    for fmt in formats:
+        totals[fmt] = 0
+    for page in run_pages(worker, assets, args.jobs):
+        result = page.result
+        if not result:
+            continue
+        totals['bytes'] += result['bytes']
+        for fmt in formats:
+            # Count the original size for files without a useful sibling
+            totals[fmt] += result[fmt] if result[fmt] is not None else result['bytes']
+            if result[fmt] is not None and fmt not in result.get('fresh', ()):
+                totals['written'] += 1
+        totals['fresh'] += len(result.get('fresh', ()))
+        totals['removed'] += len(result.get('removed', ()))
+    
+    print(f"✅ Wrote {totals['written']} compressed files ({totals['fresh']} already up to date)")
+    if totals['removed']:
+        print(f"🧹 Removed {totals['removed']} stale or orphaned compressed files")
+    print(f"📦 Original size: {totals['bytes'] / 1024:.1f} KB")
+    for fmt in formats:
+        saved = totals['bytes'] - totals[fmt]
+        percent = saved / totals['bytes'] * 100 if totals['bytes'] else 0
+        print(f"   .{fmt}: {totals[fmt] / 1024:.1f} KB ({percent:.1f}% smaller)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Critical CSS Extraction
+=======================
+Inlines only the CSS rules that style the above-the-fold part of a page
+(site header, hero, page/article header) and loads the full stylesheets with
+the same non-blocking preload/onload pattern optimize_font_loading.py uses
+for Google Fonts.
+
+Candidate rules come from the page's /_astro/*.css stylesheets and, where a
+page carries it, the consolidated block from fix_css_references.get_inline_css().
+"""
+
+import argparse
+import re
+from functools import lru_cache, partial
+from pathlib import Path
+
+from css_rules import StyleRule, parse_css, serialize_css
+from fix_css_references import INLINE_BLOCK_PATTERN, get_post_css, post_stylesheet_href, write_post_stylesheet
+from html_tree import matches, parse_html, select, selector_pseudos, split_selector_list
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+
+CRITICAL_MARKER = 'data-critical-css'
+
+# Regions painted in the first viewport on every page type
+ABOVE_THE_FOLD = (
+    'body > header',
+    '.header',
+    '.hero',
+    '.topic-hero',
+    '.page-header',
+    '.article-header',
+    '.article-hero',
+)
+
+# State-dependent pseudo-classes that never apply on first paint
+DYNAMIC_PSEUDOS = {'hover', 'focus', 'active', 'visited', 'focus-visible', 'focus-within', 'target'}
+
+LINK_TAG_RE = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+NOSCRIPT_RE = re.compile(r'<noscript\b[^>]*>.*?</noscript>', re.IGNORECASE | re.DOTALL)
+ATTR_RE = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+
+def deferred_stylesheet(href):
+    """Return the non-blocking markup that loads one stylesheet."""
+    return (f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+def tag_attrs(tag):
+    """Parse the attributes of a single start tag into a dict."""
+    return {m.group(1).lower(): next(v for v in m.groups()[1:] if v is not None)
+            for m in ATTR_RE.finditer(tag)}
+
+def is_local_stylesheet(href):
+    return href.startswith('/') and not href.startswith('//') and href.split('?')[0].endswith('.css')
+
+@lru_cache(maxsize=None)
+def load_rules(dist_dir, href):
+    """Parse a local stylesheet (cached per process)."""
+    if href == post_stylesheet_href():
+        return tuple(parse_css(get_post_css()))
+    css_path = Path(dist_dir) / href.split('?')[0].lstrip('/')
+    try:
+        return tuple(parse_css(css_path.read_text(encoding='utf-8')))
+    except FileNotFoundError:
+        return ()
+
+def above_the_fold_elements(root):
+    """Collect above-the-fold regions plus their descendants and ancestors."""
+    elements = set()
+    for selector in ABOVE_THE_FOLD:
+        for region in select(root, selector):
+            elements.update(region.iter())
+            elements.update(region.ancestors())
+    return elements
+
+def is_critical(rule, elements):
+    """Check whether any selector of a rule styles one of the given elements."""
+    if not isinstance(rule, StyleRule):
+        return False
+    for selector in split_selector_list(rule.selector):
+        try:
+            if selector_pseudos(selector) & DYNAMIC_PSEUDOS:
+                continue
+            if any(matches(el, selector) for el in elements):
+                return True
+        except ValueError:
+            # Unparseable selectors are kept rather than risking a flash of unstyled content
+            return True
+    return False
+
+def find_stylesheets(content):
+    """Locate stylesheet references outside <noscript>.
+    
+    Returns (blocking, preloaded) where blocking is a list of
+    (start, end, href) spans for render-blocking local <link rel=stylesheet>
+    tags and the inline consolidated block, and preloaded maps hrefs of
+    existing preload-as-style links to their spans.
+    """
+    noscript = [m.span() for m in NOSCRIPT_RE.finditer(content)]
+
+    def hidden(pos):
+        return any(start <= pos < end for start, end in noscript)
+    
+    blocking = []
+    preloaded = {}
+    for match in LINK_TAG_RE.finditer(content):
+        if hidden(match.start()):
+            continue
+        attrs = tag_attrs(match.group(0))
+        href = attrs.get('href', '')
+        if not is_local_stylesheet(href):
+            continue
+        rel = attrs.get('rel', '').lower()
+        if rel == 'stylesheet' and attrs.get('media', 'all') in ('all', 'screen'):
+            blocking.append((match.start(), match.end(), href))
+        elif rel == 'preload' and attrs.get('as') == 'style':
+            preloaded[href] = (match.start(), match.end())
+    
+    for match in re.finditer(INLINE_BLOCK_PATTERN, content, re.DOTALL):
+        if not hidden(match.start()):
+            blocking.append((match.start(), match.end(), post_stylesheet_href()))
+    
+    blocking.sort()
+    return blocking, preloaded
+
+def extract_critical_css(content, dist_dir):
+    """Inline the above-the-fold rules and defer the page's full stylesheets.
+    
+    Returns the content unchanged if the page has already been processed or
+    has no render-blocking local stylesheet.
+    """
+    if CRITICAL_MARKER in content:
+        return content
+    
+    blocking, preloaded = find_stylesheets(content)
+    if not blocking:
+        return content
+    
+    hrefs = list(dict.fromkeys(href for _, _, href in blocking))
+    candidates = hrefs + [href for href in preloaded if href not in hrefs]
+    
+    elements = above_the_fold_elements(parse_html(content))
+    critical = [rule for href in candidates for rule in load_rules(str(dist_dir), href)
+                if is_critical(rule, elements)]
+    
+    replacement = f'<style {CRITICAL_MARKER}>{serialize_css(critical, minify=True)}</style>'
+    replacement += ''.join(deferred_stylesheet(href) for href in hrefs)
+    
+    # Drop the blocking tags and any existing preloads they would duplicate,
+    # putting the critical block where the first stylesheet was
+    spans = [(start, end) for start, end, _ in blocking]
+    spans += [preloaded[href] for href in hrefs if href in preloaded]
+    spans.sort()
+    first = spans[0][0]
+    for start, end in reversed(spans):
+        content = content[:start] + (replacement if start == first else '') + content[end:]
+    return content
+
+def extract_critical_css_file(file_path, dist_dir):
+    """Apply critical CSS extraction to a single HTML file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        updated_content = extract_critical_css(content, dist_dir)
+        if updated_content == content:
+            print(f"⏭  No blocking stylesheets in: {file_path}")
+            return False
+        
+        write_page(file_path, updated_content)
+        print(f"✅ Inlined critical CSS in: {file_path}")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error updating {file_path}: {e}")
+        return False
+
+def main():
+    """Inline critical CSS in every HTML file under dist/."""
+    parser = argparse.ArgumentParser(description="Inline critical CSS and defer full stylesheets")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    # Pages that carry the inline block will link the shared stylesheet instead
+    write_post_stylesheet(args.dist)
+    
+    html_files = sorted(args.dist.rglob("*.html"))
+    print(f"🔍 Found {len(html_files)} HTML files")
+    print("-" * 40)
+    
+    worker = partial(extract_critical_css_file, dist_dir=args.dist)
+    updated_count = sum(1 for page in run_pages(worker, html_files, args.jobs) if page.result)
+    
+    print("-" * 40)
+    print(f"✅ Inlined critical CSS in {updated_count} files")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Minimal CSS rule parser and serializer.
+
+Splits a stylesheet into style rules (selector list + declarations, with the
+@media/@supports blocks they sit in) and opaque at-rules such as @font-face
+and @keyframes, so rules can be filtered and written back out.
+"""
+
+import re
+from typing import NamedTuple
+
+# At-rules whose blocks contain further style rules
+CONDITIONAL_AT_RULES = ('@media', '@supports', '@layer', '@container')
+
+class StyleRule(NamedTuple):
+    """`selector { declarations }`, nested inside the `conditions` blocks."""
+    selector: str
+    declarations: str
+    conditions: tuple = ()
+
+class AtRule(NamedTuple):
+    """Any other at-rule (@font-face, @keyframes, @import, ...) kept verbatim."""
+    text: str
+    conditions: tuple = ()
+
+def strip_comments(css):
+    """Remove /* ... */ comments."""
+    return re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+
+def _find_block_end(css, open_pos):
+    """Return the index just past the '}' matching the '{' at open_pos."""
+    depth = 0
+    quote = None
+    i = open_pos
+    while i < len(css):
+        char = css[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return len(css)
+
+def _find_prelude_end(css, pos):
+    """Return the index of the first top-level '{' or ';' at or after pos."""
+    depth = 0
+    quote = None
+    for i in range(pos, len(css)):
+        char = css[i]
+        if quote:
+            if char == quote and css[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char in '{;' and depth == 0:
+            return i
+    return len(css)
+
+def _parse_block(css, conditions, rules):
+    pos = 0
+    length = len(css)
+    while pos < length:
+        while pos < length and css[pos] in ' \t\r\n;':
+            pos += 1
+        if pos >= length:
+            break
+        end = _find_prelude_end(css, pos)
+        prelude = css[pos:end].strip()
+        if end >= length or css[end] == ';':
+            if prelude:
+                rules.append(AtRule(prelude + ';', conditions))
+            pos = end + 1
+            continue
+        block_end = _find_block_end(css, end)
+        body = css[end + 1:block_end - 1]
+        if prelude.startswith('@'):
+            keyword = prelude.split(None, 1)[0].lower()
+            if keyword in CONDITIONAL_AT_RULES:
+                _parse_block(body, conditions + (prelude,), rules)
+            else:
+                rules.append(AtRule(css[pos:block_end].strip(), conditions))
+        elif prelude:
+            rules.append(StyleRule(prelude, body.strip(), conditions))
+        pos = block_end
+    return rules
+
+def parse_css(css):
+    """Parse a stylesheet into a flat list of StyleRule and AtRule items."""
+    return _parse_block(strip_comments(css), (), [])
+
+def _format_rule(rule, minify):
+    if isinstance(rule, AtRule):
+        return rule.text
+    if not minify:
+        return f"{rule.selector} {{\n    {rule.declarations}\n}}"
+    selector = re.sub(r'\s*,\s*', ',', ' '.join(rule.selector.split()))
+    declarations = ' '.join(rule.declarations.split())
+    declarations = re.sub(r'(^|;)\s*([-\w]+)\s*:\s*', r'\1\2:', declarations)
+    declarations = re.sub(r'\s*;\s*', ';', declarations).rstrip(';')
+    return f"{selector}{{{declarations}}}"
+
+def serialize_css(rules, minify=False):
+    """Write rules back out, regrouping consecutive rules under shared conditions."""
+    out = []
+    open_conditions = ()
+    for rule in rules:
+        conditions = rule.conditions
+        # Close blocks that no longer apply, then open new ones
+        common = 0
+        while (common < len(open_conditions) and common < len(conditions)
+               and open_conditions[common] == conditions[common]):
+            common += 1
+        for _ in open_conditions[common:]:
+            out.append('}')
+        for condition in conditions[common:]:
+            out.append(f"{condition}{{" if minify else f"{condition} {{")
+        open_conditions = conditions
+        out.append(_format_rule(rule, minify))
+    out.extend('}' for _ in open_conditions)
+    return ''.join(out) if minify else '\n'.join(out) + '\n'
+
+def minify_css(css, keep_comments=()):
+    """Strip comments and insignificant whitespace from a stylesheet.
+    
+    Works token by token rather than through parse_css(), so at-rules and
+    syntax the rule parser does not model come through intact. Spaces are
+    only dropped next to `{ } ; , >` and after `:`, which keeps calc()
+    operators and `and (` media queries valid. Comments containing one of
+    the keep_comments strings are kept.
+    """
+    out = []
+    space = False
+    i = 0
+    length = len(css)
+    while i < length:
+        char = css[i]
+        if char in '"\'':
+            j = i + 1
+            while j < length and css[j] != char:
+                j += 2 if css[j] == '\\' else 1
+            token = css[i:j + 1]
+            i = j + 1
+        elif css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            end = length if end == -1 else end + 2
+            comment = css[i:end]
+            i = end
+            if not any(keep in comment for keep in keep_comments):
+                continue
+            token = comment
+        elif char.isspace():
+            while i < length and css[i].isspace():
+                i += 1
+            space = True
+            continue
+        else:
+            token = char
+            i += 1
+        if space and out and out[-1][-1] not in '{};,>:' and token not in '{};,>)!':
+            out.append(' ')
+        space = False
+        if token == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(token)
+    return ''.join(out)
@@ -18,6 +18,16 @@ if (-not (Test-Path $DistDir)) {
     exit 1
 }
 
+# Refuse to publish pages that blow their performance budget (budgets.json)
+python check_budgets.py --dist $DistDir
+if ($LASTEXITCODE -ne 0) {
+    Write-Host "❌ Error: performance budget exceeded, not deploying." -ForegroundColor Red
+    exit 1
+}
+
+# What changed since the last recorded deploy (.deploy-manifest.json)
+python deploy_plan.py --dist $DistDir --jobs 0
+
 $FileCount = (Get-ChildItem -Path $DistDir -Recurse -File).Count
 $DirSize = [math]::Round((Get-ChildItem -Path $DistDir -Recurse | Measure-Object -Property Length -Sum).Sum / 1MB, 2)
 
@@ -31,14 +41,16 @@ switch ($Platform.ToLower()) {
         Write-Host ""
         Write-Host "🌐 NETLIFY DEPLOYMENT" -ForegroundColor Magenta
         Write-Host "===================="
-        Write-Host "Option 1 - Drag & Drop (Fastest):" -ForegroundColor Yellow
+        Write-Host "Option 1 - CLI (uploads only the files Netlify does not have yet):" -ForegroundColor Yellow
+        Write-Host "  npm install -g netlify-cli" -ForegroundColor Gray
+        Write-Host "  netlify deploy --prod --dir=dist" -ForegroundColor Gray
+        Write-Host "  python deploy_plan.py --record" -ForegroundColor Gray
+        Write-Host ""
+        Write-Host "Option 2 - Drag & Drop (re-sends the whole site):" -ForegroundColor Yellow
         Write-Host "  1. Open: https://netlify.com/drop" -ForegroundColor White
         Write-Host "  2. Drag the 'dist' folder to the browser" -ForegroundColor White
         Write-Host "  3. Set custom domain: blog.promptmakers.app" -ForegroundColor White
-        Write-Host ""
-        Write-Host "Option 2 - CLI:" -ForegroundColor Yellow
-        Write-Host "  npm install -g netlify-cli" -ForegroundColor Gray
-        Write-Host "  netlify deploy --prod --dir=dist" -ForegroundColor Gray
+        Write-Host "  4. python deploy_plan.py --record" -ForegroundColor White
         
         # Open Netlify in browser
         Write-Host ""
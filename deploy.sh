@@ -17,6 +17,17 @@ if [ ! -d "$DIST_DIR" ]; then
     exit 1
 fi
 
+# Refuse to publish pages that blow their performance budget (budgets.json)
+if ! python3 check_budgets.py --dist "$DIST_DIR"; then
+    echo "❌ Error: performance budget exceeded, not deploying."
+    exit 1
+fi
+echo ""
+
+# What changed since the last recorded deploy (.deploy-manifest.json)
+python3 deploy_plan.py --dist "$DIST_DIR" --jobs 0
+echo ""
+
 echo "📦 Deployment package ready:"
 echo "   Files: $(find $DIST_DIR -type f | wc -l)"
 echo "   Size: $(du -sh $DIST_DIR | cut -f1)"
@@ -26,14 +37,16 @@ case $PLATFORM in
         echo ""
         echo "🌐 NETLIFY DEPLOYMENT"
         echo "===================="
-        echo "Option 1 - Drag & Drop (Fastest):"
+        echo "Option 1 - CLI (uploads only the files Netlify does not have yet):"
+        echo "  npm install -g netlify-cli"
+        echo "  netlify deploy --prod --dir=dist"
+        echo "  python3 deploy_plan.py --record"
+        echo ""
+        echo "Option 2 - Drag & Drop (re-sends the whole site):"
         echo "  1. Open: https://netlify.com/drop"
         echo "  2. Drag the 'dist' folder to the browser"
         echo "  3. Set custom domain: blog.promptmakers.app"
-        echo ""
-        echo "Option 2 - CLI:"
-        echo "  npm install -g netlify-cli"
-        echo "  netlify deploy --prod --dir=dist"
+        echo "  4. python3 deploy_plan.py --record"
         ;;
     
     "vercel")
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Deploy Delta Planning
+=====================
+Netlify's file-digest deploy API takes the whole site as a {"/path": sha1}
+map and answers with the digests it does not hold yet, so only those files
+need uploading. This stage computes that map for dist/, hashing files in
+parallel, and compares it with the map recorded at the previous deploy. It
+reports which files were added, changed and removed, so a deploy costs what
+changed rather than what the site weighs.
+
+Files Netlify never receives are left out: dotfiles and dot-directories (the
+engine's manifests and caches), leftover *.tmp files and the .gz/.br
+siblings compress_assets.py writes for the nginx mirror.
+
+LocalUploader stands in for the API with a plain directory. It asks for and
+copies only the content it does not already hold, so the whole flow runs
+without a network or a Netlify token:
+
+    python deploy_plan.py                      # show the delta
+    python deploy_plan.py --json plan.json     # write it for the API
+    python deploy_plan.py --upload ../mirror   # deploy to a local mirror
+    python deploy_plan.py --record             # after deploying some other way
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import NamedTuple
+
+from page_manifest import load_json_cache, save_json_cache
+from page_stream import CHUNK_SIZE
+from parallel_pages import add_jobs_argument, run_pages
+
+DEPLOY_MANIFEST = Path(__file__).parent / ".deploy-manifest.json"
+MANIFEST_VERSION = 1
+SKIP_SUFFIXES = ('.tmp', '.gz', '.br')
+
+class DeployPlan(NamedTuple):
+    """A deploy as {"/path": sha1} maps.
+    
+    files is every file to deploy, the body of the API request; removed
+    maps each path gone since the previous deploy to the digest it had.
+    """
+    files: dict
+    added: dict
+    changed: dict
+    removed: dict
+
+    @property
+    def upload(self):
+        return {**self.added, **self.changed}
+
+def is_deployed(relative):
+    """Check whether a dist-relative path is part of the deploy."""
+    relative = PurePosixPath(relative)
+    return not any(part.startswith('.') for part in relative.parts) and relative.suffix not in SKIP_SUFFIXES
+
+def file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(partial(f.read, CHUNK_SIZE), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def file_digests(dist_dir, jobs=1):
+    """Return {"/path": sha1} for every deployed file under dist_dir, sorted by path.
+    
+    Raises OSError if a file could not be read, rather than leaving it out
+    of the map and having the deploy delete it.
+    """
+    dist_dir = Path(dist_dir)
+    paths = sorted(p for p in dist_dir.rglob('*') if p.is_file() and is_deployed(p.relative_to(dist_dir).as_posix()))
+    digests = {}
+    for page in run_pages(file_sha1, paths, jobs):
+        if not page.result:
+            raise OSError(f"Could not hash {page.path}")
+        digests[f"/{page.path.relative_to(dist_dir).as_posix()}"] = page.result
+    return digests
+
+def load_deploy_manifest(path):
+    """Load the {"/path": sha1} map of the previous deploy, or {} if missing or stale."""
+    return load_json_cache(path, MANIFEST_VERSION, 'files')
+
+def save_deploy_manifest(path, files):
+    save_json_cache(path, MANIFEST_VERSION, 'files', files)
+
+def plan_deploy(files, previous):
+    """Compare the current digests with the previous deploy's."""
+    return DeployPlan(
+        files,
+        {path: digest for path, digest in files.items() if path not in previous},
+        {path: digest for path, digest in files.items() if path in previous and previous[path] != digest},
+        {path: digest for path, digest in previous.items() if path not in files},
+    )
+
+def total_size(dist_dir, paths):
+    return sum(os.path.getsize(Path(dist_dir) / path.lstrip('/')) for path in paths)
+
+class LocalUploader:
+    """A local directory standing in for Netlify's file-digest deploy API.
+    
+    The directory holds the deployed files plus STATE_NAME, the digest map
+    of its current deploy (what Netlify knows about the site).
+    """
+    STATE_NAME = ".deploy-state.json"
+
+    def __init__(self, target_dir):
+        self.target_dir = Path(target_dir)
+        self.deployed = load_deploy_manifest(self.target_dir / self.STATE_NAME)
+
+    def required(self, files):
+        """Return the digests whose content the site does not hold yet, like the API's `required` list."""
+        held = set(self.deployed.values())
+        return sorted({digest for digest in files.values() if digest not in held})
+
+    def deploy(self, files, dist_dir):
+        """Make the directory match files, uploading only required content.
+        
+        Content the site already holds under another path is copied there
+        instead of uploaded. New files are staged first and then moved into
+        place, so no file is overwritten while another still needs to be
+        copied from it. Returns (uploaded files, uploaded bytes, copied
+        files, deleted files).
+        """
+        dist_dir = Path(dist_dir)
+        required = set(self.required(files))
+        held = {digest: path for path, digest in self.deployed.items()}
+        staging = self.target_dir / f".staging-{os.getpid()}"
+        uploaded = uploaded_bytes = copied = 0
+        staged = []
+        try:
+            for path, digest in files.items():
+                if self.deployed.get(path) == digest:
+                    continue
+                if digest in required:
+                    source = dist_dir / path.lstrip('/')
+                    required.discard(digest)
+                    uploaded += 1
+                    uploaded_bytes += source.stat().st_size
+                else:
+                    source = self.target_dir / held[digest].lstrip('/')
+                    copied += 1
+                staged_path = staging / path.lstrip('/')
+                staged_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(source, staged_path)
+                # Later files with the same content copy from the staged one
+                held[digest] = str(staged_path.relative_to(self.target_dir))
+                staged.append(path)
+            
+            for path in staged:
+                target = self.target_dir / path.lstrip('/')
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staging / path.lstrip('/'), target)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        
+        deleted = 0
+        for path in self.deployed.keys() - files.keys():
+            try:
+                os.remove(self.target_dir / path.lstrip('/'))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        
+        save_deploy_manifest(self.target_dir / self.STATE_NAME, files)
+        self.deployed = dict(files)
+        return uploaded, uploaded_bytes, copied, deleted
+
+def print_plan(plan, dist_dir, verbose=False):
+    site_bytes = total_size(dist_dir, plan.files)
+    upload_bytes = total_size(dist_dir, plan.upload)
+    print(f"📁 Files: {len(plan.files)} ({site_bytes / 1024:.1f} KB)")
+    for label, paths in (("➕ Added", plan.added), ("✏️  Changed", plan.changed), ("➖ Removed", plan.removed)):
+        print(f"{label}: {len(paths)}")
+        if verbose:
+            for path in paths:
+                print(f"     {path}")
+    share = upload_bytes / site_bytes * 100 if site_bytes else 0
+    print(f"📤 To upload: {len(plan.upload)} files, {upload_bytes / 1024:.1f} KB ({share:.1f}% of the site)")
+
+def plan_json(plan, dist_dir):
+    return {
+        'files': plan.files,
+        'added': plan.added,
+        'changed': plan.changed,
+        'removed': plan.removed,
+        'upload_bytes': total_size(dist_dir, plan.upload),
+    }
+
+def main():
+    """Work out what changed in dist/ since the last deploy and optionally deploy it locally."""
+    parser = argparse.ArgumentParser(description="Plan a file-digest deploy of dist/")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    parser.add_argument('--manifest', type=Path, default=DEPLOY_MANIFEST,
+                        help="Digest map of the previous deploy (default: .deploy-manifest.json)")
+    parser.add_argument('--json', type=Path, metavar='PATH',
+                        help="Write the files/added/changed/removed maps as JSON")
+    parser.add_argument('--upload', type=Path, metavar='DIR',
+                        help="Deploy to a local directory standing in for Netlify, then record the deploy")
+    parser.add_argument('--record', action='store_true',
+                        help="Record the current digests as deployed (after deploying another way)")
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help="List every added, changed and removed path")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("🚚 DEPLOY PLAN")
+    print("=" * 60)
+    try:
+        files = file_digests(args.dist, args.jobs)
+    except OSError as e:
+        print(f"❌ {e}")
+        return 1
+    previous = load_deploy_manifest(args.manifest)
+    if not previous:
+        print(f"ℹ️  No previous deploy recorded in {args.manifest}: every file counts as added")
+    plan = plan_deploy(files, previous)
+    print_plan(plan, args.dist, args.verbose)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(plan_json(plan, args.dist), f, indent=2)
+            f.write('\n')
+        print(f"🧾 Plan written to {args.json}")
+    
+    if args.upload:
+        args.upload.mkdir(parents=True, exist_ok=True)
+        uploaded, uploaded_bytes, copied, deleted = LocalUploader(args.upload).deploy(files, args.dist)
+        print(f"📤 Deployed to {args.upload}: uploaded {uploaded} files ({uploaded_bytes / 1024:.1f} KB), "
+              f"copied {copied} already held, deleted {deleted}")
+    if args.upload or args.record:
+        save_deploy_manifest(args.manifest, files)
+        print(f"📝 Recorded {len(files)} file digests in {args.manifest}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Per-Page Link Headers for Early Hints
+=====================================
+Works out each page's critical resources from its final markup and sends
+them as a `Link` response header in dist/_headers, which Netlify can also
+answer with a 103 Early Hints response. The browser then starts those
+fetches before the HTML arrives, instead of after parsing the <head>:
+
+- render-blocking same-origin stylesheets (rel=preload; as=style)
+- the self-hosted body font, when the page uses the self-hosted fonts
+- the hero image: the <img fetchpriority="high">, preloaded from the first
+  <source> of its <picture> like image_hints.py does
+- the origins the page preconnects to
+
+`<link rel="preload">` tags that the header now carries are removed from
+the page. A preloaded image without a fetchpriority="high" <img> gets that
+attribute on the <img> it preloads (and loses loading="lazy"), so the hint
+can be derived again from the page on every run. Preloads that use the
+onload stylesheet swap, or that match nothing on the page, stay.
+"""
+
+import argparse
+import re
+from functools import partial
+from pathlib import Path
+
+from fingerprint_assets import SITE_URL
+from html_tree import parse_html, set_attribute
+from netlify_headers import write_headers_section
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+from resolve_links import page_path
+from self_host_fonts import BODY_WEIGHT, SELF_HOSTED_MARKER, load_fonts
+
+HEADERS_SECTION = "early_hints.py"
+LAZY_RE = re.compile(r'\s+loading\s*=\s*["\']?lazy["\']?', re.IGNORECASE)
+
+def local_url(url):
+    """Return a same-origin URL as a root-relative path, or None."""
+    if url and url.startswith(SITE_URL):
+        url = url[len(SITE_URL):] or '/'
+    if not url or not url.startswith('/') or url.startswith('//'):
+        return None
+    return url
+
+def srcset_urls(srcset):
+    return [candidate.split()[0] for candidate in (srcset or '').split(',') if candidate.strip()]
+
+def hero_image(document):
+    """Return (img, attrs of the <source> or <img> to preload) for the hero, or (None, None)."""
+    img = document.select_one('img[fetchpriority=high]')
+    if img is None:
+        return None, None
+    if img.parent is not None and img.parent.tag == 'picture':
+        for source in img.parent.children:
+            if source.tag == 'source' and source.attrs.get('srcset'):
+                return img, {'src': img.attrs.get('src'), **source.attrs}
+    return img, img.attrs
+
+def hint_key(kind, url):
+    return kind, (url or '').split('#')[0]
+
+def image_hint(attrs):
+    """Return (key, Link value) preloading an image from <img>/<source> attrs."""
+    urls = srcset_urls(attrs.get('srcset'))
+    if len(urls) == 1 and not attrs.get('sizes'):
+        # A single candidate is just a URL
+        href, srcset = urls[0], None
+    else:
+        href, srcset = attrs.get('src') or (urls[0] if urls else None), attrs.get('srcset')
+    href = local_url(href)
+    if href is None:
+        return None
+    value = f"<{href}>; rel=preload; as=image"
+    if srcset:
+        value += f'; imagesrcset="{srcset}"'
+        if attrs.get('sizes'):
+            value += f'; imagesizes="{attrs["sizes"]}"'
+    if attrs.get('type'):
+        value += f'; type="{attrs["type"]}"'
+    return hint_key('image', urls[0] if srcset and urls else href), value + '; fetchpriority=high'
+
+def page_hints(document, fonts):
+    """Return {key: Link header value} for a page's critical resources, in fetch order."""
+    hints = {}
+    for link in document.select('head link[rel~=stylesheet][href]'):
+        href = local_url(link.attrs['href'])
+        media = link.attrs.get('media', 'all').strip().lower()
+        if href and media in ('', 'all', 'screen') and not link.has_ancestor('noscript'):
+            hints[hint_key('style', href)] = f"<{href}>; rel=preload; as=style"
+    body_font = fonts.get(str(BODY_WEIGHT))
+    if body_font and document.select_one(f'style[{SELF_HOSTED_MARKER}]') is not None:
+        hints[hint_key('font', body_font)] = f'<{body_font}>; rel=preload; as=font; type="font/woff2"; crossorigin'
+    _, hero = hero_image(document)
+    hint = image_hint(hero) if hero else None
+    if hint:
+        hints[hint[0]] = hint[1]
+    for link in document.select('head link[rel=preconnect][href]'):
+        origin = link.attrs['href'].rstrip('/')
+        if origin.startswith('https://') and origin != SITE_URL:
+            crossorigin = '; crossorigin' if 'crossorigin' in link.attrs else ''
+            hints.setdefault(hint_key('preconnect', origin + crossorigin), f"<{origin}>; rel=preconnect{crossorigin}")
+    return hints
+
+def preload_key(link):
+    """Return the hint key a <link rel=preload> would be covered by."""
+    kind = link.attrs.get('as', '')
+    urls = srcset_urls(link.attrs.get('imagesrcset'))
+    return hint_key(kind, urls[0] if urls else local_url(link.attrs.get('href')))
+
+def preloaded_img(document, link):
+    """Find the <img> a preload as=image fetches, directly or through its <picture>."""
+    urls = set(srcset_urls(link.attrs.get('imagesrcset'))) | {link.attrs.get('href')}
+    for img in document.select('img'):
+        candidates = {img.attrs.get('src')} | set(srcset_urls(img.attrs.get('srcset')))
+        if img.parent is not None and img.parent.tag == 'picture':
+            for source in img.parent.children:
+                if source.tag == 'source':
+                    candidates |= set(srcset_urls(source.attrs.get('srcset')))
+        if urls & candidates - {None}:
+            return img
+    return None
+
+def remove_duplicate_preloads(content, fonts):
+    """Drop the page's <link rel=preload> tags that its Link header carries."""
+    document = parse_html(content)
+    preloads = [link for link in document.select('head link[rel=preload][href], head link[rel=preload][imagesrcset]')
+                if 'onload' not in link.attrs]
+    if not preloads:
+        return content
+    
+    splices = document.edit()
+    if document.select_one('img[fetchpriority=high]') is None:
+        for link in preloads:
+            img = preloaded_img(document, link) if link.attrs.get('as') == 'image' else None
+            if img is not None:
+                tag = set_attribute(LAZY_RE.sub('', document.start_tag(img)), 'fetchpriority', 'high')
+                splices.replace(img.start, img.inner_start, tag)
+                break
+        if splices:
+            # Re-parse so the hero is derived from the marked <img>
+            content = splices.apply()
+            document = parse_html(content)
+            preloads = [link for link in document.select('head link[rel=preload][href], '
+                                                          'head link[rel=preload][imagesrcset]')
+                        if 'onload' not in link.attrs]
+            splices = document.edit()
+    
+    hints = page_hints(document, fonts)
+    for link in preloads:
+        if preload_key(link) in hints:
+            splices.remove_element(link)
+    return splices.apply() if splices else content
+
+def header_rules(dist_dir):
+    """Return [(URL path, {'Link': value})] for every page in dist_dir."""
+    dist_dir = Path(dist_dir)
+    fonts = load_fonts(str(dist_dir))
+    rules = []
+    for path in sorted(dist_dir.rglob('*.html')):
+        hints = page_hints(parse_html(path.read_text(encoding='utf-8')), fonts)
+        if hints:
+            rules.append((page_path(path.relative_to(dist_dir).as_posix()), {'Link': ', '.join(hints.values())}))
+    return rules
+
+def write_early_hints(dist_dir):
+    """Write the per-page Link headers to dist/_headers. Returns the rule count."""
+    rules = header_rules(dist_dir)
+    write_headers_section(dist_dir, HEADERS_SECTION, rules)
+    print(f"⚡ Early hints: Link headers for {len(rules)} pages in _headers")
+    return len(rules)
+
+def early_hints_file(file_path, dist_dir):
+    """Remove the duplicate preloads from one page."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    updated = remove_duplicate_preloads(content, load_fonts(str(dist_dir)))
+    if updated == content:
+        return False
+    write_page(file_path, updated)
+    print(f"✅ Moved preloads to the Link header: {Path(file_path).relative_to(dist_dir)}")
+    return True
+
+def main():
+    """Write per-page Link headers and drop the preload tags they replace."""
+    parser = argparse.ArgumentParser(description="Generate per-page Link headers for Early Hints")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("⚡ EARLY HINTS")
+    print("=" * 60)
+    worker = partial(early_hints_file, dist_dir=args.dist)
+    changed = sum(bool(page.result) for page in run_pages(worker, sorted(args.dist.rglob('*.html')), args.jobs))
+    write_early_hints(args.dist)
+    print("-" * 40)
+    print(f"📊 Pages updated: {changed}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
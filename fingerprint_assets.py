@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Static Asset Fingerprinting
+===========================
+Gives every static asset outside _astro/ (images, favicons, site.webmanifest,
+search-data.json) a content-hashed copy such as /images/logo192.3f9c2a1b.png,
+points every reference at it and serves the copies `immutable`, so a changed
+asset gets a new URL instead of needing cache-busting by hand.
+
+References are rewritten in the HTML pages (src, href, srcset, og:/twitter:
+image meta tags, inline styles), in CSS and JavaScript outside _astro/, in
+the webmanifest, in rss.xml/sitemap.xml and in the search JSON, both as
+root-relative paths and as absolute https://blog.promptmakers.app URLs.
+References to an earlier hashed copy are pointed at the current one, so a
+rerun after an asset changed repairs every page. Files under _astro/ are
+never rewritten: they are served `immutable` under their own URL, so
+changing them in place would leave browsers running stale code.
+
+The original files stay in place for browsers that request /favicon.ico on
+their own and for links from outside the site. Each asset keeps its current
+and previous hashed copy, so HTML cached from the last deploy still finds
+its images; older copies are deleted. Immutable Cache-Control rules for the
+copies are written to dist/_headers.
+"""
+
+import argparse
+import hashlib
+import re
+import shutil
+from functools import lru_cache, partial
+from pathlib import Path
+
+from netlify_headers import write_headers_section
+from page_manifest import load_json_cache, save_json_cache
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+from run_report import count
+
+SITE_URL = "https://blog.promptmakers.app"
+FINGERPRINTS_NAME = ".asset-fingerprints.json"
+FINGERPRINTS_VERSION = 1
+
+ASSET_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.svg', '.ico',
+                    '.webmanifest', '.json')
+# Assets that can themselves reference other assets; hashed after rewriting
+TEXT_ASSET_EXTENSIONS = ('.svg', '.webmanifest', '.json')
+# Files other than HTML whose references are rewritten
+REFERENCE_EXTENSIONS = ('.css', '.js', '.xml', '.webmanifest', '.json')
+# Already content-hashed, or fetched by a computed name (the search index shards)
+SKIP_DIRS = ('_astro', 'search')
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{8}\.[^.]+$')
+HASHED_URL_RE = re.compile(r'\.[0-9a-f]{8}(\.[^./]+)$')
+ASSET_URL_RE = re.compile(
+    rf'(?<![\w.~/%-])(?P<origin>{re.escape(SITE_URL)})?(?P<path>/[\w.~/%@+-]+)(?![\w.~/%-])')
+
+def is_fingerprinted(path):
+    """Check whether a file name already carries a content hash."""
+    return bool(HASHED_NAME_RE.search(Path(path).name))
+
+def find_assets(dist_dir):
+    """Return every asset under dist_dir that should get a hashed copy."""
+    dist_dir = Path(dist_dir)
+    return sorted(
+        path for path in dist_dir.rglob("*")
+        if path.is_file() and path.suffix.lower() in ASSET_EXTENSIONS
+        and not path.name.startswith('.') and not is_fingerprinted(path)
+        and path.relative_to(dist_dir).parts[0] not in SKIP_DIRS
+    )
+
+def find_reference_files(dist_dir):
+    """Return every non-HTML text file whose asset references are rewritten."""
+    dist_dir = Path(dist_dir)
+    return sorted(
+        path for path in dist_dir.rglob("*")
+        if path.is_file() and path.suffix.lower() in REFERENCE_EXTENSIONS
+        and not path.name.startswith('.') and not is_fingerprinted(path)
+        and path.relative_to(dist_dir).parts[0] not in SKIP_DIRS
+    )
+
+def hashed_url(url, data):
+    """Return the fingerprinted URL of an asset, e.g. /images/a.1b2c3d4e.png."""
+    digest = hashlib.sha256(data).hexdigest()[:8]
+    stem, dot, ext = url.rpartition('.')
+    return f"{stem}.{digest}.{ext}"
+
+def source_url(url):
+    """Return the URL a hashed copy was made from, e.g. /images/a.png for /images/a.1b2c3d4e.png."""
+    return HASHED_URL_RE.sub(r'\1', url)
+
+def rewrite_references(text, assets):
+    """Point every reference to an asset in `assets` at its hashed URL.
+    
+    `assets` maps root-relative URLs to fingerprinted ones; absolute URLs
+    on the site's own origin are rewritten too and keep their origin. A
+    reference to an older hashed copy of an asset is pointed at the current
+    one.
+    """
+    def replace(match):
+        path = match.group('path')
+        hashed = assets.get(path) or assets.get(source_url(path))
+        if hashed is None:
+            return match.group(0)
+        return f"{match.group('origin') or ''}{hashed}"
+    
+    text, matches = ASSET_URL_RE.subn(replace, text)
+    count(ASSET_URL_RE.pattern, matches)
+    return text
+
+def rewrite_file(path, assets):
+    """Rewrite the references in one text file. Returns True if it changed."""
+    content = path.read_text(encoding='utf-8')
+    updated_content = rewrite_references(content, assets)
+    if updated_content == content:
+        return False
+    write_page(path, updated_content)
+    return True
+
+def remove_stale_copies(asset, keep):
+    """Delete hashed copies of an asset other than the file names in keep."""
+    pattern = re.compile(rf'{re.escape(asset.stem)}\.[0-9a-f]{{8}}{re.escape(asset.suffix)}')
+    for copy in asset.parent.glob(f"{asset.stem}.*{asset.suffix}"):
+        if copy.name not in keep and pattern.fullmatch(copy.name):
+            copy.unlink()
+
+def fingerprints_path(dist_dir):
+    return Path(dist_dir) / FINGERPRINTS_NAME
+
+def save_fingerprints(path, assets):
+    """Write the URL -> hashed URL map atomically."""
+    save_json_cache(path, FINGERPRINTS_VERSION, 'assets', assets)
+
+@lru_cache(maxsize=None)
+def load_fingerprints(dist_dir):
+    """Return {url: hashed url} from the last fingerprint_assets() run (cached per process)."""
+    return load_json_cache(fingerprints_path(dist_dir), FINGERPRINTS_VERSION, 'assets')
+
+def fingerprint_assets(dist_dir):
+    """Write hashed copies of every asset and rewrite the non-HTML references.
+    
+    Binary assets are hashed first; text assets (the webmanifest, SVGs, the
+    search JSON) have their own references rewritten before being hashed,
+    so their copies already point at hashed URLs. Returns {url: hashed url}.
+    """
+    dist_dir = Path(dist_dir)
+    sources = find_assets(dist_dir)
+    previous = load_fingerprints(str(dist_dir))
+    assets = {}
+    copied = 0
+    
+    binary = [p for p in sources if p.suffix.lower() not in TEXT_ASSET_EXTENSIONS]
+    text = {p for p in sources if p.suffix.lower() in TEXT_ASSET_EXTENSIONS}
+    for asset in binary + sorted(text):
+        if asset in text:
+            rewrite_file(asset, assets)
+        url = '/' + asset.relative_to(dist_dir).as_posix()
+        assets[url] = hashed_url(url, asset.read_bytes())
+        copy = dist_dir / assets[url].lstrip('/')
+        if not copy.exists():
+            shutil.copy2(asset, copy)
+            copied += 1
+        # The previous copy stays for pages cached from the last deploy
+        keep = {copy.name, Path(previous.get(url, '')).name}
+        remove_stale_copies(asset, keep)
+    
+    rewritten = sum(rewrite_file(path, assets) for path in find_reference_files(dist_dir)
+                    if path not in text)
+    
+    save_fingerprints(fingerprints_path(dist_dir), assets)
+    write_headers_section(dist_dir, 'fingerprint_assets.py',
+                          [(hashed, {'Cache-Control': IMMUTABLE}) for hashed in sorted(assets.values())])
+    load_fingerprints.cache_clear()
+    print(f"🔖 Fingerprinted {len(assets)} assets ({copied} new copies), "
+          f"rewrote references in {rewritten} CSS/JS/XML/JSON files")
+    return assets
+
+def fingerprint_references(content, assets):
+    """Point a page's asset references at their fingerprinted URLs."""
+    if not assets:
+        return content
+    return rewrite_references(content, assets)
+
+def fingerprint_references_file(file_path, dist_dir):
+    """Rewrite the asset references in a single HTML file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        updated_content = fingerprint_references(content, load_fingerprints(str(dist_dir)))
+        if updated_content == content:
+            return False
+        
+        write_page(file_path, updated_content)
+        print(f"✅ Fingerprinted asset references in: {file_path}")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error updating {file_path}: {e}")
+        return False
+
+def main():
+    """Fingerprint the static assets in dist/ and rewrite every page's references."""
+    parser = argparse.ArgumentParser(description="Content-hash static assets and rewrite their references")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("🔖 FINGERPRINTING ASSETS")
+    print("=" * 60)
+    fingerprint_assets(args.dist)
+    
+    html_files = sorted(args.dist.rglob("*.html"))
+    print("-" * 40)
+    worker = partial(fingerprint_references_file, dist_dir=args.dist)
+    updated_count = sum(1 for page in run_pages(worker, html_files, args.jobs) if page.result)
+    print("-" * 40)
+    print(f"✅ Updated asset references in {updated_count} of {len(html_files)} files")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,9 +4,16 @@ Script to fix CSS references in blog posts by replacing external CSS links with
 This fixes the local development server CSS loading issues.
 """
 
+import argparse
+import hashlib
 import os
 import re
 import glob
+from functools import lru_cache
+
+from html_tree import parse_html
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
 
 def get_inline_css():
     """Return the consolidated CSS styles for blog posts."""
@@ -437,6 +444,112 @@ a:hover {
 }
 </style>'''
 
+CSS_MARKER = 'Consolidated Blog Post Styles'
+
+# Per-page Astro stylesheets the consolidated CSS replaces
+ASTRO_STYLESHEETS = ('/_astro/_slug_.Bf5ABjYN.css', '/_astro/_slug_.DEt5kPu5.css', '/_astro/base.css')
+
+def astro_css_elements(document):
+    """Return the elements loading the Astro stylesheets, in document order.
+    
+    That is every <link rel="stylesheet"> or <link rel="preload"> to one of
+    ASTRO_STYLESHEETS plus any <noscript> fallback wrapping such a link. Returns
+    [] unless the page still has a stylesheet link outside <noscript>.
+    """
+    links = [el for el in document.select('head link[href^="/_astro/"]')
+             if el.attrs['href'] in ASTRO_STYLESHEETS and el.attrs.get('rel') in ('stylesheet', 'preload')]
+    if not any(el.attrs['rel'] == 'stylesheet' and not el.has_ancestor('noscript') for el in links):
+        return []
+    noscripts = {id(a): a for el in links for a in el.ancestors() if a.tag == 'noscript'}
+    elements = [el for el in links if not el.has_ancestor('noscript')] + list(noscripts.values())
+    return sorted(elements, key=lambda el: el.start)
+
+def replace_elements(document, elements, replacement):
+    """Put replacement where the first element was and remove the rest.
+    
+    Elements separated only by whitespace go as one span, so a removed
+    block of links leaves no blank lines behind.
+    """
+    spans = []
+    for element in elements:
+        if spans and not document.source[spans[-1][1]:element.start].strip():
+            spans[-1][1] = element.end
+        else:
+            spans.append([element.start, element.end])
+    
+    splices = document.edit()
+    splices.replace(*spans[0], replacement)
+    for start, end in spans[1:]:
+        splices.remove(*splices.line_span(start, end))
+    return splices.apply()
+
+def inline_blog_post_css(content):
+    """Replace the external CSS links in a page with the consolidated inline styles.
+    
+    Returns the content unchanged if the page is already processed or has
+    no Astro stylesheet links.
+    """
+    if CSS_MARKER in content:
+        return content
+    
+    document = parse_html(content)
+    elements = astro_css_elements(document)
+    if not elements:
+        return content
+    return replace_elements(document, elements, get_inline_css())
+
+# Inline style block written by inline_blog_post_css
+INLINE_BLOCK_PATTERN = r'<style>\s*/\* Consolidated Blog Post Styles \*/.*?</style>'
+
+# A previously written shared stylesheet (possibly an older hash)
+SHARED_HREF_RE = re.compile(r'/_astro/post\.[0-9a-f]+\.css')
+
+def get_post_css():
+    """Return the consolidated CSS without the surrounding <style> tags."""
+    css = get_inline_css()
+    return css[len('<style>\n'):-len('</style>')]
+
+@lru_cache(maxsize=None)
+def post_stylesheet_href():
+    """Return the root-relative URL of the content-hashed shared stylesheet."""
+    digest = hashlib.sha256(get_post_css().encode('utf-8')).hexdigest()[:8]
+    return f"/_astro/post.{digest}.css"
+
+def write_post_stylesheet(dist_dir):
+    """Write the shared stylesheet into dist_dir/_astro once and return its path.
+    
+    The filename carries the content hash, so an existing file is already
+    up to date and is left alone.
+    """
+    css_path = os.path.join(dist_dir, post_stylesheet_href().lstrip('/'))
+    if not os.path.exists(css_path):
+        os.makedirs(os.path.dirname(css_path), exist_ok=True)
+        with open(css_path, 'w', encoding='utf-8') as f:
+            f.write(get_post_css())
+    return css_path
+
+def link_blog_post_css(content):
+    """Point a page at the shared stylesheet instead of inline or per-page CSS.
+    
+    Handles pages with the original three external links, pages already
+    carrying the inline block, and pages linking an older shared stylesheet.
+    The href is root-relative like the other /_astro/ assets, so it resolves
+    the same on Netlify and on a local server started in dist/.
+    """
+    href = post_stylesheet_href()
+    document = parse_html(content)
+    if any(el.attrs['href'] == href for el in document.select('link[rel=stylesheet][href]')):
+        return content
+    
+    shared = [el for el in document.select('head link[rel=stylesheet][href^="/_astro/post."]')
+              if SHARED_HREF_RE.fullmatch(el.attrs['href'])]
+    inline = [el for el in document.select('style')
+              if document.inner_html(el).lstrip().startswith(f'/* {CSS_MARKER} */')]
+    elements = shared[:1] or inline[:1] or astro_css_elements(document)
+    if not elements:
+        return content
+    return replace_elements(document, elements, f'<link rel="stylesheet" href="{href}">')
+
 def fix_blog_post_css(file_path):
     """Fix CSS references in a single blog post file."""
     print(f"Processing: {file_path}")
@@ -446,50 +559,78 @@ def fix_blog_post_css(file_path):
             content = f.read()
         
         # Check if file already has inline CSS (skip if already processed)
-        if 'Consolidated Blog Post Styles' in content:
+        if CSS_MARKER in content:
             print(f"  ✓ Already processed: {file_path}")
             return True
         
-        # Pattern to match both preload and stylesheet links for the three CSS files
-        css_pattern = r'<link\s+rel="preload"\s+href="/_astro/_slug_\.Bf5ABjYN\.css"[^>]*>\s*<link\s+rel="preload"\s+href="/_astro/_slug_\.DEt5kPu5\.css"[^>]*>\s*<link\s+rel="preload"\s+href="/_astro/base\.css"[^>]*>\s*<noscript[^>]*>.*?</noscript>\s*<link\s+rel="stylesheet"\s+href="/_astro/_slug_\.Bf5ABjYN\.css">\s*<link\s+rel="stylesheet"\s+href="/_astro/_slug_\.DEt5kPu5\.css">\s*<link\s+rel="stylesheet"\s+href="/_astro/base\.css">'
-        
-        # If the complex pattern doesn't match, try simpler patterns
-        if not re.search(css_pattern, content, re.DOTALL):
-            # Try to match just the stylesheet links
-            css_pattern = r'<link\s+rel="stylesheet"\s+href="/_astro/_slug_\.Bf5ABjYN\.css">\s*<link\s+rel="stylesheet"\s+href="/_astro/_slug_\.DEt5kPu5\.css">\s*<link\s+rel="stylesheet"\s+href="/_astro/base\.css">'
+        updated_content = inline_blog_post_css(content)
         
-        # Replace CSS links with inline styles
-        updated_content = re.sub(css_pattern, get_inline_css(), content, flags=re.DOTALL)
-        
-        # If no replacement happened, maybe the pattern is different
+        # If no replacement happened, the page has no Astro stylesheet links
         if updated_content == content:
-            print(f"  ⚠ No CSS pattern matched in: {file_path}")
+            print(f"  ⚠ No Astro stylesheet links found in: {file_path}")
             return False
         
         # Write the updated content back
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(updated_content)
+        write_page(file_path, updated_content)
         
         print(f"  ✓ Fixed CSS references: {file_path}")
         return True
+    
+    except Exception as e:
+        print(f"  ✗ Error processing {file_path}: {e}")
+        return False
+
+def link_blog_post_css_file(file_path):
+    """Switch a single blog post file over to the shared stylesheet."""
+    print(f"Processing: {file_path}")
+    
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
         
+        updated_content = link_blog_post_css(content)
+        
+        if updated_content == content:
+            if post_stylesheet_href() in content:
+                print(f"  ✓ Already linked: {file_path}")
+                return True
+            print(f"  ⚠ No CSS to replace found in: {file_path}")
+            return False
+        
+        write_page(file_path, updated_content)
+        
+        print(f"  ✓ Linked shared stylesheet: {file_path}")
+        return True
+    
     except Exception as e:
         print(f"  ✗ Error processing {file_path}: {e}")
         return False
 
 def main():
     """Main function to process all blog post files."""
+    parser = argparse.ArgumentParser(description="Inline the consolidated CSS into blog posts")
+    parser.add_argument('--external', action='store_true',
+                        help="Write the CSS once to _astro/post.<hash>.css and link it from every post")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
     # Get all blog post HTML files (excluding the blog index)
-    blog_posts = glob.glob('dist/blog/*/index.html')
+    blog_posts = sorted(glob.glob('dist/blog/*/index.html'))
     
     print(f"Found {len(blog_posts)} blog post files to process:")
     
+    fix_post = fix_blog_post_css
+    if args.external:
+        css_path = write_post_stylesheet('dist')
+        print(f"Shared stylesheet: {css_path}")
+        fix_post = link_blog_post_css_file
+    
     processed = 0
     skipped = 0
     errors = 0
     
-    for post_file in blog_posts:
-        result = fix_blog_post_css(post_file)
+    for page in run_pages(fix_post, blog_posts, args.jobs):
+        result = page.result
         if result is True:
             processed += 1
         elif result is None:  # Already processed
@@ -504,7 +645,10 @@ def main():
     print(f"  📁 Total: {len(blog_posts)}")
     
     if errors == 0:
-        print(f"\n🎉 All blog posts now have self-contained CSS!")
+        if args.external:
+            print(f"\n🎉 All blog posts now share one cacheable stylesheet!")
+        else:
+            print(f"\n🎉 All blog posts now have self-contained CSS!")
     else:
         print(f"\n⚠  Some files had issues. Check the output above.")
 
@@ -7,9 +7,27 @@ and causes console errors.
 """
 
 import os
-import re
 from pathlib import Path
 
+from html_tree import parse_html
+from page_stream import write_page
+
+SEARCH_SCRIPT = 'Search.astro_astro_type_script_index_0_lang.CsPf_NSL.js'
+
+def remove_search_script(content):
+    """Remove the search script tag from a blog post.
+    
+    They don't have search functionality, only homepage and blog index do.
+    """
+    if SEARCH_SCRIPT not in content:
+        return content
+    
+    document = parse_html(content)
+    splices = document.edit()
+    for script in document.select(f'script[src$="{SEARCH_SCRIPT}"]'):
+        splices.remove_element(script)
+    return splices.apply()
+
 def fix_search_script_references():
     """Remove search script from individual blog posts"""
     
@@ -34,20 +52,14 @@ def fix_search_script_references():
                 content = f.read()
             
             # Check if it contains the search script
-            if 'Search.astro_astro_type_script_index_0_lang.CsPf_NSL.js' in content:
+            if SEARCH_SCRIPT in content:
                 print(f"  Fixing: {post_file}")
                 
                 # Remove the search script tag from individual blog posts
-                # They don't have search functionality, only homepage and blog index do
-                content = re.sub(
-                    r'\s*<script[^>]*Search\.astro_astro_type_script_index_0_lang\.CsPf_NSL\.js[^>]*></script>',
-                    '',
-                    content
-                )
+                content = remove_search_script(content)
                 
                 # Write back the fixed content
-                with open(post_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                write_page(post_file, content)
                 
                 fixed_count += 1
         
@@ -4,24 +4,42 @@ Fix Twitter Card images to use correct local images and domains
 """
 
 import os
-import re
+
+from fingerprint_assets import source_url
+from html_tree import parse_html
+from page_stream import write_page
+from site_metadata import build_site_metadata, image_mappings
+
+OLD_IMAGE_PREFIX = 'https://promptmakers.app/images/'
+IMAGE_PREFIX = 'https://blog.promptmakers.app/images/'
+
+def fix_twitter_image_content(content, correct_image):
+    """Point a page's Twitter card image at the blog domain and the correct file."""
+    document = parse_html(content)
+    splices = document.edit()
+    for meta in document.select('meta[content]'):
+        value = meta.attrs['content']
+        # Fix domain from promptmakers.app to blog.promptmakers.app
+        if value.startswith(OLD_IMAGE_PREFIX):
+            value = IMAGE_PREFIX + value[len(OLD_IMAGE_PREFIX):]
+        # Fix the specific image filename for this post; a fingerprinted copy of it is already right
+        is_card = 'twitter:image' in (meta.attrs.get('name'), meta.attrs.get('property'))
+        if is_card and value.startswith(IMAGE_PREFIX) and source_url(value) != IMAGE_PREFIX + correct_image:
+            value = IMAGE_PREFIX + correct_image
+        if value != meta.attrs['content']:
+            splices.set_attribute(meta, 'content', value)
+    
+    return splices.apply() if splices else content
 
 def fix_twitter_images():
     """Fix Twitter card image references"""
     
-    # Define the correct image mappings for each post
-    image_mappings = {
-        'prompt-engineering-101-basics': 'prompt-engineering-basics.jpg',
-        'clear-framework-effective-prompts': 'clear-framework.jpg', 
-        'chatgpt-vs-gemini-vs-claude': 'ai-model-comparison.jpg',
-        '5-hacks-insanely-good-ai-prompts': 'ai-prompts-hero.jpg',
-        'mastering-prompt-templates': 'prompt-templates.jpg',
-        'ai-agents-ultimate-guide': 'ai-agents-guide.jpg',
-        'advanced-prompt-engineering-techniques': 'og-advanced-prompt-techniques.jpg'
-    }
+    if not os.path.isdir("dist"):
+        print("❌ Directory not found: dist")
+        return
     
-    # Fix each blog post
-    for post_name, correct_image in image_mappings.items():
+    # Each post's image comes from the metadata index (see site_metadata.py)
+    for post_name, correct_image in image_mappings(build_site_metadata("dist")).items():
         file_path = f"dist/blog/{post_name}/index.html"
         
         if os.path.exists(file_path):
@@ -30,26 +48,13 @@ def fix_twitter_images():
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            # Fix domain from promptmakers.app to blog.promptmakers.app
-            content = re.sub(
-                r'content="https://promptmakers\.app/images/([^"]+)"',
-                r'content="https://blog.promptmakers.app/images/\1"',
-                content
-            )
+            content = fix_twitter_image_content(content, correct_image)
             
-            # Fix the specific image filename for this post
-            content = re.sub(
-                r'(twitter:image[^>]+content="https://blog\.promptmakers\.app/images/)[^"]+(")',
-                rf'\1{correct_image}\2',
-                content
-            )
+            write_page(file_path, content)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-                
             print(f"  ✓ Updated Twitter image to: {correct_image}")
     
     print("\n✅ Twitter card images fixed!")
 
 if __name__ == "__main__":
-    fix_twitter_images()
\ No newline at end of file
+    fix_twitter_images()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Lightweight HTML element tree with CSS selector matching.
+
+Built on the stdlib html.parser so the post-processing scripts can ask
+structural questions ("which elements does `.hero h1` match?") without a
+third-party DOM library.
+
+Every element records where it sits in the source text, so fixers can find
+what to change by selector and rewrite the page with Splices: edits keyed by
+position and applied in a single pass, copying every untouched byte through
+as is. Parsing and splicing are linear in the page size and do not care how
+the page is formatted.
+"""
+
+import bisect
+import html
+import re
+from functools import lru_cache
+from html.parser import HTMLParser
+
+from run_report import count
+
+VOID_ELEMENTS = frozenset(
+    'area base br col embed hr img input link meta param source track wbr'.split()
+)
+
+class Element:
+    """An element node: tag name, attribute dict, children and parent.
+    
+    start/end delimit the whole element in the source text and
+    inner_start/inner_end its content (equal to end for void elements).
+    index is the element's position in its parent's children.
+    """
+    __slots__ = ('tag', 'attrs', 'children', 'parent', 'index', 'start', 'end', 'inner_start', 'inner_end')
+
+    def __init__(self, tag, attrs=None, parent=None, start=None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.children = []
+        self.parent = parent
+        self.index = 0
+        self.start = start
+        self.end = self.inner_start = self.inner_end = None
+
+    def __repr__(self):
+        return f"<Element {self.tag} {self.attrs}>"
+
+    @property
+    def classes(self):
+        return self.attrs.get('class', '').split()
+
+    def iter(self):
+        """Yield this element and all its descendants in document order."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def has_ancestor(self, tag):
+        return any(node.tag == tag for node in self.ancestors())
+
+    def ancestors(self):
+        """Yield the parent, grandparent, ... up to (excluding) the document."""
+        node = self.parent
+        while node is not None and node.tag != '#document':
+            yield node
+            node = node.parent
+
+    def previous_siblings(self):
+        """Yield earlier siblings, nearest first."""
+        if self.parent is None:
+            return
+        siblings = self.parent.children
+        for i in range(self.index - 1, -1, -1):
+            yield siblings[i]
+
+class Comment:
+    """An HTML comment and its position in the source text."""
+    __slots__ = ('data', 'start', 'end')
+
+    def __init__(self, data, start, end):
+        self.data = data
+        self.start = start
+        self.end = end
+
+class Document(Element):
+    """The '#document' root, holding the source text and its comments.
+    
+    comment_ends lists each comment's end offset, in source order, for
+    bisecting.
+    """
+    __slots__ = ('source', 'comments', 'comment_ends')
+
+    def __init__(self, source=''):
+        super().__init__('#document', start=0)
+        self.source = source
+        self.comments = []
+        self.comment_ends = []
+        self.end = self.inner_end = len(source)
+        self.inner_start = 0
+
+    def select(self, selector):
+        return select(self, selector)
+
+    def select_one(self, selector):
+        """Return the first element matching a selector, or None."""
+        found = next((el for el in self.iter() if el.tag != '#document' and matches(el, selector)), None)
+        count(selector, found is not None)
+        return found
+
+    def html(self, element):
+        """Return the source text of an element, tags included."""
+        return self.source[element.start:element.end]
+
+    def inner_html(self, element):
+        """Return the source text between an element's start and end tags."""
+        return self.source[element.inner_start:element.inner_end]
+
+    def start_tag(self, element):
+        return self.source[element.start:element.inner_start]
+
+    def preceding_comment(self, element):
+        """Return the comment directly before an element (whitespace aside), or None."""
+        i = bisect.bisect_right(self.comment_ends, element.start) - 1
+        if i >= 0 and not self.source[self.comments[i].end:element.start].strip():
+            return self.comments[i]
+        return None
+
+    def edit(self):
+        """Start a set of splices against this document's source."""
+        return Splices(self.source)
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self, source=''):
+        super().__init__(convert_charrefs=True)
+        self.source = source
+        self.root = Document(source)
+        self.stack = [self.root]
+        self.line_starts = [0] + [m.end() for m in re.finditer('\n', source)]
+
+    def source_offset(self):
+        """Return the source offset of the token being handled."""
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def _element(self, tag, attrs):
+        parent = self.stack[-1]
+        start = self.source_offset()
+        element = Element(tag, {name: value or '' for name, value in attrs}, parent, start)
+        element.inner_start = start + len(self.get_starttag_text() or '')
+        element.index = len(parent.children)
+        parent.children.append(element)
+        return element
+
+    def handle_starttag(self, tag, attrs):
+        element = self._element(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            element.end = element.inner_end = element.inner_start
+        else:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        element = self._element(tag, attrs)
+        element.end = element.inner_end = element.inner_start
+
+    def handle_endtag(self, tag):
+        # Close the nearest open element with this tag, ignoring strays;
+        # anything opened inside it and left open ends where it does
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                start = self.source_offset()
+                end = self.source.find('>', start) + 1 or len(self.source)
+                for element in self.stack[i + 1:]:
+                    element.end = element.inner_end = start
+                self.stack[i].inner_end = start
+                self.stack[i].end = end
+                del self.stack[i:]
+                break
+
+    def handle_comment(self, data):
+        start = self.source_offset()
+        end = self.source.find('>', start + 4 + len(data)) + 1 or len(self.source)
+        self.root.comments.append(Comment(data, start, end))
+        self.root.comment_ends.append(end)
+
+    def close(self):
+        super().close()
+        for element in self.stack[1:]:
+            element.end = element.inner_end = len(self.source)
+        del self.stack[1:]
+
+def parse_html(text):
+    """Parse an HTML document into an Element tree rooted at a '#document' Document."""
+    builder = _TreeBuilder(text)
+    builder.feed(text)
+    builder.close()
+    return builder.root
+
+# --- Splices ---------------------------------------------------------------
+
+class Splices:
+    """Position-indexed edits to a source string, applied in one pass.
+    
+    Offsets always refer to the original source, so edits can be recorded
+    in any order; apply() copies the text between them through unchanged.
+    Overlapping edits raise ValueError.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.edits = []
+
+    def __bool__(self):
+        return bool(self.edits)
+
+    def replace(self, start, end, text):
+        self.edits.append((start, end, text))
+
+    def insert(self, pos, text):
+        self.edits.append((pos, pos, text))
+
+    def remove(self, start, end):
+        self.edits.append((start, end, ''))
+
+    def indent(self, pos):
+        """Return the whitespace before pos if pos starts its line, else None."""
+        line_start = self.source.rfind('\n', 0, pos) + 1
+        indent = self.source[line_start:pos]
+        return None if indent.strip(' \t') else indent
+
+    def line_end(self, end):
+        """Move end past the rest of its line (newline included) if that is blank."""
+        line_end = self.source.find('\n', end)
+        line_end = len(self.source) if line_end == -1 else line_end + 1
+        return line_end if not self.source[end:line_end].strip() else end
+
+    def line_span(self, start, end):
+        """Widen a span to its whole line(s) if nothing else is on them.
+        
+        A span that ends its line but follows other content is widened over
+        the spaces before it instead, so removing it leaves no trailing
+        whitespace.
+        """
+        indent = self.indent(start)
+        line_end = self.line_end(end)
+        if line_end == end:
+            return start, end
+        if indent is None:
+            while start > 0 and self.source[start - 1] in ' \t':
+                start -= 1
+            return start, end
+        return start - len(indent), line_end
+
+    def replace_element(self, element, text):
+        self.replace(element.start, element.end, text)
+
+    def remove_element(self, element):
+        """Remove an element, and its line if it was alone on it."""
+        self.remove(*self.line_span(element.start, element.end))
+
+    def set_attribute(self, element, name, value):
+        """Set an attribute on an element's start tag, replacing any existing value."""
+        tag = self.source[element.start:element.inner_start]
+        self.replace(element.start, element.inner_start, set_attribute(tag, name, value))
+
+    def apply(self):
+        """Return the source with every edit applied."""
+        pieces = []
+        pos = 0
+        for start, end, text in sorted(self.edits, key=lambda edit: (edit[0], edit[1])):
+            if start < pos:
+                raise ValueError(f"Overlapping edits at offset {start}")
+            pieces.append(self.source[pos:start])
+            pieces.append(text)
+            pos = end
+        pieces.append(self.source[pos:])
+        return ''.join(pieces)
+
+def set_attribute(tag, name, value):
+    """Set an attribute on a start tag's text, replacing any existing value."""
+    value = html.escape(str(value))
+    pattern = re.compile(rf'(\s){re.escape(name)}(?:\s*=\s*(?:"[^"]*"|\'[^\']*\'|[^\s"\'=<>`]+))?(?=[\s/>])',
+                         re.IGNORECASE)
+    if pattern.search(tag):
+        return pattern.sub(lambda m: f'{m.group(1)}{name}="{value}"', tag, count=1)
+    end = len(tag) - 2 if tag.endswith('/>') else len(tag) - 1
+    return f'{tag[:end].rstrip()} {name}="{value}"{tag[end:]}'
+
+def remove_attribute(tag, name):
+    """Remove an attribute from a start tag's text, if present."""
+    pattern = re.compile(rf'\s+{re.escape(name)}(?:\s*=\s*(?:"[^"]*"|\'[^\']*\'|[^\s"\'=<>`]+))?(?=[\s/>])',
+                         re.IGNORECASE)
+    return pattern.sub('', tag, count=1)
+
+# --- Selectors -------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comb>\s*[>+~]\s*)
+  | (?P<type>\*|[a-zA-Z][\w-]*)
+  | (?P<id>\#(?:[\w-]|\\.)+)
+  | (?P<cls>\.(?:[\w-]|\\.)+)
+  | (?P<attr>\[\s*(?P<aname>[\w:-]+)\s*(?:(?P<op>[~^$*|]?=)\s*(?P<aval>"[^"]*"|'[^']*'|[^\]\s]+)\s*(?:[iIsS]\s*)?)?\])
+  | (?P<pseudo>::?[\w-]+(?:\((?:[^()]|\([^()]*\))*\))?)
+''', re.VERBOSE)
+
+class Compound:
+    """One compound selector such as `a.nav-link[href^="/"]:hover`."""
+    __slots__ = ('tag', 'ids', 'classes', 'attrs', 'pseudos')
+
+    def __init__(self):
+        self.tag = None
+        self.ids = []
+        self.classes = []
+        self.attrs = []
+        self.pseudos = []
+
+def _unescape(ident):
+    return re.sub(r'\\(.)', r'\1', ident)
+
+@lru_cache(maxsize=4096)
+def parse_selector(selector):
+    """Parse one complex selector into a tuple of (combinator, Compound) pairs.
+    
+    The first pair's combinator is None; later ones are ' ', '>', '+' or '~'.
+    Raises ValueError for syntax this parser does not understand.
+    """
+    parts = []
+    compound = Compound()
+    combinator = None
+    pos = 0
+    text = selector.strip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            raise ValueError(f"Unsupported selector: {selector!r}")
+        pos = match.end()
+        kind = match.lastgroup if match.lastgroup not in ('aname', 'op', 'aval') else 'attr'
+        if kind in ('ws', 'comb'):
+            if match.group('ws') and pos < len(text) and _TOKEN_RE.match(text, pos).lastgroup == 'comb':
+                continue
+            parts.append((combinator, compound))
+            combinator = match.group(0).strip() or ' '
+            compound = Compound()
+        elif kind == 'type':
+            compound.tag = match.group(0).lower()
+        elif kind == 'id':
+            compound.ids.append(_unescape(match.group(0)[1:]))
+        elif kind == 'cls':
+            compound.classes.append(_unescape(match.group(0)[1:]))
+        elif kind == 'attr':
+            value = match.group('aval')
+            if value and value[0] in '"\'':
+                value = value[1:-1]
+            compound.attrs.append((match.group('aname').lower(), match.group('op'), value))
+        else:
+            compound.pseudos.append(match.group(0))
+    parts.append((combinator, compound))
+    return tuple(parts)
+
+def split_selector_list(selectors):
+    """Split a selector list on top-level commas."""
+    result = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(selectors):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            result.append(selectors[start:i].strip())
+            start = i + 1
+    result.append(selectors[start:].strip())
+    return [s for s in result if s]
+
+def selector_pseudos(selector):
+    """Return the pseudo-class/element names used anywhere in a selector."""
+    names = set()
+    for _, compound in parse_selector(selector):
+        for pseudo in compound.pseudos:
+            names.add(pseudo.lstrip(':').split('(')[0].lower())
+    return names
+
+def _match_attr(element, name, op, value):
+    if name not in element.attrs:
+        return False
+    actual = element.attrs[name]
+    if op is None:
+        return True
+    if op == '=':
+        return actual == value
+    if op == '~=':
+        return value in actual.split()
+    if op == '^=':
+        return bool(value) and actual.startswith(value)
+    if op == '$=':
+        return bool(value) and actual.endswith(value)
+    if op == '*=':
+        return bool(value) and value in actual
+    if op == '|=':
+        return actual == value or actual.startswith(value + '-')
+    return False
+
+def _match_compound(element, compound):
+    if element.tag == '#document':
+        return False
+    if compound.tag not in (None, '*') and compound.tag != element.tag:
+        return False
+    if compound.ids and element.attrs.get('id') not in compound.ids:
+        return False
+    if compound.classes:
+        classes = element.classes
+        if any(c not in classes for c in compound.classes):
+            return False
+    for name, op, value in compound.attrs:
+        if not _match_attr(element, name, op, value):
+            return False
+    for pseudo in compound.pseudos:
+        # Only :root is structural enough to matter here; every other
+        # pseudo-class and pseudo-element is treated as matching.
+        if pseudo.lower() == ':root' and element.tag != 'html':
+            return False
+    return True
+
+def _match_from(element, parts, index):
+    combinator, compound = parts[index]
+    if not _match_compound(element, compound):
+        return False
+    if index == 0:
+        return True
+    # The combinator sits between parts[index - 1] and parts[index]
+    if combinator == '>':
+        return element.parent is not None and _match_from(element.parent, parts, index - 1)
+    if combinator == '+':
+        previous = next(element.previous_siblings(), None)
+        return previous is not None and _match_from(previous, parts, index - 1)
+    if combinator == '~':
+        return any(_match_from(sib, parts, index - 1) for sib in element.previous_siblings())
+    return any(_match_from(anc, parts, index - 1) for anc in element.ancestors())
+
+def matches(element, selector):
+    """Check whether an element matches a selector (or selector list).
+    
+    Pseudo-classes and pseudo-elements other than :root are ignored, so
+    `a:hover` matches every <a>. Callers that care about state-dependent
+    rules should inspect selector_pseudos() themselves.
+    """
+    for single in split_selector_list(selector):
+        parts = parse_selector(single)
+        if _match_from(element, parts, len(parts) - 1):
+            return True
+    return False
+
+def select(root, selector):
+    """Return every element under root matching a selector, in document order.
+    
+    The number of matches goes to the run report when called from a transform.
+    """
+    found = [el for el in root.iter() if el.tag != '#document' and matches(el, selector)]
+    count(selector, len(found))
+    return found
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Image Loading Hints
+===================
+Adds the intrinsic width/height of every local image to its <img> tag so the
+browser can reserve space before it loads, marks the post hero image
+fetchpriority="high" with a matching <link rel="preload" as="image">, and
+lazy-loads below-the-fold images such as related-post and card thumbnails.
+
+Dimensions are read straight from the JPEG, PNG, GIF, WebP or AVIF header
+and cached by the SHA-256 of each file in dist/images/.dimensions-cache.json.
+"""
+
+import argparse
+import os
+from functools import lru_cache, partial
+from pathlib import Path
+
+from html_tree import parse_html, remove_attribute, set_attribute
+from optimize_images import wrapper_classes
+from page_manifest import hash_bytes, load_json_cache, save_json_cache, stat_matches
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+
+DIMENSIONS_CACHE = "images/.dimensions-cache.json"
+DIMENSIONS_VERSION = 1
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif')
+
+# Wrappers of the image that paints the largest element above the fold
+HERO_CLASSES = ('article-hero',)
+# Wrappers of images that are never in the first viewport
+LAZY_CLASSES = ('related-image', 'post-image', 'article-image')
+
+def _jpeg_size(data):
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+        elif marker in (0x01, *range(0xD0, 0xDA)):
+            i += 2
+        elif 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            # Start-of-frame: precision, height, width
+            return int.from_bytes(data[i + 7:i + 9], 'big'), int.from_bytes(data[i + 5:i + 7], 'big')
+        else:
+            i += 2 + int.from_bytes(data[i + 2:i + 4], 'big')
+    return None
+
+def _webp_size(data):
+    chunk = data[12:16]
+    if chunk == b'VP8 ':
+        return (int.from_bytes(data[26:28], 'little') & 0x3FFF,
+                int.from_bytes(data[28:30], 'little') & 0x3FFF)
+    if chunk == b'VP8L':
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    return None
+
+def read_image_size(data):
+    """Return (width, height) from an image file's header, or None if unknown."""
+    if data.startswith(b'\xff\xd8'):
+        return _jpeg_size(data)
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big')
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return int.from_bytes(data[6:8], 'little'), int.from_bytes(data[8:10], 'little')
+    if data.startswith(b'RIFF') and data[8:12] == b'WEBP':
+        return _webp_size(data)
+    if data[4:8] == b'ftyp' and b'ispe' in data[:4096]:
+        # AVIF/HEIF image spatial extents property
+        i = data.index(b'ispe')
+        return int.from_bytes(data[i + 8:i + 12], 'big'), int.from_bytes(data[i + 12:i + 16], 'big')
+    return None
+
+def measure_images(dist_dir):
+    """Record the dimensions of every image under dist/images.
+    
+    Files whose size and mtime, or content hash, match the cached entry are
+    not decoded again. Returns the number of images (re-)measured.
+    """
+    dist_dir = Path(dist_dir)
+    path = dist_dir / DIMENSIONS_CACHE
+    cache = load_json_cache(path, DIMENSIONS_VERSION, 'images')
+    updated = {}
+    measured = 0
+    
+    for image in sorted((dist_dir / "images").rglob("*")):
+        if not image.is_file() or image.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        key = image.relative_to(dist_dir).as_posix()
+        entry = cache.get(key)
+        if entry is not None and stat_matches(entry, image):
+            updated[key] = entry
+            continue
+        with open(image, 'rb') as f:
+            data = f.read()
+        digest = hash_bytes(data)
+        st = os.stat(image)
+        if entry is None or entry['hash'] != digest:
+            size = read_image_size(data)
+            if size is None:
+                continue
+            entry = {'hash': digest, 'width': size[0], 'height': size[1]}
+            measured += 1
+        updated[key] = {**entry, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    
+    path.parent.mkdir(parents=True, exist_ok=True)
+    save_json_cache(path, DIMENSIONS_VERSION, 'images', updated)
+    load_dimensions.cache_clear()
+    return measured
+
+@lru_cache(maxsize=None)
+def load_dimensions(dist_dir):
+    """Return the dimension cache for a dist directory (cached per process)."""
+    return load_json_cache(Path(dist_dir) / DIMENSIONS_CACHE, DIMENSIONS_VERSION, 'images')
+
+def hero_preload(picture, attrs):
+    """Build the preload tag for a hero image, preferring its first <source>.
+    
+    A <picture>'s first source is the most efficient format the browser
+    supports, so the preload carries its type to avoid fetching a format
+    that will not be used.
+    """
+    source = next((el for el in picture.children if el.tag == 'source'), None) if picture else None
+    if source:
+        source_attrs = source.attrs
+        link = f'<link rel="preload" as="image" imagesrcset="{source_attrs.get("srcset", "")}"'
+        if 'sizes' in source_attrs:
+            link += f' imagesizes="{source_attrs["sizes"]}"'
+        if 'type' in source_attrs:
+            link += f' type="{source_attrs["type"]}"'
+    elif 'srcset' in attrs:
+        link = f'<link rel="preload" as="image" href="{attrs["src"]}" imagesrcset="{attrs["srcset"]}"'
+        if 'sizes' in attrs:
+            link += f' imagesizes="{attrs["sizes"]}"'
+    else:
+        link = f'<link rel="preload" as="image" href="{attrs["src"]}"'
+    return link + ' fetchpriority="high">'
+
+def add_image_hints(content, dimensions):
+    """Add dimensions, loading hints and a hero preload to every <img>.
+    
+    `dimensions` maps dist-relative image paths to their cache entries.
+    Existing width/height attributes are left as the page author set them.
+    """
+    document = parse_html(content)
+    splices = document.edit()
+    preload = None
+    hero_done = 'fetchpriority="high"' in content
+    
+    for img in document.select('img'):
+        tag = original = document.start_tag(img)
+        attrs = img.attrs
+        src = attrs.get('src', '').split('?')[0]
+        entry = dimensions.get(src.lstrip('/')) if src.startswith('/') and not src.startswith('//') else None
+        
+        if entry and 'width' not in attrs and 'height' not in attrs:
+            tag = set_attribute(set_attribute(tag, 'width', entry['width']), 'height', entry['height'])
+        
+        classes = wrapper_classes(img)
+        if not hero_done and any(c in HERO_CLASSES for c in classes):
+            hero_done = True
+            if attrs.get('loading') == 'lazy':
+                tag = remove_attribute(tag, 'loading')
+            tag = set_attribute(tag, 'fetchpriority', 'high')
+            picture = img.parent if img.parent.tag == 'picture' else None
+            preload = hero_preload(picture, {**attrs, 'fetchpriority': 'high'})
+        elif 'fetchpriority' not in attrs and any(c in LAZY_CLASSES for c in classes):
+            tag = set_attribute(set_attribute(tag, 'loading', 'lazy'), 'decoding', 'async')
+        
+        if tag != original:
+            splices.replace(img.start, img.inner_start, tag)
+    
+    if preload:
+        charset = document.select_one('meta[charset]')
+        head = document.select_one('head')
+        if charset:
+            splices.insert(charset.end, preload)
+        elif head:
+            splices.insert(head.inner_end, f'{preload}\n')
+    return splices.apply() if splices else content
+
+def add_image_hints_file(file_path, dist_dir):
+    """Apply the image hints to a single HTML file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        updated_content = add_image_hints(content, load_dimensions(str(dist_dir)))
+        if updated_content == content:
+            return False
+        
+        write_page(file_path, updated_content)
+        print(f"✅ Added image hints to: {file_path}")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error updating {file_path}: {e}")
+        return False
+
+def main():
+    """Add image dimensions and loading hints to every HTML file under dist/."""
+    parser = argparse.ArgumentParser(description="Add width/height, lazy-loading and fetchpriority to images")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    measured = measure_images(args.dist)
+    print(f"📐 Measured {measured} images ({len(load_dimensions(str(args.dist)))} cached)")
+    
+    html_files = sorted(args.dist.rglob("*.html"))
+    print(f"🔍 Found {len(html_files)} HTML files")
+    print("-" * 40)
+    
+    worker = partial(add_image_hints_file, dist_dir=args.dist)
+    updated_count = sum(1 for page in run_pages(worker, html_files, args.jobs) if page.result)
+    
+    print("-" * 40)
+    print(f"✅ Added image hints to {updated_count} files")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
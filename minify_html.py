@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+HTML Minification
+=================
+Collapses whitespace, strips comments, minifies inline <style> blocks and
+compacts JSON-LD in every page, then checks that the minified page parses
+to the same DOM as the original before keeping it.
+
+Content of <pre>, <code> and <textarea> is left byte for byte, as are
+ordinary inline scripts. Whitespace between text and inline elements is
+collapsed to a single space rather than removed, so rendering is unchanged.
+"""
+
+import argparse
+import json
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+
+from css_rules import minify_css, strip_comments
+from fix_css_references import CSS_MARKER
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+
+# Elements whose content is copied through untouched (style/script handled below)
+VERBATIM_ELEMENTS = ('pre', 'code', 'textarea')
+RAW_ELEMENTS = ('script', 'style') + VERBATIM_ELEMENTS
+
+# Whitespace next to these tags never renders, so it can be dropped entirely
+BLOCK_ELEMENTS = frozenset('''
+    html head body title meta link base script style noscript main header
+    footer nav section article aside div p h1 h2 h3 h4 h5 h6 ul ol dl table
+    thead tbody tfoot tr form fieldset figure figcaption blockquote hr
+'''.split())
+
+# Comments kept in the output: IE conditional comments
+KEEP_COMMENT_PREFIXES = ('<!--[if', '<![endif]')
+# CSS comments other scripts look for when re-processing a page
+KEEP_CSS_COMMENTS = (CSS_MARKER,)
+
+_ATTR = r'''(?:\s+[^\s"'>/=]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'=<>`]+))?)'''
+TOKEN_RE = re.compile(rf'''
+    (?P<comment><!--.*?-->)
+  | (?P<raw><(?P<rawtag>{'|'.join(RAW_ELEMENTS)})\b{_ATTR}*\s*>(?P<rawbody>.*?)</(?P=rawtag)\s*>)
+  | (?P<decl><![^>]*>)
+  | (?P<tag></?(?P<name>[a-zA-Z][\w:-]*){_ATTR}*\s*/?>)
+  | (?P<text>[^<]+|<)
+''', re.IGNORECASE | re.DOTALL | re.VERBOSE)
+
+TYPE_RE = re.compile(r'\btype\s*=\s*["\']?application/ld\+json', re.IGNORECASE)
+TAG_SPACE_RE = re.compile(r'''("[^"]*"|'[^']*')|\s+''')
+
+def minify_tag(tag):
+    """Collapse the whitespace between a tag's attributes."""
+    tag = TAG_SPACE_RE.sub(lambda m: m.group(1) or ' ', tag)
+    return re.sub(r'\s+(/?>)$', r'\1', tag)
+
+def minify_json_ld(body):
+    """Compact a JSON-LD script body, or return it unchanged if it is not JSON."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+def minify_raw(match):
+    """Minify a <script>, <style>, <pre>, <code> or <textarea> element."""
+    name = match.group('rawtag').lower()
+    start = match.group(0)[:match.start('rawbody') - match.start()]
+    body = match.group('rawbody')
+    if name == 'style':
+        body = minify_css(body, KEEP_CSS_COMMENTS)
+    elif name == 'script' and TYPE_RE.search(start):
+        body = minify_json_ld(body)
+    return f"{minify_tag(start)}{body}</{name}>"
+
+def _tag_name(token):
+    kind, value = token
+    if kind in ('tag', 'raw'):
+        return re.match(r'</?([a-zA-Z][\w:-]*)', value).group(1).lower()
+    return None
+
+def minify_html(content):
+    """Return a minified copy of an HTML document."""
+    tokens = []
+    for match in TOKEN_RE.finditer(content):
+        kind = match.lastgroup if match.lastgroup in ('comment', 'decl', 'text') else \
+            'raw' if match.group('raw') else 'tag'
+        if kind == 'comment':
+            if match.group(0).startswith(KEEP_COMMENT_PREFIXES):
+                tokens.append(('decl', match.group(0)))
+            continue
+        if kind == 'text':
+            text = re.sub(r'\s+', ' ', match.group(0))
+            if tokens and tokens[-1][0] == 'text':
+                # Text split by a removed comment
+                text = re.sub(r'\s+', ' ', tokens.pop()[1] + text)
+            tokens.append(('text', text))
+        elif kind == 'raw':
+            tokens.append(('raw', minify_raw(match)))
+        elif kind == 'tag':
+            tokens.append(('tag', minify_tag(match.group(0))))
+        else:
+            tokens.append(('decl', match.group(0)))
+    
+    out = []
+    for i, (kind, value) in enumerate(tokens):
+        if kind == 'text' and value == ' ':
+            before = _tag_name(tokens[i - 1]) if i > 0 else 'html'
+            after = _tag_name(tokens[i + 1]) if i + 1 < len(tokens) else 'html'
+            if before in BLOCK_ELEMENTS or after in BLOCK_ELEMENTS or \
+                    (i > 0 and tokens[i - 1][0] == 'decl'):
+                continue
+        out.append(value)
+    return ''.join(out)
+
+# --- DOM equivalence -------------------------------------------------------
+
+_CSS_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[\w.#%-]+|\S')
+
+def _css_tokens(css):
+    tokens = _CSS_TOKEN_RE.findall(strip_comments(css))
+    # A trailing ';' before '}' is optional
+    return [t for i, t in enumerate(tokens) if not (t == ';' and i + 1 < len(tokens) and tokens[i + 1] == '}')]
+
+class _DomEvents(HTMLParser):
+    """Flatten a document into start/end/text events for comparison."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events = []
+        self.raw = []
+        self.text = []
+
+    def flush(self):
+        if not self.text:
+            return
+        text = ''.join(self.text)
+        self.text = []
+        raw = self.raw[-1] if self.raw else None
+        if raw is None:
+            text = re.sub(r'\s+', ' ', text)
+            if text == ' ':
+                return
+        elif raw[0] == 'style':
+            text = _css_tokens(text)
+        elif raw[0] == 'script' and raw[1]:
+            try:
+                text = json.loads(text)
+            except ValueError:
+                pass
+        self.events.append(('text', text))
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        self.events.append(('start', tag, tuple(attrs)))
+        if tag in RAW_ELEMENTS:
+            self.raw.append((tag, dict(attrs).get('type') == 'application/ld+json'))
+
+    def handle_startendtag(self, tag, attrs):
+        self.flush()
+        self.events.append(('start', tag, tuple(attrs)))
+
+    def handle_endtag(self, tag):
+        self.flush()
+        self.events.append(('end', tag))
+        if self.raw and self.raw[-1][0] == tag:
+            self.raw.pop()
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+    def handle_decl(self, decl):
+        self.flush()
+        self.events.append(('decl', ' '.join(decl.split())))
+
+def dom_events(content):
+    parser = _DomEvents()
+    parser.feed(content)
+    parser.close()
+    parser.flush()
+    return parser.events
+
+def dom_equivalent(original, minified):
+    """Check that two documents have the same elements, attributes and text.
+    
+    Runs of whitespace in ordinary text compare equal to a single space and
+    whitespace-only text is ignored; <style> content is compared token by
+    token and JSON-LD by value. Comments are ignored.
+    """
+    return dom_events(original) == dom_events(minified)
+
+def minify_html_checked(content):
+    """Minify a page, returning (content, ok).
+    
+    If the minified page is not DOM-equivalent to the original, the
+    original is returned with ok set to False.
+    """
+    minified = minify_html(content)
+    if minified == content:
+        return content, True
+    if not dom_equivalent(content, minified):
+        return content, False
+    return minified, True
+
+def minify_html_file(file_path):
+    """Minify a single HTML file in place."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        updated_content, ok = minify_html_checked(content)
+        if not ok:
+            print(f"⚠️  Minified DOM differs, left as is: {file_path}")
+            return False
+        if updated_content == content:
+            return False
+        
+        write_page(file_path, updated_content)
+        saved = len(content.encode('utf-8')) - len(updated_content.encode('utf-8'))
+        print(f"✅ Minified {file_path} (-{saved / 1024:.1f} KB)")
+        return saved
+    
+    except Exception as e:
+        print(f"❌ Error minifying {file_path}: {e}")
+        return False
+
+def main():
+    """Minify every HTML file under dist/."""
+    parser = argparse.ArgumentParser(description="Minify HTML pages with a DOM-equivalence check")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    html_files = sorted(args.dist.rglob("*.html"))
+    print(f"🔍 Found {len(html_files)} HTML files")
+    print("-" * 40)
+    
+    results = [page.result for page in run_pages(minify_html_file, html_files, args.jobs)]
+    
+    print("-" * 40)
+    print(f"✅ Minified {sum(1 for r in results if r)} files, "
+          f"saving {sum(r for r in results if r) / 1024:.1f} KB")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+netlify.toml Rules
+==================
+Parses the [[redirects]] and [[headers]] rules in netlify.toml so build
+stages and the preview server can predict what Netlify will answer for a
+URL without deploying.
+
+Redirect rules are tried in file order and the first match wins. `*` in
+`from` captures the rest of the path as :splat and `:name` captures one
+path segment; both are substituted into `to`. Header rules all apply to
+every path their `for` pattern matches, later rules overriding earlier ones
+for the same header.
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+NETLIFY_TOML = Path(__file__).parent / "netlify.toml"
+PLACEHOLDER_RE = re.compile(r':(\w+)')
+
+class RedirectRule(NamedTuple):
+    """One [[redirects]] entry with its `from` pattern compiled."""
+    source: str
+    to: str
+    status: int
+    force: bool
+    pattern: re.Pattern
+
+    def match(self, path):
+        """Return the rule's target for a URL path, or None if it does not match."""
+        found = self.pattern.match(path)
+        if found is None:
+            return None
+        groups = found.groupdict()
+        return PLACEHOLDER_RE.sub(lambda m: groups.get(m.group(1)) or '', self.to)
+
+    @property
+    def is_redirect(self):
+        return 300 <= self.status < 400
+
+class HeaderRule(NamedTuple):
+    """One [[headers]] entry (or _headers block) with its path pattern compiled."""
+    source: str
+    values: dict
+    pattern: re.Pattern
+
+def compile_pattern(source):
+    """Turn a Netlify `from` path into a regex with named groups."""
+    regex = ''
+    for token in re.split(r'(\*|:\w+)', source):
+        if token == '*':
+            regex += '(?P<splat>.*)'
+        elif token.startswith(':') and len(token) > 1:
+            regex += f'(?P<{token[1:]}>[^/]+)'
+        else:
+            regex += re.escape(token)
+    return re.compile(f'{regex}$')
+
+@lru_cache(maxsize=None)
+def load_netlify_config(path=NETLIFY_TOML):
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+def redirect_rules(path=NETLIFY_TOML):
+    """Return the [[redirects]] of netlify.toml as RedirectRules, in file order."""
+    return [
+        RedirectRule(rule['from'], rule['to'], int(rule.get('status', 301)),
+                     bool(rule.get('force', False)), compile_pattern(rule['from']))
+        for rule in load_netlify_config(path).get('redirects', [])
+    ]
+
+def compile_header_rules(rules):
+    """Turn [(path pattern, {header: value}), ...] into HeaderRules."""
+    return [
+        # Multi-line TOML values (such as the Link list) are sent on one line
+        HeaderRule(source, {name: ' '.join(str(value).split()) for name, value in values.items()},
+                   compile_pattern(source))
+        for source, values in rules
+    ]
+
+def header_rules(path=NETLIFY_TOML):
+    """Return the [[headers]] of netlify.toml as HeaderRules, in file order."""
+    return compile_header_rules(
+        (rule['for'], rule.get('values', {})) for rule in load_netlify_config(path).get('headers', [])
+    )
+
+def headers_for(path, rules):
+    """Merge the headers of every rule matching a URL path, later rules winning."""
+    merged = {}
+    for rule in rules:
+        if rule.pattern.match(path):
+            for name, value in rule.values.items():
+                for existing in [key for key in merged if key.lower() == name.lower()]:
+                    del merged[existing]
+                merged[name] = value
+    return merged
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Generated Netlify _headers Sections
+===================================
+Build stages that need per-file response headers (immutable caching for
+fingerprinted assets, Link preloads for individual pages) write them to
+dist/_headers, which Netlify applies alongside the [[headers]] rules in
+netlify.toml.
+
+Each stage owns one section, delimited by BEGIN/END comments carrying its
+name, and only ever replaces that section, so stages can run in any order
+and hand-written rules in the file are kept.
+"""
+
+import re
+from pathlib import Path
+
+from page_stream import write_page
+
+HEADERS_FILE = "_headers"
+
+def format_rules(rules):
+    """Format [(path, {header: value}), ...] in Netlify _headers syntax."""
+    lines = []
+    for path, headers in rules:
+        lines.append(path)
+        lines.extend(f"  {name}: {value}" for name, value in headers.items())
+    return lines
+
+def write_headers_section(dist_dir, section, rules):
+    """Replace one generated section of dist/_headers, keeping everything else.
+    
+    An empty rule list removes the section. Returns the path of the file.
+    """
+    path = Path(dist_dir) / HEADERS_FILE
+    try:
+        text = path.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        text = ''
+    
+    begin, end = f"# BEGIN {section}", f"# END {section}"
+    text = re.sub(rf'{re.escape(begin)}\n.*?{re.escape(end)}\n?', '', text, flags=re.DOTALL)
+    # Close the gap the section leaves so blank lines do not pile up run after run
+    text = re.sub(r'\n{3,}', '\n\n', text).lstrip('\n')
+    if rules:
+        block = '\n'.join([begin, *format_rules(rules), end]) + '\n'
+        text = f"{text.rstrip()}\n\n{block}" if text.strip() else block
+    
+    write_page(path, text)
+    return path
+
+def read_headers_file(dist_dir):
+    """Parse dist/_headers into [(path, {header: value}), ...], in file order."""
+    try:
+        text = (Path(dist_dir) / HEADERS_FILE).read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return []
+    rules = []
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        if not line[0].isspace():
+            rules.append((line.strip(), {}))
+        elif rules and ':' in line:
+            name, value = line.split(':', 1)
+            rules[-1][1][name.strip()] = value.strip()
+    return rules
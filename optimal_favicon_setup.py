@@ -1,85 +1,132 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
-import re
 from pathlib import Path
 
+from fingerprint_assets import source_url
+from html_tree import parse_html
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+
+# rel values of the links the favicon block replaces
+FAVICON_RELS = ('icon', 'shortcut icon', 'apple-touch-icon', 'manifest')
+FAVICON_COMMENT = '<!-- Favicon -->'
+
+# Fallback insertion points when a page has no favicon at all
+INSERT_SELECTORS = [
+    'head link[rel=canonical]',
+    'head meta[name=theme-color]',
+]
+
+# Optimal favicon setup
+OPTIMAL_FAVICON_TAGS = [
+    '<link rel="icon" type="image/x-icon" href="/favicon.ico">',
+    '<link rel="icon" type="image/png" sizes="16x16" href="/images/favicon.icon.png">',
+    '<link rel="icon" type="image/png" sizes="32x32" href="/images/favicon.icon.png">',
+    '<link rel="icon" type="image/png" sizes="96x96" href="/images/favicon-96x96.png">',
+    '<link rel="apple-touch-icon" sizes="180x180" href="/images/apple-touch-icon.png">',
+    '<link rel="manifest" href="/site.webmanifest">',
+]
+
+OPTIMAL_FAVICON_MINIFIED = ''.join(OPTIMAL_FAVICON_TAGS)
+
+def optimal_favicon_spaced(indent='    '):
+    return ''.join(f"{indent}{line}\n" for line in [FAVICON_COMMENT] + OPTIMAL_FAVICON_TAGS)
+
+def favicon_links(document):
+    """Return every favicon, touch icon and manifest link in the <head>."""
+    return [el for el in document.select('head link[rel]')
+            if el.attrs['rel'].lower() in FAVICON_RELS and not el.has_ancestor('noscript')]
+
+def unhashed_html(document, link):
+    """Return a link's source text with a fingerprinted href mapped back to its source URL."""
+    href = link.attrs.get('href', '')
+    return document.html(link).replace(f'"{href}"', f'"{source_url(href)}"', 1)
+
+def apply_favicon_setup(content):
+    """Replace or insert the favicon block in a page.
+    
+    The block goes where the first favicon link was, one tag per line if
+    that link starts its own line, otherwise on one line; any other favicon
+    links and the old Favicon comment are removed. Returns the
+    content unchanged if the page already has exactly the optimal links
+    (fingerprinted copies of them included), or has no favicon and no
+    insertion point.
+    """
+    document = parse_html(content)
+    links = favicon_links(document)
+    splices = document.edit()
+    
+    if links:
+        if [unhashed_html(document, el) for el in links] == OPTIMAL_FAVICON_TAGS:
+            return content
+        first = links[0]
+        comment = document.preceding_comment(first)
+        if comment and comment.data.strip() == 'Favicon':
+            splices.remove(*splices.line_span(comment.start, comment.end))
+        # Links directly following the first are replaced along with it
+        end = first.end
+        rest = []
+        for link in links[1:]:
+            if rest or content[end:link.start].strip():
+                rest.append(link)
+            else:
+                end = link.end
+        
+        indent = splices.indent(first.start)
+        if indent is None:
+            splices.replace(first.start, end, OPTIMAL_FAVICON_MINIFIED)
+        else:
+            splices.replace(first.start - len(indent), splices.line_end(end), optimal_favicon_spaced(indent))
+        for link in rest:
+            splices.remove_element(link)
+        return splices.apply()
+    
+    # If no existing favicon found, try to add after canonical or theme-color
+    for selector in INSERT_SELECTORS:
+        anchor = document.select_one(selector)
+        if anchor is None:
+            continue
+        indent = splices.indent(anchor.start)
+        if indent is None:
+            splices.insert(anchor.end, OPTIMAL_FAVICON_MINIFIED)
+        else:
+            splices.insert(splices.line_end(anchor.end), f"\n{optimal_favicon_spaced(indent)}")
+        return splices.apply()
+    
+    return content
+
 def update_favicon_in_file(file_path):
     """Update favicon declarations in an HTML file with comprehensive setup."""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        # Pattern to find existing favicon sections (various formats)
-        patterns = [
-            # Spaced HTML format
-            r'    <!-- Favicon -->\s*\n(?:    <link[^>]*(?:favicon|icon)[^>]*>\s*\n)*',
-            # Single favicon line (spaced)
-            r'    <link rel="icon"[^>]*href="[^"]*favicon[^"]*"[^>]*>\s*\n',
-            # Minified format
-            r'<link rel="icon"[^>]*href="[^"]*favicon[^"]*"[^>]*>',
-        ]
-        
-        # Optimal favicon setup
-        optimal_favicon_spaced = """    <!-- Favicon -->
-    <link rel="icon" type="image/x-icon" href="/favicon.ico">
-    <link rel="icon" type="image/png" sizes="16x16" href="/images/favicon.icon.png">
-    <link rel="icon" type="image/png" sizes="32x32" href="/images/favicon.icon.png">
-    <link rel="icon" type="image/png" sizes="96x96" href="/images/favicon-96x96.png">
-    <link rel="apple-touch-icon" sizes="180x180" href="/images/apple-touch-icon.png">
-    <link rel="manifest" href="/site.webmanifest">
-"""
-        
-        optimal_favicon_minified = '<link rel="icon" type="image/x-icon" href="/favicon.ico"><link rel="icon" type="image/png" sizes="16x16" href="/images/favicon.icon.png"><link rel="icon" type="image/png" sizes="32x32" href="/images/favicon.icon.png"><link rel="icon" type="image/png" sizes="96x96" href="/images/favicon-96x96.png"><link rel="apple-touch-icon" sizes="180x180" href="/images/apple-touch-icon.png"><link rel="manifest" href="/site.webmanifest">'
+        updated_content = apply_favicon_setup(content)
+        updated = updated_content != content
         
-        updated = False
-        
-        # Check if file is minified (no newlines in head section)
-        head_section = re.search(r'<head[^>]*>.*?</head>', content, re.DOTALL)
-        is_minified = head_section and '\n' not in head_section.group(0)[:200]
-        
-        for pattern in patterns:
-            if re.search(pattern, content):
-                if is_minified:
-                    # For minified files, replace with minified favicon
-                    updated_content = re.sub(pattern, optimal_favicon_minified, content, count=1)
-                else:
-                    # For formatted files, use spaced version
-                    updated_content = re.sub(pattern, optimal_favicon_spaced, content, count=1)
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(updated_content)
-                print(f"✅ Updated favicon in: {file_path.name}")
-                updated = True
-                break
-        
-        if not updated:
-            # If no existing favicon found, try to add after canonical or theme-color
-            canonical_pattern = r'(<link rel="canonical"[^>]*>\s*\n)'
-            theme_pattern = r'(<meta name="theme-color"[^>]*>\s*\n)'
-            
-            for insert_pattern in [canonical_pattern, theme_pattern]:
-                if re.search(insert_pattern, content):
-                    insertion = f'\\1\n{optimal_favicon_spaced}'
-                    updated_content = re.sub(insert_pattern, insertion, content, count=1)
-                    
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(updated_content)
-                    print(f"✅ Added favicon to: {file_path.name}")
-                    updated = True
-                    break
-            
-            if not updated:
-                print(f"⚠️  Could not find insertion point in: {file_path.name}")
+        if updated:
+            write_page(file_path, updated_content)
+            print(f"✅ Updated favicon in: {file_path.name}")
+        elif favicon_links(parse_html(content)):
+            print(f"✅ Favicon already up to date in: {file_path.name}")
+            updated = True
+        else:
+            print(f"⚠️  Could not find insertion point in: {file_path.name}")
         
         return updated
-            
+    
     except Exception as e:
         print(f"❌ Error updating {file_path}: {e}")
         return False
 
 def main():
     """Apply optimal favicon setup to all HTML files."""
+    parser = argparse.ArgumentParser(description="Apply optimal favicon setup to all HTML files")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
     dist_dir = Path("c:/Users/Yahya/Downloads/promptmakers-blog-dist/dist")
     
     if not dist_dir.exists():
@@ -97,14 +144,14 @@ def main():
     print("=" * 60)
     
     # Find all HTML files
-    html_files = list(dist_dir.rglob("*.html"))
+    html_files = sorted(dist_dir.rglob("*.html"))
     
     print(f"\n🔍 Found {len(html_files)} HTML files to update")
     print("-" * 40)
     
     updated_count = 0
-    for html_file in html_files:
-        if update_favicon_in_file(html_file):
+    for page in run_pages(update_favicon_in_file, html_files, args.jobs):
+        if page.result:
             updated_count += 1
     
     print("-" * 40)
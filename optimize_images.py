@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Responsive Image Pipeline
+=========================
+Generates 400/800/1200px-wide AVIF, WebP and JPEG variants of every photo in
+dist/images and rewrites each <picture> element to offer them through
+srcset/sizes, so phones stop downloading desktop-sized hero images.
+
+Variants live in dist/images/responsive/ next to a cache keyed by the SHA-256
+of each source image; unchanged sources are never re-encoded. Encoding needs
+Pillow (pip install pillow); AVIF needs Pillow 11.2+ or the pillow-avif-plugin
+package and is skipped when neither is available.
+"""
+
+import argparse
+import io
+from functools import lru_cache, partial
+from pathlib import Path
+
+from fingerprint_assets import is_fingerprinted, source_url
+from html_tree import parse_html, set_attribute
+from page_manifest import hash_bytes, load_json_cache, save_json_cache
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    import pillow_avif  # noqa: F401 - registers the AVIF plugin on older Pillow
+except ImportError:
+    pass
+
+WIDTHS = (400, 800, 1200)
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg')
+RESPONSIVE_DIR = "images/responsive"
+CACHE_NAME = ".image-cache.json"
+CACHE_VERSION = 1
+
+# format -> (Pillow format, file extension, MIME type, save options)
+FORMATS = {
+    'avif': ('AVIF', 'avif', 'image/avif', {'quality': 50, 'speed': 4}),
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Rendered width of a picture, keyed by the class of the element wrapping it
+SIZES = {
+    'article-hero': '(max-width: 1200px) 100vw, 1200px',
+    'post-image': '(max-width: 800px) 100vw, 600px',
+    'article-image': '(max-width: 800px) 100vw, 600px',
+    'related-image': '(max-width: 700px) 100vw, 400px',
+}
+DEFAULT_SIZES = '100vw'
+
+def available_formats():
+    """Return the output formats the installed Pillow can write."""
+    if Image is None:
+        return ()
+    extensions = Image.registered_extensions()
+    return tuple(fmt for fmt, (_, ext, _, _) in FORMATS.items() if f'.{ext}' in extensions)
+
+def variant_widths(source_width):
+    """Return the widths to generate for a source image, never upscaling."""
+    widths = [w for w in WIDTHS if w < source_width]
+    widths.append(min(source_width, WIDTHS[-1]))
+    return sorted(set(widths))
+
+def cache_path(dist_dir):
+    return Path(dist_dir) / RESPONSIVE_DIR / CACHE_NAME
+
+def is_cached(entry, digest, formats, dist_dir):
+    """Check that a cache entry matches the source and all its files exist."""
+    if entry is None or entry.get('hash') != digest:
+        return False
+    if any(fmt not in entry['variants'] for fmt in formats):
+        return False
+    return all((Path(dist_dir) / url.lstrip('/')).exists()
+               for fmt in formats for _, url in entry['variants'][fmt])
+
+def encode_image(item, dist_dir, formats):
+    """Write the width variants of one source image.
+    
+    item is (source_path, cached_entry). Returns (status, entry) where status
+    is 'cached' or 'encoded' and entry records the source hash, its
+    intrinsic size and the (width, url) list for every format.
+    """
+    source, entry = item
+    dist_dir = Path(dist_dir)
+    with open(source, 'rb') as f:
+        digest = hash_bytes(f.read())
+    if is_cached(entry, digest, formats, dist_dir):
+        return 'cached', entry
+    
+    out_dir = dist_dir / RESPONSIVE_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original).convert('RGB')
+    width, height = image.size
+    variants = {fmt: [] for fmt in formats}
+    for target_width in variant_widths(width):
+        if target_width < width:
+            target_height = round(height * target_width / width)
+            resized = image.resize((target_width, target_height), Image.LANCZOS)
+        else:
+            resized = image
+        for fmt in formats:
+            pil_format, ext, _, options = FORMATS[fmt]
+            name = f"{source.stem}-{target_width}w.{ext}"
+            encoded = io.BytesIO()
+            resized.save(encoded, pil_format, **options)
+            write_page(out_dir / name, encoded.getvalue())
+            variants[fmt].append((target_width, f"/{RESPONSIVE_DIR}/{name}"))
+    
+    print(f"🖼  Encoded {source.name}: {len(variants[formats[0]])} widths × {len(formats)} formats")
+    return 'encoded', {'hash': digest, 'width': width, 'height': height, 'variants': variants}
+
+def find_sources(dist_dir):
+    """Return every source photo under dist/images, excluding generated variants
+    and the content-hashed copies written by fingerprint_assets.py."""
+    images_dir = Path(dist_dir) / "images"
+    return sorted(
+        path for path in images_dir.glob("*")
+        if path.is_file() and path.suffix.lower() in SOURCE_EXTENSIONS and not is_fingerprinted(path)
+    )
+
+def generate_variants(dist_dir, jobs=1):
+    """Encode missing or outdated variants and rewrite the cache.
+    
+    Returns the number of images (re-)encoded, or None if Pillow is missing.
+    """
+    dist_dir = Path(dist_dir)
+    formats = available_formats()
+    if not formats:
+        print("⚠️  Pillow not installed - skipping image variants (pip install pillow)")
+        return None
+    if 'avif' not in formats:
+        print("⚠️  No AVIF encoder available - writing WebP and JPEG only (pip install pillow-avif-plugin)")
+    
+    path = cache_path(dist_dir)
+    cache = load_json_cache(path, CACHE_VERSION, 'images')
+    sources = find_sources(dist_dir)
+    items = [(source, cache.get(source.relative_to(dist_dir).as_posix())) for source in sources]
+    worker = partial(encode_image, dist_dir=dist_dir, formats=formats)
+    
+    updated = {}
+    encoded = 0
+    for page in run_pages(worker, items, jobs):
+        if not page.result:
+            continue
+        status, entry = page.result
+        updated[page.path[0].relative_to(dist_dir).as_posix()] = entry
+        encoded += status == 'encoded'
+    
+    path.parent.mkdir(parents=True, exist_ok=True)
+    save_json_cache(path, CACHE_VERSION, 'images', updated)
+    load_variants.cache_clear()
+    return encoded
+
+@lru_cache(maxsize=None)
+def load_variants(dist_dir):
+    """Return the image cache for a dist directory (cached per process)."""
+    return load_json_cache(cache_path(dist_dir), CACHE_VERSION, 'images')
+
+def wrapper_classes(element):
+    """Return the classes of the element wrapping an <img> or <picture>, looking past the <picture>."""
+    node = element.parent
+    while node is not None and node.tag == 'picture':
+        node = node.parent
+    return node.classes if node is not None else []
+
+def picture_sizes(picture):
+    """Pick the sizes attribute for a <picture> from the class of its wrapper."""
+    for class_name in wrapper_classes(picture):
+        if class_name in SIZES:
+            return SIZES[class_name]
+    return DEFAULT_SIZES
+
+def leading_space(content, pos):
+    """Return the spaces and tabs directly before pos."""
+    start = pos
+    while start > 0 and content[start - 1] in ' \t':
+        start -= 1
+    return content[start:pos]
+
+def srcset(variants):
+    return ', '.join(f"{url} {width}w" for width, url in variants)
+
+def responsive_pictures(content, images):
+    """Rewrite every <picture> whose image has variants in `images`.
+    
+    The <img> keeps its original src (hashed or not) as the fallback and
+    gains the JPEG srcset. AVIF and WebP <source> elements pointing at the
+    variants replace the ones written by an earlier run. The author's own
+    <source> elements are kept: those with a media query first, so art
+    direction still wins, and the rest after the variants.
+    """
+    document = parse_html(content)
+    splices = document.edit()
+    for picture in document.select('picture'):
+        img = next((el for el in picture.iter() if el.tag == 'img'), None)
+        if img is None:
+            continue
+        src = img.attrs.get('src', '').split('?')[0]
+        entry = images.get(src.lstrip('/')) or images.get(source_url(src).lstrip('/'))
+        if entry is None:
+            continue
+        
+        sizes = picture_sizes(picture)
+        indent = leading_space(content, img.start)
+        authored = [el for el in picture.iter()
+                    if el.tag == 'source' and f"/{RESPONSIVE_DIR}/" not in el.attrs.get('srcset', '')]
+        lines = [f'\n{indent}{document.html(el)}' for el in authored if 'media' in el.attrs]
+        for fmt in ('avif', 'webp'):
+            if entry['variants'].get(fmt):
+                mime = FORMATS[fmt][2]
+                lines.append(f'\n{indent}<source type="{mime}" srcset="{srcset(entry["variants"][fmt])}" sizes="{sizes}">')
+        lines.extend(f'\n{indent}{document.html(el)}' for el in authored if 'media' not in el.attrs)
+        tag = document.html(img)
+        if entry['variants'].get('jpeg'):
+            tag = set_attribute(set_attribute(tag, 'srcset', srcset(entry['variants']['jpeg'])), 'sizes', sizes)
+        lines.append(f'\n{indent}{tag}')
+        body = document.inner_html(picture)
+        lines.append(body[len(body.rstrip()):])
+        splices.replace(picture.inner_start, picture.inner_end, ''.join(lines))
+    
+    return splices.apply() if splices else content
+
+def responsive_pictures_file(file_path, dist_dir):
+    """Apply the responsive <picture> rewrite to a single HTML file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        updated_content = responsive_pictures(content, load_variants(str(dist_dir)))
+        if updated_content == content:
+            return False
+        
+        write_page(file_path, updated_content)
+        print(f"✅ Updated pictures in: {file_path}")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error updating {file_path}: {e}")
+        return False
+
+def main():
+    """Generate responsive image variants and point <picture> elements at them."""
+    parser = argparse.ArgumentParser(description="Generate srcset variants and rewrite <picture> elements")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    parser.add_argument('--no-rewrite', action='store_true',
+                        help="Only generate variants; leave the HTML alone")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("🖼  RESPONSIVE IMAGES")
+    print("=" * 60)
+    encoded = generate_variants(args.dist, args.jobs)
+    if encoded is None:
+        return 1
+    images = load_variants(str(args.dist))
+    print(f"✅ {len(images)} source images, {encoded} re-encoded, {len(images) - encoded} cached")
+    
+    if args.no_rewrite:
+        return 0
+    
+    html_files = sorted(args.dist.rglob("*.html"))
+    print("-" * 40)
+    worker = partial(responsive_pictures_file, dist_dir=args.dist)
+    updated_count = sum(1 for page in run_pages(worker, html_files, args.jobs) if page.result)
+    print("-" * 40)
+    print(f"✅ Updated <picture> elements in {updated_count} of {len(html_files)} files")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
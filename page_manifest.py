@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Content-hash manifest for incremental post-processing.
+
+Records, for every page the engine has seen, the hash of the page before and
+after processing, the file size and mtime it was left with, and the versions
+of the transforms that ran on it. A page whose recorded state still matches
+can be skipped without being read into the regex engine.
+
+load_json_cache()/save_json_cache() read and write the versioned JSON files
+this manifest and the other stages' caches share: {"version": N, key:
+{...}}, discarded as a whole when the version changes.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from page_stream import hash_bytes, new_hash, write_if_changed  # noqa: F401 - re-exported
+
+MANIFEST_NAME = ".postprocess-manifest.json"
+MANIFEST_VERSION = 1
+
+def load_json_cache(path, version, key):
+    """Return the entries stored under key in a versioned JSON file, or {} if missing, unreadable or stale."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if data.get('version') != version:
+        return {}
+    return data.get(key, {})
+
+def save_json_cache(path, version, key, entries):
+    """Write entries under key in a versioned JSON file, sorted for stable diffs.
+    
+    The file is replaced atomically, and not at all if it already holds the
+    same entries. Returns whether it was written.
+    """
+    text = json.dumps({'version': version, key: dict(sorted(entries.items()))}, ensure_ascii=False, indent=1)
+    return write_if_changed(path, text + '\n')
+
+def load_manifest(path):
+    """Load the page entries from a manifest file, or {} if missing or stale."""
+    return load_json_cache(path, MANIFEST_VERSION, 'pages')
+
+def save_manifest(path, pages):
+    """Write the page entries to a manifest file."""
+    save_json_cache(path, MANIFEST_VERSION, 'pages', pages)
+
+def inputs_digest(data):
+    """Return a short stable hash of JSON-serializable transform inputs."""
+    return hash_bytes(json.dumps(data, sort_keys=True, default=str).encode('utf-8'))[:16]
+
+def transform_signature(transforms, inputs=None):
+    """Map each transform name to its version, in run order.
+    
+    inputs maps transform names to the digest of the external data they
+    read (see postprocess.register_transform's `depends`); a transform
+    with one is recorded as "version:digest", so a change to that data
+    invalidates every page it ran on.
+    """
+    inputs = inputs or {}
+    return {t.name: f"{t.version}:{inputs[t.name]}" if inputs.get(t.name) else t.version for t in transforms}
+
+def stat_matches(entry, file_path):
+    """Check a file's size and mtime against an entry without reading it."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return False
+    return entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns
+
+def make_entry(file_path, input_hash, output_hash, signature):
+    """Build a manifest entry for a page that was just processed."""
+    st = os.stat(file_path)
+    return {
+        'input': input_hash,
+        'output': output_hash,
+        'transforms': signature,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+    }
+
+def default_manifest_path(dist_dir):
+    """Return where the manifest lives for a given dist directory."""
+    return Path(dist_dir) / MANIFEST_NAME
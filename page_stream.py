@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Atomic and Streaming Page Writes
+================================
+Every page write goes to a temporary file next to the page, which then
+replaces it with os.replace(). A run that crashes or is killed mid-write
+leaves the old page in place, and a deploy or server reading dist/
+concurrently sees either the old page or the new one, never half of it.
+Temporary names are dotfiles carrying the process id (.index.html.1234.tmp),
+so two runs over the same tree never write to each other's temporary file
+and one left behind by a killed run is not uploaded by a deploy.
+remove_stale_temps() clears such leftovers at the start of a run. Caches,
+manifests and generated files are written through write_page() too, so no
+tool leaves a visible temporary file behind.
+
+stream_page() rewrites only a page's <head>. It reads the file in
+CHUNK_SIZE blocks until `</head>` turns up, hands the head to the rewrite
+and then copies the rest of the file through block by block. Memory stays
+flat however large the page's body is, which matters for generated archive
+and tag pages running to several megabytes.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import time
+from functools import partial
+from typing import NamedTuple
+
+CHUNK_SIZE = 64 * 1024
+# A page whose <head> is not closed within this many bytes is not streamed
+MAX_HEAD_BYTES = 4 * 1024 * 1024
+HEAD_END_RE = re.compile(rb'</head\s*>', re.IGNORECASE)
+# How far back to look for a `</head>` split across two chunks
+HEAD_END_OVERLAP = 32
+# Temporary files untouched for this long belong to no live run
+STALE_TEMP_SECONDS = 60 * 60
+
+class StreamResult(NamedTuple):
+    """Hashes and sizes of a page streamed through a head rewrite."""
+    input_hash: str
+    output_hash: str
+    bytes_in: int
+    bytes_out: int
+
+def new_hash():
+    """Return a running hash object for content fed in chunks, matching hash_bytes()."""
+    return hashlib.sha256()
+
+def hash_bytes(data):
+    """Return the hex SHA-256 digest of some bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+def temp_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+
+def remove_stale_temps(directory, max_age=STALE_TEMP_SECONDS):
+    """Delete *.tmp files under directory not modified for max_age seconds.
+    
+    Returns how many were removed. Recent ones are left alone, as they may
+    belong to a run still in progress.
+    """
+    cutoff = time.time() - max_age
+    removed = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith('.tmp'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+def write_page(path, data):
+    """Replace a file with data (str or bytes) atomically, keeping its permissions."""
+    tmp_path = temp_path(path)
+    try:
+        if isinstance(data, bytes):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        else:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_if_changed(path, text):
+    """Write text with write_page() unless the file already holds it; return whether it was written."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    write_page(path, text)
+    return True
+
+def read_head(f):
+    """Read a binary file up to and including its `</head>` tag.
+    
+    Returns (head, rest) where rest holds whatever was read past the tag,
+    or (None, everything read) if there is no `</head>` in the first
+    MAX_HEAD_BYTES.
+    """
+    buffer = bytearray()
+    while len(buffer) < MAX_HEAD_BYTES:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        search_from = max(0, len(buffer) - HEAD_END_OVERLAP)
+        buffer += chunk
+        match = HEAD_END_RE.search(buffer, search_from)
+        if match:
+            return bytes(buffer[:match.end()]), bytes(buffer[match.end():])
+    return None, bytes(buffer)
+
+def stream_page(path, rewrite):
+    """Rewrite a page's <head> with rewrite(head_text) and copy the body through.
+    
+    The page is only written, atomically, if the head changed. Returns a
+    StreamResult (output_hash equals input_hash and bytes_out is 0 when
+    nothing was written), or None if the page has no `</head>` to stop at
+    and has to be rewritten whole.
+    """
+    input_hash = new_hash()
+    with open(path, 'rb') as f:
+        head, rest = read_head(f)
+        if head is None:
+            return None
+        text = head.decode('utf-8')
+        updated = rewrite(text)
+        input_hash.update(head)
+        input_hash.update(rest)
+        bytes_in = len(head) + len(rest)
+        chunks = iter(partial(f.read, CHUNK_SIZE), b'')
+        
+        if updated == text:
+            for chunk in chunks:
+                input_hash.update(chunk)
+                bytes_in += len(chunk)
+            digest = input_hash.hexdigest()
+            return StreamResult(digest, digest, bytes_in, 0)
+        
+        output_hash = new_hash()
+        tmp_path = temp_path(path)
+        try:
+            with open(tmp_path, 'wb') as out:
+                for chunk in (updated.encode('utf-8'), rest):
+                    output_hash.update(chunk)
+                    out.write(chunk)
+                for chunk in chunks:
+                    input_hash.update(chunk)
+                    output_hash.update(chunk)
+                    out.write(chunk)
+                    bytes_in += len(chunk)
+                bytes_out = out.tell()
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    # Replaced after the page is closed, which Windows requires
+    shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
+    return StreamResult(input_hash.hexdigest(), output_hash.hexdigest(), bytes_in, bytes_out)
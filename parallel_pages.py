@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Parallel page runner shared by the HTML fixers.
+
+Spreads independent per-file work across a process pool and hands the
+results back in input order, so summaries and logs are identical no matter
+how many workers ran.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import partial
+from typing import Any, NamedTuple
+
+class PageResult(NamedTuple):
+    """Outcome of running a fixer on one file."""
+    path: Any
+    result: Any
+    output: str
+
+def add_jobs_argument(parser):
+    """Add the shared --jobs option to an argparse parser."""
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help="Process pages with N worker processes (0 = one per CPU core)")
+
+def resolve_jobs(jobs):
+    """Turn a --jobs value into a worker count."""
+    if jobs is None or jobs < 0:
+        return 1
+    if jobs == 0:
+        return os.cpu_count() or 1
+    return jobs
+
+def _call_captured(func, path):
+    """Run func(path) and capture whatever it prints."""
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        try:
+            result = func(path)
+        except Exception as e:
+            print(f"❌ Error processing {path}: {e}")
+            result = False
+    return PageResult(path, result, buffer.getvalue())
+
+def run_pages(func, paths, jobs=1, echo=True):
+    """Call func(path) for every path, optionally across a process pool.
+    
+    func must be a module-level function so it can be pickled. Results are
+    returned as PageResult tuples in the same order as paths; with echo set,
+    each file's captured output is printed in that order as well.
+    """
+    paths = list(paths)
+    jobs = min(resolve_jobs(jobs), max(len(paths), 1))
+    worker = partial(_call_captured, func)
+    
+    if jobs == 1:
+        results = map(worker, paths)
+    else:
+        chunksize = max(1, len(paths) // (jobs * 4))
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        results = executor.map(worker, paths, chunksize=chunksize)
+    
+    collected = []
+    try:
+        for page_result in results:
+            if echo and page_result.output:
+                print(page_result.output, end='')
+            collected.append(page_result)
+    finally:
+        if jobs > 1:
+            executor.shutdown()
+    return collected
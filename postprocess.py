@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Single-Pass Post-Processing Engine
+==================================
+Loads each HTML page in dist/ once, runs every registered transform on the
+in-memory document in order, and writes the page back once if anything changed.
+
+The fixer scripts (fix_css_references, optimize_font_loading,
+optimal_favicon_setup, fix_twitter_images, fix_search_script) register their
+content-level functions here as transforms.
+"""
+
+import argparse
+import cProfile
+import time
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import Callable, NamedTuple, Optional
+
+from build_search_index import OLD_SEARCH_SCRIPT, use_search_index, write_search_index
+from critical_css import extract_critical_css
+from early_hints import remove_duplicate_preloads, write_early_hints
+from fingerprint_assets import fingerprint_assets, fingerprint_references, load_fingerprints
+from fix_css_references import (ASTRO_STYLESHEETS, CSS_MARKER, inline_blog_post_css, link_blog_post_css,
+                                write_post_stylesheet)
+from fix_search_script import SEARCH_SCRIPT, remove_search_script
+from fix_twitter_images import OLD_IMAGE_PREFIX, fix_twitter_image_content
+from image_hints import add_image_hints, load_dimensions, measure_images
+from optimal_favicon_setup import apply_favicon_setup
+from minify_html import minify_html_checked
+from optimize_font_loading import FONT_COMMENT, optimize_font_loading_content
+from optimize_images import generate_variants, load_variants, responsive_pictures
+from page_manifest import (default_manifest_path, hash_bytes, inputs_digest, load_manifest, make_entry,
+                           save_manifest, stat_matches, transform_signature)
+from page_stream import remove_stale_temps, stream_page, write_page
+from parallel_pages import add_jobs_argument, resolve_jobs, run_pages
+from prefilter import find_anchors, normalize_anchors, pending_anchors
+from resolve_links import load_route_table, resolve_links, resolve_site_files
+from run_report import RunReport, collect_notes, warn
+from self_host_fonts import build_fonts, load_fonts, self_host_fonts
+from service_worker import register_service_worker, write_service_worker
+from site_metadata import build_site_metadata, load_image_mappings
+
+DIST_DIR = Path(__file__).parent / "dist"
+
+class Transform(NamedTuple):
+    """A content rewrite applied to every page matching one of its patterns."""
+    name: str
+    func: Callable[[str, str, Path], str]
+    pages: tuple = ('*.html',)
+    version: int = 1
+    prepare: Optional[Callable[[Path], object]] = None
+    default: bool = True
+    finish: Optional[Callable[[Path], object]] = None
+    anchors: Optional[frozenset] = None
+    scope: str = 'page'
+    depends: Optional[Callable[[Path], object]] = None
+
+TRANSFORMS = []
+
+def register_transform(name, func, pages=('*.html',), version=1, prepare=None, default=True, finish=None,
+                       anchors=None, scope='page', depends=None):
+    """Register a transform to run on every page matching `pages`.
+    
+    `func(content, page, dist_dir)` receives the page text, its path
+    relative to dist/ (e.g. 'blog/my-post/index.html') and the dist
+    directory itself, and returns the new text.
+    Transforms run in registration order. `prepare(dist_dir)`, if given, is
+    called once before any page is processed and `finish(dist_dir)` once
+    after every page has been written. Transforms registered with
+    default=False only run when selected by name.
+    
+    `anchors`, if given, lists literal strings of which at least one must
+    occur in a page (case-insensitively) for the transform to be able to
+    change it; on other pages it is skipped without being called.
+    
+    scope='head' declares that the transform only ever reads and changes
+    the <head>: it is then called with the page text up to and including
+    `</head>`, and a run made only of such transforms streams the body
+    through instead of loading it.
+    
+    `depends(dist_dir)`, if given, returns the external data the transform
+    reads besides the page (a map written by a prepare step, say) as
+    something JSON-serializable. It is called once per run, after the
+    prepare steps, and its digest is part of the manifest signature, so
+    pages are reprocessed when that data changes.
+    """
+    if scope not in ('page', 'head'):
+        raise ValueError(f"Unknown transform scope: {scope}")
+    transform = Transform(name, func, tuple(pages), version, prepare, default, finish,
+                          normalize_anchors(anchors), scope, depends)
+    TRANSFORMS.append(transform)
+    return transform
+
+def get_transforms(names=None):
+    """Return the default transforms, or the ones named in `names`."""
+    if names is None:
+        return [t for t in TRANSFORMS if t.default]
+    unknown = set(names) - {t.name for t in TRANSFORMS}
+    if unknown:
+        raise ValueError(f"Unknown transform(s): {', '.join(sorted(unknown))}")
+    return [t for t in TRANSFORMS if t.name in names]
+
+def applies_to(transform, page):
+    """Check whether a transform's page patterns match a dist-relative path."""
+    path = PurePosixPath(page)
+    return any(path.match(pattern) for pattern in transform.pages)
+
+def apply_transforms(content, page, dist_dir, transforms, stats):
+    """Run transforms over some page text in order. Returns (content, applied).
+    
+    Appends a (name, seconds, bytes before, bytes after, changed, notes) row
+    per transform called to stats['transforms'], notes holding the warnings
+    it raised through run_report.warn(), and counts the transforms the
+    anchor prefilter skipped in stats['prefiltered'].
+    """
+    size = len(content.encode('utf-8'))
+    applied = []
+    timings = stats.setdefault('transforms', [])
+    stats.setdefault('prefiltered', 0)
+    pending = pending_anchors(transforms)
+    present = None
+    for transform, anchors in zip(transforms, pending):
+        if transform.anchors is not None:
+            # Scan once, and again only after a transform changed the page
+            if present is None:
+                present = find_anchors(content, anchors)
+            if not present & transform.anchors:
+                stats['prefiltered'] += 1
+                continue
+        with collect_notes() as notes:
+            start = time.perf_counter()
+            updated = transform.func(content, page, dist_dir)
+            seconds = time.perf_counter() - start
+        changed = updated != content
+        new_size = len(updated.encode('utf-8')) if changed else size
+        timings.append((transform.name, seconds, size, new_size, changed, notes))
+        if changed:
+            applied.append(transform.name)
+            content, size = updated, new_size
+            present = None
+    return content, applied
+
+def stream_transforms(file_path, page, dist_dir, transforms, entry, signature, fresh, stats):
+    """Process a page whose transforms are all head-scoped without loading its body.
+    
+    Returns the process_page() result, or None if the page has no </head>.
+    """
+    applied = []
+
+    def rewrite(head):
+        updated, names = apply_transforms(head, page, dist_dir, transforms, stats)
+        applied.extend(names)
+        return updated
+    
+    start = time.perf_counter()
+    result = stream_page(file_path, rewrite)
+    if result is None:
+        return None
+    stats['bytes_in'] = result.bytes_in
+    stats['bytes_out'] = result.bytes_out
+    stats['stream_seconds'] = round(time.perf_counter() - start, 6)
+    if result.output_hash != result.input_hash:
+        return 'processed', applied, make_entry(file_path, result.input_hash, result.output_hash, signature), stats
+    if fresh and result.input_hash == entry['output']:
+        return 'skipped', [], make_entry(file_path, entry['input'], result.input_hash, signature), stats
+    return 'unchanged', applied, make_entry(file_path, result.input_hash, result.input_hash, signature), stats
+
+def process_page(file_path, dist_dir, transforms, entry=None, inputs=None):
+    """Run all applicable transforms on one page, reading and writing it once.
+    
+    entry is the page's record from the previous run's manifest, if any. A
+    page whose size and mtime, or content hash, still match that record and
+    whose transform set is unchanged is skipped. inputs maps transform names
+    to the digest of their `depends` data; a changed digest counts as a
+    changed transform set. When every applicable
+    transform is head-scoped the page is streamed (see page_stream.py)
+    instead of read whole; either way it is replaced atomically.
+    
+    Returns a (status, applied, entry, stats) tuple where status is
+    'processed', 'unchanged', 'skipped' or 'error', applied lists the
+    transforms that changed the page (or the error message), entry is the
+    page's new manifest record and stats holds the bytes read and written,
+    the read/write time and a (name, seconds, bytes before, bytes after,
+    changed, notes) row per transform, for the run report, and the number
+    of transforms the anchor prefilter skipped.
+    """
+    page = file_path.relative_to(dist_dir).as_posix()
+    page_transforms = [t for t in transforms if applies_to(t, page)]
+    signature = transform_signature(page_transforms, inputs)
+    fresh = entry is not None and entry.get('transforms') == signature
+    stats = {'bytes_in': 0, 'bytes_out': 0}
+    
+    if fresh and stat_matches(entry, file_path):
+        return 'skipped', [], entry, stats
+    
+    try:
+        if page_transforms and all(t.scope == 'head' for t in page_transforms):
+            result = stream_transforms(file_path, page, dist_dir, page_transforms, entry, signature, fresh, stats)
+            if result is not None:
+                return result
+            stats = {'bytes_in': 0, 'bytes_out': 0}
+        
+        start = time.perf_counter()
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        stats['bytes_in'] = len(raw)
+        stats['read_seconds'] = round(time.perf_counter() - start, 6)
+        
+        input_hash = hash_bytes(raw)
+        if fresh and input_hash == entry['output']:
+            return 'skipped', [], make_entry(file_path, entry['input'], input_hash, signature), stats
+        
+        original = raw.decode('utf-8')
+        content, applied = apply_transforms(original, page, dist_dir, page_transforms, stats)
+        
+        if content == original:
+            return 'unchanged', applied, make_entry(file_path, input_hash, input_hash, signature), stats
+        
+        output = content.encode('utf-8')
+        start = time.perf_counter()
+        write_page(file_path, output)
+        stats['bytes_out'] = len(output)
+        stats['write_seconds'] = round(time.perf_counter() - start, 6)
+        return 'processed', applied, make_entry(file_path, input_hash, hash_bytes(output), signature), stats
+    
+    except Exception as e:
+        return 'error', [str(e)], None, stats
+
+def _process_item(item, dist_dir, transforms, inputs):
+    file_path, entry = item
+    return process_page(file_path, dist_dir, transforms, entry, inputs)
+
+def run(dist_dir=DIST_DIR, transforms=None, jobs=1, manifest_path=None, force=False,
+        report_path=None, profile_path=None):
+    """Process every HTML page under dist_dir and print a summary.
+    
+    With jobs > 1 pages are spread across a process pool; results are still
+    reported in sorted path order. If manifest_path is given, pages recorded
+    there as already processed by the same transforms are skipped (unless
+    force is set) and the manifest is rewritten afterwards.
+    
+    report_path, if given, receives an NDJSON run report (see run_report.py).
+    profile_path, if given, receives a cProfile dump of the page loop, which
+    then runs in this process. Temporary files an interrupted run left in
+    dist_dir are deleted first.
+    """
+    dist_dir = Path(dist_dir)
+    transforms = get_transforms() if transforms is None else transforms
+    stale = remove_stale_temps(dist_dir)
+    if stale:
+        print(f"🧹 Removed {stale} temporary files left by an interrupted run")
+    html_files = sorted(dist_dir.rglob("*.html"))
+    if profile_path and resolve_jobs(jobs) > 1:
+        print("⚠️  --profile runs every page in this process; ignoring --jobs")
+        jobs = 1
+    report = RunReport(transforms, report_path, dist=str(dist_dir), jobs=resolve_jobs(jobs))
+    
+    manifest = load_manifest(manifest_path) if manifest_path and not force else {}
+    
+    for transform in transforms:
+        if transform.prepare is not None:
+            start = time.perf_counter()
+            transform.prepare(dist_dir)
+            report.step('prepare', transform.name, time.perf_counter() - start)
+    inputs = {t.name: inputs_digest(t.depends(dist_dir)) for t in transforms if t.depends is not None}
+    
+    print(f"🔍 Found {len(html_files)} HTML files")
+    print(f"🔧 Transforms: {', '.join(t.name for t in transforms)}")
+    print("-" * 40)
+    
+    counts = {'processed': 0, 'unchanged': 0, 'skipped': 0, 'error': 0}
+    items = [(html_file, manifest.get(html_file.relative_to(dist_dir).as_posix()))
+             for html_file in html_files]
+    worker = partial(_process_item, dist_dir=dist_dir, transforms=transforms, inputs=inputs)
+    
+    profile = cProfile.Profile() if profile_path else None
+    if profile is not None:
+        profile.enable()
+    pages = run_pages(worker, items, jobs)
+    if profile is not None:
+        profile.disable()
+        profile.dump_stats(profile_path)
+    
+    updated_manifest = {}
+    prefiltered = 0
+    for page in pages:
+        status, applied, entry, stats = page.result
+        counts[status] += 1
+        prefiltered += stats.get('prefiltered', 0)
+        name = page.path[0].relative_to(dist_dir).as_posix()
+        report.page(name, status, stats)
+        if entry is not None:
+            updated_manifest[name] = entry
+        for transform, *_, notes in stats.get('transforms', ()):
+            for message in notes['warnings']:
+                print(f"⚠️  {name}: {transform}: {message}")
+        if status == 'processed':
+            print(f"✅ {name}: {', '.join(applied)}")
+        elif status == 'error':
+            print(f"❌ Error processing {name}: {applied[0]}")
+    
+    if manifest_path:
+        save_manifest(manifest_path, updated_manifest)
+    
+    for transform in transforms:
+        if transform.finish is not None:
+            start = time.perf_counter()
+            transform.finish(dist_dir)
+            report.step('finish', transform.name, time.perf_counter() - start)
+    
+    report.close(counts)
+    print("-" * 40)
+    report.print_totals()
+    print(f"📊 Summary:")
+    print(f"  ✅ Processed: {counts['processed']}")
+    print(f"  ⏭  Unchanged: {counts['unchanged']}")
+    print(f"  💤 Skipped (manifest): {counts['skipped']}")
+    print(f"  ❌ Errors: {counts['error']}")
+    print(f"  🔎 Transform calls skipped (no anchor in page): {prefiltered}")
+    print(f"  📁 Total: {len(html_files)}")
+    if report_path:
+        print(f"🧾 Run report written to {report_path}")
+    if profile_path:
+        print(f"🔬 Profile written to {profile_path} (python -m pstats {profile_path})")
+    return counts
+
+def _inline_css(content, page, dist_dir):
+    return inline_blog_post_css(content)
+
+def _external_css(content, page, dist_dir):
+    return link_blog_post_css(content)
+
+def _critical_css(content, page, dist_dir):
+    return extract_critical_css(content, dist_dir)
+
+def _font_loading(content, page, dist_dir):
+    return optimize_font_loading_content(content)
+
+def _self_hosted_fonts(content, page, dist_dir):
+    return self_host_fonts(content, load_fonts(str(dist_dir)))
+
+def _favicon(content, page, dist_dir):
+    return apply_favicon_setup(content)
+
+def _site_metadata(content, page, dist_dir):
+    return content
+
+def _resolve_links(content, page, dist_dir):
+    return resolve_links(content, page, dist_dir)
+
+def _twitter_image(content, page, dist_dir):
+    slug = PurePosixPath(page).parent.name
+    mappings = load_image_mappings(str(dist_dir))
+    if slug not in mappings:
+        return content
+    return fix_twitter_image_content(content, mappings[slug])
+
+def _search_script(content, page, dist_dir):
+    return remove_search_script(content)
+
+def _search_index(content, page, dist_dir):
+    return use_search_index(content)
+
+def _responsive_images(content, page, dist_dir):
+    return responsive_pictures(content, load_variants(str(dist_dir)))
+
+def _image_hints(content, page, dist_dir):
+    return add_image_hints(content, load_dimensions(str(dist_dir)))
+
+def _fingerprint_assets(content, page, dist_dir):
+    return fingerprint_references(content, load_fingerprints(str(dist_dir)))
+
+def _early_hints(content, page, dist_dir):
+    return remove_duplicate_preloads(content, load_fonts(str(dist_dir)))
+
+def _service_worker(content, page, dist_dir):
+    return register_service_worker(content)
+
+def _minify_html(content, page, dist_dir):
+    minified, ok = minify_html_checked(content)
+    if not ok:
+        warn("minified DOM differs, left unminified")
+    return minified
+
+def _route_inputs(dist_dir):
+    table = load_route_table(str(dist_dir))
+    files = sorted(f for f in table.files
+                   if not any(part.startswith('.') for part in f.split('/')) and not f.endswith(('.tmp', '.gz', '.br')))
+    return {'files': files, 'rules': [rule[:4] for rule in table.rules]}
+
+def _stylesheet_inputs(dist_dir):
+    dist_dir = Path(dist_dir)
+    return {path.relative_to(dist_dir).as_posix(): hash_bytes(path.read_bytes())
+            for path in sorted(dist_dir.rglob('*.css'))}
+
+def _dimension_inputs(dist_dir):
+    # mtimes and sizes only decide whether an image is measured again
+    return {image: (entry.get('width'), entry.get('height'))
+            for image, entry in load_dimensions(str(dist_dir)).items()}
+
+def _fonts_inputs(dist_dir):
+    return load_fonts(str(dist_dir))
+
+def _fingerprint_inputs(dist_dir):
+    return load_fingerprints(str(dist_dir))
+
+def _variant_inputs(dist_dir):
+    return load_variants(str(dist_dir))
+
+def _twitter_image_inputs(dist_dir):
+    return load_image_mappings(str(dist_dir))
+
+register_transform('inline-css', _inline_css, pages=('blog/*/index.html',), anchors=ASTRO_STYLESHEETS,
+                   scope='head')
+register_transform('external-css', _external_css, pages=('blog/*/index.html',),
+                   prepare=write_post_stylesheet, default=False,
+                   anchors=ASTRO_STYLESHEETS + ('/_astro/post.', CSS_MARKER), scope='head')
+register_transform('critical-css', _critical_css, prepare=write_post_stylesheet, default=False,
+                   anchors=('.css', CSS_MARKER), depends=_stylesheet_inputs)
+register_transform('font-loading', _font_loading, anchors=('fonts.googleapis.com',), scope='head')
+register_transform('self-hosted-fonts', _self_hosted_fonts, prepare=build_fonts,
+                   anchors=('fonts.googleapis.com', 'fonts.gstatic.com', FONT_COMMENT), depends=_fonts_inputs)
+# Pages without favicon links get them after the canonical or theme-color tag
+register_transform('favicon', _favicon, anchors=('icon', 'manifest', 'canonical', 'theme-color'),
+                   scope='head')
+# Runs only its prepare step: rebuilds the metadata index and the files generated from it
+register_transform('site-metadata', _site_metadata, pages=(), prepare=build_site_metadata)
+register_transform('resolve-links', _resolve_links, prepare=resolve_site_files, depends=_route_inputs)
+register_transform('twitter-image', _twitter_image, pages=('blog/*/index.html',),
+                   anchors=('twitter:image', OLD_IMAGE_PREFIX), scope='head', depends=_twitter_image_inputs)
+register_transform('search-script', _search_script, pages=('blog/*/index.html',), anchors=(SEARCH_SCRIPT,))
+register_transform('search-index', _search_index, prepare=write_search_index, anchors=(OLD_SEARCH_SCRIPT,))
+register_transform('responsive-images', _responsive_images, version=2, prepare=generate_variants,
+                   default=False, anchors=('<picture',), depends=_variant_inputs)
+register_transform('image-hints', _image_hints, prepare=measure_images, anchors=('<img',),
+                   depends=_dimension_inputs)
+register_transform('fingerprint-assets', _fingerprint_assets, prepare=fingerprint_assets,
+                   depends=_fingerprint_inputs)
+register_transform('early-hints', _early_hints, finish=write_early_hints, anchors=('preload',),
+                   depends=_fonts_inputs)
+register_transform('service-worker', _service_worker, finish=write_service_worker)
+register_transform('minify-html', _minify_html)
+
+def main():
+    """Run the registered transforms over dist/ in a single pass."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dist', type=Path, default=DIST_DIR,
+                        help="Directory containing the built site (default: dist/)")
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        help="Run only these transforms")
+    parser.add_argument('--skip', nargs='+', metavar='NAME', default=[],
+                        help="Do not run these transforms")
+    parser.add_argument('--manifest', type=Path,
+                        help="Manifest file for incremental runs (default: <dist>/.postprocess-manifest.json)")
+    parser.add_argument('--no-manifest', action='store_true',
+                        help="Process every page and do not read or write a manifest")
+    parser.add_argument('--force', action='store_true',
+                        help="Ignore the manifest and reprocess every page (the manifest is still rewritten)")
+    parser.add_argument('--css', choices=('inline', 'external', 'critical'), default='inline',
+                        help="Inline the consolidated blog CSS into every post, link one shared "
+                             "content-hashed stylesheet, or inline only above-the-fold rules and "
+                             "defer the rest (default: inline)")
+    parser.add_argument('--report', type=Path, metavar='PATH',
+                        help="Write an NDJSON run report with per-page, per-transform timings and sizes")
+    parser.add_argument('--profile', type=Path, metavar='PATH',
+                        help="Write a cProfile dump of the page loop (runs pages in one process)")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    transforms = get_transforms(args.only)
+    if args.css != 'inline' and args.only is None:
+        css_transform = get_transforms([f'{args.css}-css'])[0]
+        transforms = [css_transform if t.name == 'inline-css' else t for t in transforms]
+    transforms = [t for t in transforms if t.name not in args.skip]
+    
+    print("🚀 Running single-pass post-processing")
+    print("=" * 60)
+    manifest_path = None if args.no_manifest else (args.manifest or default_manifest_path(args.dist))
+    counts = run(args.dist, transforms, args.jobs, manifest_path, args.force, args.report, args.profile)
+    return 1 if counts['error'] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
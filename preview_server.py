@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Production-Parity Preview Server
+================================
+Serves dist/ the way Netlify does, so caching and latency can be checked
+before deploying:
+
+- [[redirects]] from netlify.toml: 3xx rules answer with Location, 200
+  rules rewrite (shadowed by existing files unless `force`), pretty URLs
+  serve `<path>/index.html` or `<path>.html`, and misses get 404.html
+- [[headers]] from netlify.toml plus dist/_headers, matched against the
+  request path; paths without a Cache-Control get Netlify's default
+  `public, max-age=0, must-revalidate`
+- content negotiation: a fresh `.br`/`.gz` sibling written by
+  compress_assets.py is sent as is, other text files are compressed on the
+  fly (brotli if installed, else gzip) like Netlify's edge
+- strong ETags per representation and If-None-Match → 304
+- single `bytes=` ranges → 206 / 416 (served from the uncompressed file)
+
+Uses only asyncio from the standard library:
+
+    python preview_server.py serve --port 8888
+    python preview_server.py bench --concurrency 16 --requests 2000
+
+`bench` starts the server in a separate process (or targets --url) and
+reports p50/p99 latency and time to first byte, throughput and bytes per
+route. `--revalidate` replays the requests with If-None-Match to measure
+repeat visits.
+"""
+
+import argparse
+import asyncio
+import json
+import mimetypes
+import multiprocessing
+import socket
+import time
+from email.utils import formatdate
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from compress_assets import TEXT_EXTENSIONS, brotli, compress_brotli, compress_gzip, is_fresh
+from netlify_config import compile_header_rules, header_rules, headers_for
+from netlify_headers import read_headers_file
+from page_manifest import hash_bytes
+from resolve_links import RouteTable, page_path
+
+DIST_DIR = Path(__file__).parent / "dist"
+DEFAULT_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+COMPRESSIBLE = TEXT_EXTENSIONS + ('.svg', '.txt')
+MAX_HEADER_LINES = 100
+REASONS = {
+    200: 'OK', 206: 'Partial Content', 301: 'Moved Permanently', 302: 'Found',
+    304: 'Not Modified', 307: 'Temporary Redirect', 308: 'Permanent Redirect',
+    400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    416: 'Range Not Satisfiable',
+}
+
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('font/woff2', '.woff2')
+
+@lru_cache(maxsize=2048)
+def load_representation(path, encoding, mtime_ns, size):
+    """Return (bytes, etag) for a file in one encoding; keyed on mtime/size so edits show up."""
+    if encoding and is_fresh(path, f"{path}.{'br' if encoding == 'br' else 'gz'}"):
+        data = Path(f"{path}.{'br' if encoding == 'br' else 'gz'}").read_bytes()
+    else:
+        data = Path(path).read_bytes()
+        if encoding == 'br':
+            data = compress_brotli(data)
+        elif encoding == 'gzip':
+            data = compress_gzip(data)
+    return data, f'"{hash_bytes(data)[:20]}"'
+
+def accepted_encodings(header):
+    """Return the content codings a client accepts (q > 0), lowercased."""
+    accepted = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q=') and float(q[2:] or 0) == 0:
+            continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+def choose_encoding(path, accept_encoding):
+    """Pick br, gzip or None (identity) for a file and Accept-Encoding header."""
+    if not accept_encoding or Path(path).suffix.lower() not in COMPRESSIBLE:
+        return None
+    accepted = accepted_encodings(accept_encoding)
+    if ('br' in accepted or '*' in accepted) and (brotli is not None or is_fresh(path, f"{path}.br")):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+def parse_range(header, size):
+    """Return (start, end) for a single `bytes=` range, None to ignore it, or 'invalid'."""
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, _, last = spec.strip().partition('-')
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                return 'invalid'
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return 'invalid'
+    return start, end
+
+def etag_matches(header, etag):
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+def content_type(path):
+    kind, _ = mimetypes.guess_type(str(path))
+    kind = kind or 'application/octet-stream'
+    if kind.startswith('text/') or kind in ('application/javascript', 'application/json',
+                                            'application/xml', 'application/manifest+json'):
+        kind += '; charset=utf-8'
+    return kind
+
+class PreviewServer:
+    """Answers requests for dist/ with Netlify's routing and header rules."""
+
+    def __init__(self, dist_dir=DIST_DIR, log=True):
+        self.dist_dir = Path(dist_dir)
+        self.log = log
+        self.reload()
+
+    def reload(self):
+        """Re-read dist/, dist/_headers and netlify.toml."""
+        self.routes = RouteTable(self.dist_dir)
+        self.header_rules = header_rules() + compile_header_rules(read_headers_file(self.dist_dir))
+
+    def route(self, path):
+        """Return ('redirect', status, location) or ('file', status, dist-relative name or None)."""
+        rule, target = self.routes.apply_rules(path)
+        if rule is not None and rule.is_redirect:
+            return 'redirect', rule.status, target
+        name = self.routes.file_for(target if rule is not None else path)
+        if name is None:
+            return 'file', 404, '404.html' if '404.html' in self.routes.files else None
+        return 'file', 200, name
+
+    def respond(self, method, target, request_headers):
+        """Return (status, [(header, value)], body) for one request."""
+        if method not in ('GET', 'HEAD'):
+            return 405, [('Allow', 'GET, HEAD'), ('Content-Length', '0')], b''
+        parts = urlsplit(target)
+        path = unquote(parts.path) or '/'
+        headers = headers_for(path, self.header_rules)
+        headers.setdefault('Date', formatdate(usegmt=True))
+        if not any(name.lower() == 'cache-control' for name in headers):
+            headers['Cache-Control'] = DEFAULT_CACHE_CONTROL
+        
+        kind, status, name = self.route(path)
+        if kind == 'redirect':
+            location = f"{name}?{parts.query}" if parts.query and '?' not in name else name
+            headers.update({'Location': location, 'Content-Length': '0'})
+            return status, list(headers.items()), b''
+        if name is None:
+            headers.update({'Content-Type': 'text/plain; charset=utf-8', 'Content-Length': '9'})
+            return 404, list(headers.items()), b'Not Found'
+        
+        file_path = self.dist_dir / name
+        stat = file_path.stat()
+        range_header = request_headers.get('range') if status == 200 else None
+        encoding = None if range_header else choose_encoding(file_path, request_headers.get('accept-encoding', ''))
+        body, etag = load_representation(str(file_path), encoding, stat.st_mtime_ns, stat.st_size)
+        
+        if not any(key.lower() == 'content-type' for key in headers):
+            headers['Content-Type'] = content_type(file_path)
+        headers.update({'ETag': etag, 'Accept-Ranges': 'bytes'})
+        if Path(name).suffix.lower() in COMPRESSIBLE:
+            headers['Vary'] = 'Accept-Encoding'
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        
+        if status == 200 and etag_matches(request_headers.get('if-none-match', ''), etag):
+            for name in [key for key in headers if key.lower() in ('content-type', 'content-encoding')]:
+                del headers[name]
+            return 304, list(headers.items()), b''
+        if range_header:
+            span = parse_range(range_header, len(body))
+            if span == 'invalid':
+                headers.update({'Content-Range': f"bytes */{len(body)}", 'Content-Length': '0'})
+                return 416, list(headers.items()), b''
+            if span is not None:
+                start, end = span
+                body = body[start:end + 1]
+                headers['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+                status = 206
+        headers['Content-Length'] = str(len(body))
+        return status, list(headers.items()), body
+    
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                request_headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    request_headers[name.strip().lower()] = value.strip()
+                if int(request_headers.get('content-length', 0) or 0):
+                    await reader.readexactly(int(request_headers['content-length']))
+                
+                started = time.perf_counter()
+                status, headers, body = self.respond(method, target, request_headers)
+                keep_alive = (request_headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+                head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+                head += [f"{name}: {value}" for name, value in headers]
+                head.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                if self.log:
+                    print(f"{status} {method} {target} {len(body)}B "
+                          f"{(time.perf_counter() - started) * 1000:.1f}ms")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(dist_dir, host, port, log=True):
+    server = PreviewServer(dist_dir, log)
+    listener = await asyncio.start_server(server.handle, host, port, reuse_address=True)
+    async with listener:
+        await listener.serve_forever()
+
+def free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+def _serve_process(dist_dir, host, port):
+    asyncio.run(serve(dist_dir, host, port, log=False))
+
+# --- load generator ---------------------------------------------------------
+
+class RouteStats:
+    __slots__ = ('requests', 'latencies', 'ttfbs', 'bytes', 'statuses')
+
+    def __init__(self):
+        self.requests = 0
+        self.latencies = []
+        self.ttfbs = []
+        self.bytes = 0
+        self.statuses = {}
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+async def read_response(reader):
+    """Read one response; return (status, headers, body length, time its first byte arrived)."""
+    status_line = await reader.readline()
+    first_byte = time.perf_counter()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = 0
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            length += size
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        length = int(headers['content-length'])
+        await reader.readexactly(length)
+    return status, headers, length, first_byte
+
+async def client(host, port, queue, stats, options, etags):
+    """One keep-alive connection working through the shared request queue."""
+    reader = writer = None
+    while True:
+        try:
+            path = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        if writer is None:
+            reader, writer = await asyncio.open_connection(host, port)
+        lines = [f"GET {path} HTTP/1.1", f"Host: {host}:{port}", "User-Agent: preview-bench"]
+        if options['encoding']:
+            lines.append(f"Accept-Encoding: {options['encoding']}")
+        if options['revalidate'] and path in etags:
+            lines.append(f"If-None-Match: {etags[path]}")
+        started = time.perf_counter()
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+        status, headers, length, first_byte = await read_response(reader)
+        latency = time.perf_counter() - started
+        route = stats.setdefault(path, RouteStats())
+        route.requests += 1
+        route.latencies.append(latency)
+        route.ttfbs.append(first_byte - started)
+        route.bytes += length
+        route.statuses[status] = route.statuses.get(status, 0) + 1
+        if 'etag' in headers:
+            etags[path] = headers['etag']
+        if headers.get('connection', '').lower() == 'close':
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+async def run_load(host, port, paths, total, concurrency, options):
+    """Request `paths` round-robin `total` times over `concurrency` connections."""
+    etags = {}
+    if options['revalidate']:
+        # Prime the ETags so every measured request is a conditional one
+        warmup = asyncio.Queue()
+        for path in paths:
+            warmup.put_nowait(path)
+        await client(host, port, warmup, {}, {**options, 'revalidate': False}, etags)
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(paths[i % len(paths)])
+    stats = {}
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, queue, stats, options, etags) for _ in range(concurrency)))
+    return stats, time.perf_counter() - started
+
+def default_paths(dist_dir):
+    """Every page in dist/, at the URL Netlify serves it from."""
+    return [page_path(p.relative_to(dist_dir).as_posix()) for p in sorted(Path(dist_dir).rglob('*.html'))]
+
+def print_load_report(stats, seconds):
+    latencies = [value for route in stats.values() for value in route.latencies]
+    ttfbs = [value for route in stats.values() for value in route.ttfbs]
+    requests = sum(route.requests for route in stats.values())
+    total_bytes = sum(route.bytes for route in stats.values())
+    print(f"{'route':<48} {'reqs':>6} {'p50 ms':>8} {'p99 ms':>8} {'ttfb p50':>9} {'bytes/req':>10}  status")
+    for path, route in sorted(stats.items()):
+        statuses = ' '.join(f"{code}×{count}" for code, count in sorted(route.statuses.items()))
+        print(f"{path[:48]:<48} {route.requests:>6} {percentile(route.latencies, 0.5) * 1000:>8.2f} "
+              f"{percentile(route.latencies, 0.99) * 1000:>8.2f} {percentile(route.ttfbs, 0.5) * 1000:>9.2f} "
+              f"{route.bytes // max(route.requests, 1):>10,}  {statuses}")
+    print("-" * 40)
+    print(f"📊 {requests} requests in {seconds:.2f}s: {requests / seconds:.0f} req/s, "
+          f"{total_bytes / seconds / 1024 / 1024:.2f} MB/s")
+    print(f"   latency p50 {percentile(latencies, 0.5) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms; "
+          f"TTFB p50 {percentile(ttfbs, 0.5) * 1000:.2f} ms, p99 {percentile(ttfbs, 0.99) * 1000:.2f} ms")
+
+def load_report_json(stats, seconds):
+    return {
+        'seconds': round(seconds, 6),
+        'requests': sum(route.requests for route in stats.values()),
+        'bytes': sum(route.bytes for route in stats.values()),
+        'routes': {
+            path: {
+                'requests': route.requests,
+                'bytes': route.bytes,
+                'p50_ms': round(percentile(route.latencies, 0.5) * 1000, 3),
+                'p99_ms': round(percentile(route.latencies, 0.99) * 1000, 3),
+                'ttfb_p50_ms': round(percentile(route.ttfbs, 0.5) * 1000, 3),
+                'ttfb_p99_ms': round(percentile(route.ttfbs, 0.99) * 1000, 3),
+                'statuses': route.statuses,
+            }
+            for path, route in sorted(stats.items())
+        },
+    }
+
+def bench(args):
+    paths = args.paths or default_paths(args.dist)
+    process = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = args.host, free_port(args.host)
+        process = multiprocessing.Process(target=_serve_process, args=(args.dist, host, port), daemon=True)
+        process.start()
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection((host, port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    print(f"❌ Preview server did not start on {host}:{port}")
+                    return 1
+                time.sleep(0.05)
+    
+    options = {'encoding': args.encoding, 'revalidate': args.revalidate}
+    print(f"🏋️  {args.requests} requests over {args.concurrency} connections to {host}:{port} "
+          f"({len(paths)} routes{', conditional' if args.revalidate else ''})")
+    try:
+        stats, seconds = asyncio.run(run_load(host, port, paths, args.requests, args.concurrency, options))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+    print_load_report(stats, seconds)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(load_report_json(stats, seconds), f, indent=2)
+            f.write('\n')
+        print(f"💾 Results written to {args.json}")
+    return 0
+
+def main():
+    """Serve dist/ like Netlify, or load-test it."""
+    parser = argparse.ArgumentParser(description="Preview dist/ with netlify.toml rules, and load-test it")
+    parser.add_argument('--dist', type=Path, default=DIST_DIR,
+                        help="Directory containing the built site (default: dist/)")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind or connect to")
+    commands = parser.add_subparsers(dest='command')
+    serve_parser = commands.add_parser('serve', help="Run the preview server (default)")
+    serve_parser.add_argument('--port', type=int, default=8888)
+    serve_parser.add_argument('--quiet', '-q', action='store_true', help="Do not log requests")
+    bench_parser = commands.add_parser('bench', help="Run the load generator")
+    bench_parser.add_argument('--url', help="Target a running server instead of starting one")
+    bench_parser.add_argument('--requests', '-n', type=int, default=1000, help="Total requests (default: 1000)")
+    bench_parser.add_argument('--concurrency', '-c', type=int, default=8,
+                              help="Concurrent keep-alive connections (default: 8)")
+    bench_parser.add_argument('--paths', nargs='+', metavar='PATH',
+                              help="Routes to request (default: every page in dist/)")
+    bench_parser.add_argument('--encoding', default='br, gzip',
+                              help="Accept-Encoding to send; '' for identity (default: 'br, gzip')")
+    bench_parser.add_argument('--revalidate', action='store_true',
+                              help="Send If-None-Match with each route's ETag, like a repeat visit")
+    bench_parser.add_argument('--json', type=Path, metavar='PATH', help="Write the per-route results to PATH")
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    if args.command == 'bench':
+        return bench(args)
+    
+    port = getattr(args, 'port', 8888)
+    print(f"🌐 Serving {args.dist} at http://{args.host}:{port} with netlify.toml rules (Ctrl+C to stop)")
+    try:
+        asyncio.run(serve(args.dist, args.host, port, log=not getattr(args, 'quiet', False)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Unused CSS Pruning
+==================
+Builds a selector-usage index over every HTML page in dist/, writes a pruned
+copy of each stylesheet per page type (home, post, blog index, category,
+topic, other pages) and reports the dead rules and bytes saved.
+
+Stylesheets covered: every /_astro/*.css file plus the consolidated block
+from fix_css_references.get_inline_css() (under its shared stylesheet URL).
+With --apply, pages are rewritten to use the pruned copies for their type.
+
+Elements and states created by scripts never appear in the static HTML, so
+every word in the site's .js files, the pages' inline <script> blocks and
+the search client is safelisted as a class and an id: a selector naming
+one of them is always kept. More can be listed in a --safelist file, one
+`.class` or `#id` per line.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+from collections import defaultdict
+from pathlib import Path, PurePosixPath
+
+from build_search_index import SEARCH_CLIENT_JS
+from critical_css import LINK_TAG_RE, tag_attrs
+from css_rules import AtRule, StyleRule, parse_css, serialize_css
+from fix_css_references import CSS_MARKER, INLINE_BLOCK_PATTERN, get_post_css, post_stylesheet_href
+from html_tree import matches, parse_html, parse_selector, split_selector_list
+from page_stream import write_page
+
+PRUNED_DIR = "_astro/pruned"
+SCRIPT_WORD_RE = re.compile(r'[A-Za-z_][\w-]*')
+# <script type> values holding code; data blocks such as JSON-LD are not scanned
+SCRIPT_TYPES = ('', 'text/javascript', 'application/javascript', 'module')
+
+def page_type(page):
+    """Classify a dist-relative page path into a page type."""
+    parts = PurePosixPath(page).parts
+    if page == 'index.html':
+        return 'home'
+    if parts[0] == 'blog':
+        if len(parts) == 2:
+            return 'blog-index'
+        if parts[1] == 'category':
+            return 'category'
+        return 'post'
+    if parts[0] in ('topics', 'tags'):
+        return 'topic'
+    return 'page'
+
+def original_href(href):
+    """Map a pruned stylesheet URL back to the stylesheet it was cut from."""
+    if not href.startswith(f"/{PRUNED_DIR}/"):
+        return href
+    stem = href.rsplit('/', 1)[1][:-len('.css')].rsplit('.', 2)[0]
+    return f"/_astro/{stem}.css"
+
+def page_stylesheets(content):
+    """Return the local stylesheet URLs a page references, in order."""
+    hrefs = []
+    for match in LINK_TAG_RE.finditer(content):
+        href = tag_attrs(match.group(0)).get('href', '')
+        if href.startswith('/_astro/') and href.endswith('.css'):
+            hrefs.append(original_href(href))
+    if CSS_MARKER in content:
+        hrefs.append(post_stylesheet_href())
+    return list(dict.fromkeys(hrefs))
+
+def selector_tokens(selector):
+    """Return the tag/class/id/attribute tokens a page must contain to match."""
+    tokens = set()
+    for _, compound in parse_selector(selector):
+        if compound.tag not in (None, '*'):
+            tokens.add(compound.tag)
+        tokens.update('.' + c for c in compound.classes)
+        tokens.update('#' + i for i in compound.ids)
+        tokens.update('[' + name for name, _, _ in compound.attrs)
+    return tokens
+
+def script_tokens(text):
+    """Return every word in a script as both a class and an id token."""
+    words = set(SCRIPT_WORD_RE.findall(text))
+    return {'.' + w for w in words} | {'#' + w for w in words}
+
+def load_safelist(dist_dir, safelist_path=None):
+    """Return the class/id tokens scripts may add to pages at runtime.
+    
+    Collected from every .js file under dist_dir and the search client,
+    plus the `.class`/`#id` lines of safelist_path (a bare name counts as a
+    class). Inline scripts are collected per page by PageIndex.
+    """
+    tokens = script_tokens(SEARCH_CLIENT_JS)
+    for script in sorted(Path(dist_dir).rglob("*.js")):
+        tokens |= script_tokens(script.read_text(encoding='utf-8'))
+    if safelist_path:
+        for line in Path(safelist_path).read_text(encoding='utf-8').splitlines():
+            line = line.strip()
+            if line:
+                tokens.add(line if line[0] in '.#' else '.' + line)
+    return tokens
+
+class PageIndex:
+    """Parsed page plus the set of tokens it contains, for fast rejection.
+    
+    script_tokens holds the words of the page's inline scripts (see
+    script_tokens()), for the safelist.
+    """
+
+    def __init__(self, content):
+        self.root = parse_html(content)
+        self.elements = [el for el in self.root.iter() if el.tag != '#document']
+        self.tokens = set()
+        self.script_tokens = set()
+        for el in self.elements:
+            if el.tag == 'script' and el.attrs.get('type', '').lower() in SCRIPT_TYPES:
+                self.script_tokens |= script_tokens(self.root.inner_html(el))
+            self.tokens.add(el.tag)
+            self.tokens.update('.' + c for c in el.classes)
+            if 'id' in el.attrs:
+                self.tokens.add('#' + el.attrs['id'])
+            self.tokens.update('[' + name for name in el.attrs)
+
+    def uses(self, selector):
+        try:
+            if not selector_tokens(selector) <= self.tokens:
+                return False
+            return any(matches(el, selector) for el in self.elements)
+        except ValueError:
+            # Keep anything we cannot parse
+            return True
+
+def load_stylesheet(dist_dir, href):
+    """Return (text, rules) for a stylesheet URL, or None if missing."""
+    if href == post_stylesheet_href():
+        text = get_post_css()
+    else:
+        css_path = Path(dist_dir) / href.lstrip('/')
+        if not css_path.exists():
+            return None
+        text = css_path.read_text(encoding='utf-8')
+    return text, parse_css(text)
+
+def build_usage_index(dist_dir):
+    """Parse every page and group the results by page type.
+    
+    Returns (pages_by_type, sheets_by_type, indexes): the pages of each
+    type, the stylesheet URLs referenced by pages of each type, and a
+    PageIndex per page for selector lookups.
+    """
+    dist_dir = Path(dist_dir)
+    pages_by_type = defaultdict(list)
+    sheets_by_type = defaultdict(dict)
+    indexes = defaultdict(list)
+    
+    for html_file in sorted(dist_dir.rglob("*.html")):
+        page = html_file.relative_to(dist_dir).as_posix()
+        content = html_file.read_text(encoding='utf-8')
+        kind = page_type(page)
+        pages_by_type[kind].append(page)
+        for href in page_stylesheets(content):
+            sheets_by_type[kind][href] = True
+        indexes[kind].append(PageIndex(content))
+    
+    return pages_by_type, sheets_by_type, indexes
+
+def safelisted(selector, safelist):
+    try:
+        return not selector_tokens(selector).isdisjoint(safelist)
+    except ValueError:
+        return True
+
+def prune_rules(rules, indexes, cache, safelist=frozenset()):
+    """Keep only rules (and selectors within them) used by one of the pages or safelisted."""
+    kept = []
+    for rule in rules:
+        if isinstance(rule, AtRule):
+            kept.append(rule)
+            continue
+        used = []
+        for selector in split_selector_list(rule.selector):
+            if selector not in cache:
+                cache[selector] = safelisted(selector, safelist) or any(index.uses(selector) for index in indexes)
+            if cache[selector]:
+                used.append(selector)
+        if used:
+            kept.append(StyleRule(', '.join(used), rule.declarations, rule.conditions))
+    return kept
+
+def pruned_href(href, kind, css):
+    """Return the content-hashed URL for a pruned copy of a stylesheet."""
+    stem = href.rsplit('/', 1)[1][:-len('.css')]
+    digest = hashlib.sha256(css.encode('utf-8')).hexdigest()[:8]
+    return f"/{PRUNED_DIR}/{stem}.{kind}.{digest}.css"
+
+def analyze(dist_dir, safelist_path=None):
+    """Build the usage index, write pruned stylesheets and return the report."""
+    dist_dir = Path(dist_dir)
+    pages_by_type, sheets_by_type, indexes = build_usage_index(dist_dir)
+    all_indexes = [index for kind in indexes for index in indexes[kind]]
+    safelist = load_safelist(dist_dir, safelist_path).union(*(index.script_tokens for index in all_indexes))
+    
+    all_sheets = sorted({f"/{p.relative_to(dist_dir).as_posix()}" for p in (dist_dir / "_astro").glob("*.css")}
+                        | {post_stylesheet_href()})
+    referenced = {href for sheets in sheets_by_type.values() for href in sheets}
+    
+    report = {'stylesheets': {}, 'page_types': {}, 'total_saved_bytes': 0}
+    mapping = {}
+    
+    for href in all_sheets:
+        loaded = load_stylesheet(dist_dir, href)
+        if loaded is None:
+            continue
+        text, rules = loaded
+        site_cache = {}
+        live = prune_rules(rules, all_indexes, site_cache, safelist)
+        dead = [s for s, used in site_cache.items() if not used]
+        full_min = serialize_css(rules, minify=True)
+        report['stylesheets'][href] = {
+            'bytes': len(text.encode('utf-8')),
+            'rules': sum(1 for r in rules if isinstance(r, StyleRule)),
+            'referenced': href in referenced,
+            'dead_selectors': dead,
+            'dead_bytes': len(full_min.encode('utf-8')) - len(serialize_css(live, minify=True).encode('utf-8')),
+        }
+    
+    out_dir = dist_dir / PRUNED_DIR
+    for kind in sorted(pages_by_type):
+        type_report = {'pages': len(pages_by_type[kind]), 'stylesheets': {}}
+        for href in sheets_by_type[kind]:
+            loaded = load_stylesheet(dist_dir, href)
+            if loaded is None:
+                continue
+            _, rules = loaded
+            full = serialize_css(rules, minify=True)
+            pruned = serialize_css(prune_rules(rules, indexes[kind], {}, safelist), minify=True)
+            target = pruned_href(href, kind, pruned)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            (dist_dir / target.lstrip('/')).write_text(pruned, encoding='utf-8')
+            mapping[(kind, href)] = target
+            saved = len(full.encode('utf-8')) - len(pruned.encode('utf-8'))
+            type_report['stylesheets'][href] = {
+                'pruned': target,
+                'bytes': len(full.encode('utf-8')),
+                'pruned_bytes': len(pruned.encode('utf-8')),
+                'saved_bytes': saved,
+            }
+            report['total_saved_bytes'] += saved * len(pages_by_type[kind])
+        report['page_types'][kind] = type_report
+    
+    return report, mapping
+
+def apply_pruned(dist_dir, mapping):
+    """Point every page at the pruned stylesheets for its page type."""
+    dist_dir = Path(dist_dir)
+    updated = 0
+    for html_file in sorted(dist_dir.rglob("*.html")):
+        page = html_file.relative_to(dist_dir).as_posix()
+        kind = page_type(page)
+        content = html_file.read_text(encoding='utf-8')
+
+        def relink(match):
+            tag = match.group(0)
+            href = tag_attrs(tag).get('href', '')
+            target = mapping.get((kind, original_href(href)))
+            return tag.replace(f'"{href}"', f'"{target}"') if target else tag
+        
+        new_content = LINK_TAG_RE.sub(relink, content)
+        
+        post_target = mapping.get((kind, post_stylesheet_href()))
+        if post_target and CSS_MARKER in new_content:
+            pruned = (dist_dir / post_target.lstrip('/')).read_text(encoding='utf-8')
+            block = f"<style>\n/* {CSS_MARKER} */\n{pruned}\n</style>"
+            new_content = re.sub(INLINE_BLOCK_PATTERN, lambda m: block, new_content, flags=re.DOTALL)
+        
+        if new_content != content:
+            write_page(html_file, new_content)
+            updated += 1
+    return updated
+
+def main():
+    """Analyze CSS usage across dist/ and write pruned stylesheets."""
+    parser = argparse.ArgumentParser(description="Prune unused CSS per page type")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    parser.add_argument('--report', type=Path, default=Path(__file__).parent / "css-prune-report.json",
+                        help="Where to write the JSON report (default: css-prune-report.json)")
+    parser.add_argument('--safelist', type=Path, metavar='PATH',
+                        help="File of extra .class/#id tokens to keep, one per line")
+    parser.add_argument('--apply', action='store_true',
+                        help="Rewrite pages to use the pruned stylesheets for their page type")
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("✂️  PRUNING UNUSED CSS")
+    print("=" * 60)
+    report, mapping = analyze(args.dist, args.safelist)
+    
+    for href, info in report['stylesheets'].items():
+        status = "" if info['referenced'] else "  (not referenced by any page)"
+        print(f"📄 {href}: {len(info['dead_selectors'])} dead selectors, "
+              f"{info['dead_bytes']} bytes dead{status}")
+    
+    print("-" * 40)
+    for kind, info in report['page_types'].items():
+        saved = sum(s['saved_bytes'] for s in info['stylesheets'].values())
+        print(f"📁 {kind} ({info['pages']} pages): {saved} bytes saved per page")
+    
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+    
+    print("-" * 40)
+    print(f"✅ Total CSS bytes saved across all pages: {report['total_saved_bytes']}")
+    print(f"📝 Report written to: {args.report}")
+    
+    if args.apply:
+        updated = apply_pruned(args.dist, mapping)
+        print(f"✅ Pointed {updated} pages at their pruned stylesheets")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
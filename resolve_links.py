@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Redirect-Free Internal Links
+============================
+netlify.toml answers `/blog/`, `/topics/*/`, `/blog/*/index.html` and
+similar URLs with a 301, so a link or sitemap entry in one of those forms
+costs every visitor and crawler an extra round trip.
+
+This stage builds a route table from the files in dist/, follows the
+[[redirects]] rules the way Netlify applies them and rewrites every
+internal link to the URL that finally answers 200:
+
+- `<a href>`, `<link rel=canonical|alternate>` and `og:url` in every page
+- `<loc>` in sitemap.xml, `<link>` in rss.xml and `url` in search-data.json
+
+Redirect chains (more than one hop) are fixed as well but reported, and
+links that only resolve through the SPA fallback rewrite, or not at all,
+are reported and left alone.
+
+Resolution follows the intent of netlify.toml: 3xx rules always apply, so
+`/blog/` redirects even though `blog/index.html` exists, while a 200
+rewrite without `force` is shadowed by a file served at the path.
+"""
+
+import argparse
+import re
+from functools import lru_cache, partial
+from pathlib import Path, PurePosixPath
+from typing import NamedTuple
+from urllib.parse import unquote, urljoin, urlsplit, urlunsplit
+
+from fingerprint_assets import SITE_URL
+from html_tree import parse_html
+from netlify_config import redirect_rules
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+from run_report import warn
+
+MAX_HOPS = 10
+SITEMAP = "sitemap.xml"
+RSS = "rss.xml"
+SEARCH_DATA = "search-data.json"
+
+# Elements and attributes holding links to pages on this site
+LINK_SELECTORS = [
+    ('a[href]', 'href'),
+    ('link[rel=canonical][href]', 'href'),
+    ('link[rel=alternate][href]', 'href'),
+    ('meta[property="og:url"][content]', 'content'),
+]
+SITE_FILE_PATTERNS = {
+    SITEMAP: re.compile(r'(<loc>)([^<]*)(</loc>)'),
+    RSS: re.compile(r'(<link>)([^<]*)(</link>)'),
+    SEARCH_DATA: re.compile(r'("url":\s*")([^"]*)(")'),
+}
+
+class Resolution(NamedTuple):
+    """Where a URL path ends up: final status and path, and the redirects on the way."""
+    status: int
+    path: str
+    hops: tuple = ()
+    rewritten: bool = False
+
+class RouteTable:
+    """The files in dist/ plus the netlify.toml rules that route requests to them."""
+
+    def __init__(self, dist_dir, rules=None):
+        dist_dir = Path(dist_dir)
+        self.files = {p.relative_to(dist_dir).as_posix() for p in dist_dir.rglob('*') if p.is_file()}
+        self.rules = redirect_rules() if rules is None else rules
+
+    def file_for(self, path):
+        """Return the file Netlify serves for a path without rules, or None."""
+        name = unquote(path).lstrip('/')
+        if name and not name.endswith('/') and name in self.files:
+            return name
+        base = name.rstrip('/')
+        for candidate in (f"{base}/index.html" if base else 'index.html', f"{base}.html"):
+            if candidate in self.files:
+                return candidate
+        return None
+
+    def apply_rules(self, path):
+        """Return (rule, target) for the first rule that applies to path, or (None, None)."""
+        for rule in self.rules:
+            target = rule.match(path)
+            if target is None:
+                continue
+            if not rule.is_redirect and not rule.force and self.file_for(path):
+                return None, None
+            return rule, target
+        return None, None
+
+    def resolve(self, path):
+        """Follow redirects from a URL path until something answers."""
+        hops = []
+        seen = {path}
+        while True:
+            rule, target = self.apply_rules(path)
+            if rule is None:
+                status = 200 if self.file_for(path) else 404
+                return Resolution(status, path, tuple(hops))
+            if not rule.is_redirect:
+                status = 200 if self.file_for(target) else 404
+                return Resolution(status, path, tuple(hops), rewritten=True)
+            hops.append((rule.status, target))
+            if target in seen or len(hops) > MAX_HOPS:
+                return Resolution(310, target, tuple(hops))
+            seen.add(target)
+            path = target
+
+@lru_cache(maxsize=None)
+def load_route_table(dist_dir):
+    return RouteTable(dist_dir)
+
+def page_path(page):
+    """Return the URL path a dist-relative page is reached at, for relative links."""
+    path = PurePosixPath(page)
+    if path.name == 'index.html':
+        return '/' if path.parent.as_posix() == '.' else f"/{path.parent.as_posix()}"
+    return f"/{path.as_posix()}"
+
+def internal_path(url, base):
+    """Return (path, parts, absolute) for a link to this site, or None for anything else."""
+    url = url.strip()
+    if not url or url.startswith(('#', 'mailto:', 'tel:', 'javascript:', 'data:')):
+        return None
+    absolute = url.startswith(SITE_URL)
+    if absolute:
+        url = url[len(SITE_URL):] or '/'
+    elif urlsplit(url).scheme or url.startswith('//'):
+        return None
+    parts = urlsplit(urljoin(base, url))
+    return parts.path or '/', parts, absolute
+
+def describe(url, resolution):
+    """One-line account of a link's redirects, for reports."""
+    hops = ' → '.join(f"{status} {target}" for status, target in resolution.hops)
+    if resolution.status == 310:
+        return f"{url} → {hops} (redirect loop)"
+    if resolution.rewritten:
+        return f"{url}{' → ' + hops if hops else ''} (missing, only served by a rewrite rule)"
+    if resolution.status == 404:
+        return f"{url}{' → ' + hops if hops else ''} (missing, 404)"
+    return f"{url} → {hops}"
+
+def resolve_url(url, table, base='/'):
+    """Return (new_url, problem) for one link.
+    
+    new_url is the link pointing at its final 200 target (the link itself
+    if it needs no change or cannot be fixed); problem describes a redirect
+    chain or missing page, or is None.
+    """
+    found = internal_path(url, base)
+    if found is None:
+        return url, None
+    path, parts, absolute = found
+    resolution = table.resolve(path)
+    if resolution.status != 200 or resolution.rewritten:
+        return url, describe(url, resolution)
+    if not resolution.hops:
+        return url, None
+    problem = describe(url, resolution) if len(resolution.hops) > 1 else None
+    new_url = urlunsplit(('', '', resolution.path, parts.query, parts.fragment))
+    return (f"{SITE_URL}{new_url}" if absolute else new_url), problem
+
+def resolve_page_links(content, page, table):
+    """Point the page's internal links at their final targets.
+    
+    Returns (content, rewritten links, problems).
+    """
+    document = parse_html(content)
+    splices = document.edit()
+    base = page_path(page)
+    rewritten = 0
+    problems = []
+    for selector, attr in LINK_SELECTORS:
+        for element in document.select(selector):
+            url = element.attrs[attr]
+            new_url, problem = resolve_url(url, table, base)
+            if problem:
+                problems.append(problem)
+            if new_url != url:
+                splices.set_attribute(element, attr, new_url)
+                rewritten += 1
+    return (splices.apply() if splices else content), rewritten, list(dict.fromkeys(problems))
+
+def resolve_links(content, page, dist_dir):
+    """Engine transform: rewrite one page's links and warn about the unfixable ones."""
+    content, _, problems = resolve_page_links(content, page, load_route_table(str(dist_dir)))
+    for problem in problems:
+        warn(problem)
+    return content
+
+def resolve_site_files(dist_dir, check=False):
+    """Rewrite the URLs in sitemap.xml, rss.xml and search-data.json in place.
+    
+    With check set nothing is written. Returns {file name: (links that
+    redirect, problems)} for the files present.
+    """
+    dist_dir = Path(dist_dir)
+    load_route_table.cache_clear()
+    table = RouteTable(dist_dir)
+    results = {}
+    for name, pattern in SITE_FILE_PATTERNS.items():
+        path = dist_dir / name
+        try:
+            text = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            continue
+        rewritten = 0
+        problems = []
+        def replace(match):
+            nonlocal rewritten
+            new_url, problem = resolve_url(match.group(2), table)
+            if problem:
+                problems.append(problem)
+            rewritten += new_url != match.group(2)
+            return f"{match.group(1)}{new_url}{match.group(3)}"
+        updated = pattern.sub(replace, text)
+        if updated != text and not check:
+            write_page(path, updated)
+        problems = list(dict.fromkeys(problems))
+        for problem in problems:
+            print(f"⚠️  {name}: {problem}")
+        results[name] = (rewritten, problems)
+    return results
+
+def _resolve_file(file_path, dist_dir, check):
+    page = file_path.relative_to(dist_dir).as_posix()
+    content = file_path.read_text(encoding='utf-8')
+    updated, rewritten, problems = resolve_page_links(content, page, load_route_table(str(dist_dir)))
+    for problem in problems:
+        print(f"⚠️  {page}: {problem}")
+    if rewritten:
+        if not check:
+            write_page(file_path, updated)
+        print(f"{'🔎' if check else '✅'} {page}: {rewritten} link(s) {'redirect' if check else 'rewritten'}")
+    return rewritten, len(problems)
+
+def main():
+    """Rewrite internal links in dist/ to skip redirects and report broken ones."""
+    parser = argparse.ArgumentParser(description="Point internal links at their final 200 URL")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    parser.add_argument('--check', action='store_true',
+                        help="Only report; exit 1 if any link redirects or is missing")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("🔗 RESOLVING INTERNAL LINKS")
+    print("=" * 60)
+    html_files = sorted(args.dist.rglob("*.html"))
+    worker = partial(_resolve_file, dist_dir=args.dist, check=args.check)
+    results = [page.result or (0, 1) for page in run_pages(worker, html_files, args.jobs)]
+    rewritten = sum(r[0] for r in results)
+    problems = sum(r[1] for r in results)
+    
+    for name, (count, found) in resolve_site_files(args.dist, args.check).items():
+        rewritten += count
+        problems += len(found)
+        if count:
+            print(f"{'🔎' if args.check else '✅'} {name}: {count} link(s) {'redirect' if args.check else 'rewritten'}")
+    
+    print("-" * 40)
+    print(f"📊 {'Redirecting' if args.check else 'Rewritten'} links: {rewritten}")
+    print(f"⚠️  Chains and missing pages: {problems}")
+    if problems or (args.check and rewritten):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Machine-readable post-processing run report.
+
+The engine times every transform on every page and hands the numbers to a
+RunReport, which keeps per-transform totals and, if given a path, streams
+one JSON object per line (NDJSON):
+
+    {"type": "run", ...}        the dist dir, worker count and transforms
+    {"type": "prepare", ...}    seconds spent in each prepare step
+    {"type": "page", ...}       status, bytes read/written, read/write time
+                                and, per transform, seconds, size before
+                                and after, whether it changed the page,
+                                how often each of its selectors or patterns
+                                matched and any warnings it raised, and how
+                                many transforms the anchor prefilter skipped
+    {"type": "finish", ...}     seconds spent in each finish step
+    {"type": "transform", ...}  totals: pages, hits (page changed), misses,
+                                warnings, seconds, bytes delta, the slowest
+                                page and, per selector or pattern, matches
+                                and the pages it matched or missed on
+    {"type": "summary", ...}    page counts and total wall time
+
+`jq 'select(.type == "transform")' report.ndjson` lists the totals.
+
+Selectors run through html_tree.select()/select_one() are counted
+automatically; a fixer that still scans with a regex reports it with
+count(). A transform explains a miss, such as a fallback to the unchanged
+page, by calling warn() instead of printing: the message lands in its row
+of the page record and is printed by the engine in page order.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+REPORT_VERSION = 1
+
+# Notes of the transform currently running on a page, None outside the engine
+_notes = ContextVar('transform_notes', default=None)
+
+@contextmanager
+def collect_notes():
+    """Collect the count() and warn() calls made inside the block into the yielded dict."""
+    notes = {'patterns': {}, 'warnings': []}
+    token = _notes.set(notes)
+    try:
+        yield notes
+    finally:
+        _notes.reset(token)
+
+def count(pattern, matches):
+    """Record how often a selector or pattern matched on the page being transformed.
+    
+    Zero records a miss. Does nothing outside the engine.
+    """
+    notes = _notes.get()
+    if notes is not None:
+        patterns = notes['patterns']
+        patterns[pattern] = patterns.get(pattern, 0) + matches
+
+def warn(message):
+    """Record a warning for the page being transformed, or print it outside the engine."""
+    notes = _notes.get()
+    if notes is None:
+        print(f"⚠️  {message}")
+    else:
+        notes['warnings'].append(message)
+
+class TransformTotals:
+    __slots__ = ('name', 'pages', 'hits', 'warnings', 'patterns', 'seconds', 'bytes_delta', 'slowest_page',
+                 'slowest_seconds', 'prepare_seconds', 'finish_seconds')
+
+    def __init__(self, name):
+        self.name = name
+        self.pages = 0
+        self.hits = 0
+        self.warnings = 0
+        self.patterns = {}
+        self.seconds = 0.0
+        self.bytes_delta = 0
+        self.slowest_page = None
+        self.slowest_seconds = 0.0
+        self.prepare_seconds = None
+        self.finish_seconds = None
+
+    def as_dict(self):
+        return {
+            'type': 'transform',
+            'name': self.name,
+            'pages': self.pages,
+            'hits': self.hits,
+            'misses': self.pages - self.hits,
+            'warnings': self.warnings,
+            'seconds': round(self.seconds, 6),
+            'bytes_delta': self.bytes_delta,
+            'slowest_page': self.slowest_page,
+            'slowest_seconds': round(self.slowest_seconds, 6),
+            'prepare_seconds': self.prepare_seconds,
+            'finish_seconds': self.finish_seconds,
+            'patterns': self.patterns,
+        }
+
+    def add_patterns(self, patterns):
+        for pattern, matches in patterns.items():
+            totals = self.patterns.setdefault(pattern, {'matches': 0, 'pages': 0, 'misses': 0})
+            totals['matches'] += matches
+            totals['pages' if matches else 'misses'] += 1
+
+class RunReport:
+    """Collect per-transform totals and optionally write them as NDJSON."""
+
+    def __init__(self, transforms, path=None, **run_info):
+        self.started = time.perf_counter()
+        self.totals = {t.name: TransformTotals(t.name) for t in transforms}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.file = open(path, 'w', encoding='utf-8') if path else None
+        self.write({'type': 'run', 'version': REPORT_VERSION,
+                    'started': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                    'transforms': list(self.totals), **run_info})
+
+    def write(self, record):
+        if self.file is not None:
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def step(self, kind, name, seconds):
+        """Record the time a transform's prepare or finish step took."""
+        setattr(self.totals[name], f"{kind}_seconds", round(seconds, 6))
+        self.write({'type': kind, 'transform': name, 'seconds': round(seconds, 6)})
+
+    def page(self, page, status, stats):
+        """Record one page: stats is the dict returned by process_page()."""
+        stats = stats or {}
+        self.bytes_read += stats.get('bytes_in', 0)
+        self.bytes_written += stats.get('bytes_out', 0)
+        for name, seconds, before, after, changed, notes in stats.get('transforms', ()):
+            totals = self.totals[name]
+            totals.pages += 1
+            totals.hits += changed
+            totals.warnings += len(notes['warnings'])
+            totals.add_patterns(notes['patterns'])
+            totals.seconds += seconds
+            totals.bytes_delta += after - before
+            if seconds > totals.slowest_seconds:
+                totals.slowest_page, totals.slowest_seconds = page, seconds
+        record = {'type': 'page', 'page': page, 'status': status, **stats}
+        if 'transforms' in record:
+            record['transforms'] = [
+                {'name': name, 'seconds': round(seconds, 6), 'bytes_before': before,
+                 'bytes_after': after, 'changed': bool(changed), **notes}
+                for name, seconds, before, after, changed, notes in record['transforms']
+            ]
+        self.write(record)
+
+    def close(self, counts):
+        """Write the per-transform totals and the run summary."""
+        for totals in self.totals.values():
+            self.write(totals.as_dict())
+        self.write({'type': 'summary', **counts, 'bytes_read': self.bytes_read,
+                    'bytes_written': self.bytes_written,
+                    'seconds': round(time.perf_counter() - self.started, 6)})
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def print_totals(self):
+        """Print one line per transform: time, hits and bytes saved or added."""
+        print("⏱  Per transform:")
+        for totals in self.totals.values():
+            if not totals.pages and totals.prepare_seconds is None and totals.finish_seconds is None:
+                continue
+            steps = sum(s for s in (totals.prepare_seconds, totals.finish_seconds) if s)
+            print(f"  {totals.name:<20} {totals.seconds * 1000:9.1f} ms  {totals.hits:>5}/{totals.pages:<5} "
+                  f"pages changed  {totals.bytes_delta:+10,} bytes"
+                  + (f"  (setup {steps * 1000:.1f} ms)" if steps else '')
+                  + (f"  ⚠️  {totals.warnings} warnings" if totals.warnings else ''))
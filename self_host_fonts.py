@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Self-Hosted Inter Fonts
+=======================
+Subsets local Inter font files to the characters that actually appear in
+dist/**/*.html, writes one content-hashed WOFF2 per weight to _astro/fonts/
+and replaces the Google Fonts blocks that optimize_font_loading.py leaves in
+each page with same-origin @font-face rules and a preload for the body
+weight, removing the DNS/TLS/CSS round trips to fonts.googleapis.com and
+fonts.gstatic.com.
+
+Source fonts are read from fonts/ (Inter-Regular.ttf, Inter-SemiBold.otf,
+Inter-Bold.woff2, ... as shipped in the Inter release). Subsetting needs
+fontTools and brotli (pip install fonttools brotli).
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import re
+from functools import lru_cache, partial
+from html.parser import HTMLParser
+from pathlib import Path
+
+from html_tree import matches, parse_html
+from optimize_font_loading import FONT_COMMENT
+from page_stream import write_if_changed, write_page
+from parallel_pages import add_jobs_argument, run_pages
+from run_report import count
+
+try:
+    from fontTools import subset
+except ImportError:
+    subset = None
+
+FONT_SOURCE_DIR = Path(__file__).parent / "fonts"
+FONTS_DIR = "_astro/fonts"
+FONTS_MANIFEST = "fonts.json"
+FONT_EXTENSIONS = ('.woff2', '.ttf', '.otf')
+FONT_FAMILY = 'Inter'
+BODY_WEIGHT = 400
+
+# CSS weight -> style name in the Inter release file names
+WEIGHTS = {
+    300: 'Light',
+    400: 'Regular',
+    500: 'Medium',
+    600: 'SemiBold',
+    700: 'Bold',
+    800: 'ExtraBold',
+}
+
+# Always kept so text inserted at runtime (search results, forms) still renders
+BASE_CHARACTERS = ''.join(chr(c) for c in range(0x20, 0x7F))
+
+SELF_HOSTED_MARKER = 'data-self-hosted-fonts'
+
+# Everything the Google Fonts setup, or an earlier run, leaves in a page: the
+# links (a <noscript> holding one goes with it), the loader scripts and
+# optimize_font_loading's comment are matched in google_font_elements()
+GOOGLE_FONT_SELECTOR = 'link[href*="fonts.googleapis.com"], link[href*="fonts.gstatic.com"]'
+SELF_HOSTED_SELECTOR = f'link[rel=preload][href^="/{FONTS_DIR}/"], style[{SELF_HOSTED_MARKER}]'
+GOOGLE_FONTS_HOST = 'fonts.googleapis.com'
+# @font-face rules inside inline <style> blocks that point at fonts.gstatic.com
+GSTATIC_FONT_FACE_RE = re.compile(
+    r'(?:/\* Optimized font loading \*/\s*)?@font-face\s*\{[^}]*fonts\.gstatic\.com[^}]*\}\s*')
+
+class _TextCollector(HTMLParser):
+    """Gather every character rendered as text (or as a placeholder/value)."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip = 0
+        self.characters = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self.skip += 1
+        for name, value in attrs:
+            if name in ('placeholder', 'value') and value:
+                self.characters.update(value)
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self.skip:
+            self.skip -= 1
+
+    def handle_data(self, data):
+        if not self.skip:
+            self.characters.update(data)
+
+def used_characters(dist_dir):
+    """Return every character displayed by the HTML pages under dist_dir."""
+    characters = set(BASE_CHARACTERS)
+    for html_file in sorted(Path(dist_dir).rglob("*.html")):
+        collector = _TextCollector()
+        collector.feed(html_file.read_text(encoding='utf-8'))
+        collector.close()
+        characters |= collector.characters
+    return ''.join(sorted(c for c in characters if c >= ' '))
+
+def find_font_sources(source_dir):
+    """Map each CSS weight to its Inter source file in source_dir."""
+    sources = {}
+    for weight, style in WEIGHTS.items():
+        for ext in FONT_EXTENSIONS:
+            path = Path(source_dir) / f"{FONT_FAMILY}-{style}{ext}"
+            if path.exists():
+                sources[weight] = path
+                break
+    return sources
+
+def subset_font(source, text):
+    """Return WOFF2 bytes of a font subset to the given characters."""
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    options.name_IDs = []
+    options.notdef_outline = True
+    font = subset.load_font(str(source), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    out = io.BytesIO()
+    subset.save_font(font, out, options)
+    return out.getvalue()
+
+def font_href(weight, data):
+    digest = hashlib.sha256(data).hexdigest()[:8]
+    return f"/{FONTS_DIR}/{FONT_FAMILY.lower()}-{weight}.{digest}.woff2"
+
+def build_fonts(dist_dir, source_dir=FONT_SOURCE_DIR):
+    """Subset every available weight and record the results in fonts.json.
+    
+    fonts.json is replaced atomically, and hashed fonts it no longer lists
+    (left by a run over a different character set) are deleted.
+    
+    Returns {weight: href}, or None if the fonts could not be built (in
+    which case pages keep loading Inter from Google Fonts).
+    """
+    dist_dir = Path(dist_dir)
+    sources = find_font_sources(source_dir)
+    if not sources:
+        print(f"⚠️  No Inter font files in {source_dir} - keeping Google Fonts")
+        return None
+    if subset is None:
+        print("⚠️  fontTools not installed - keeping Google Fonts (pip install fonttools brotli)")
+        return None
+    
+    text = used_characters(dist_dir)
+    out_dir = dist_dir / FONTS_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fonts = {}
+    for weight, source in sorted(sources.items()):
+        data = subset_font(source, text)
+        href = font_href(weight, data)
+        write_page(dist_dir / href.lstrip('/'), data)
+        fonts[str(weight)] = href
+        print(f"🔤 {source.name} -> {href} ({len(data) / 1024:.1f} KB, {len(text)} characters)")
+    
+    write_if_changed(out_dir / FONTS_MANIFEST, json.dumps(fonts, indent=2) + '\n')
+    removed = remove_stale_fonts(out_dir, fonts)
+    if removed:
+        print(f"🧹 Removed {removed} font files no longer in {FONTS_MANIFEST}")
+    load_fonts.cache_clear()
+    return fonts
+
+def remove_stale_fonts(out_dir, fonts):
+    """Delete hashed font files in out_dir that the manifest no longer lists.
+    
+    Returns the number of files removed.
+    """
+    current = {Path(href).name for href in fonts.values()}
+    removed = 0
+    for path in Path(out_dir).glob(f"{FONT_FAMILY.lower()}-*.woff2"):
+        if path.name not in current:
+            path.unlink()
+            removed += 1
+    return removed
+
+@lru_cache(maxsize=None)
+def load_fonts(dist_dir):
+    """Return {weight: href} from the last build_fonts() run (cached per process)."""
+    try:
+        with open(Path(dist_dir) / FONTS_DIR / FONTS_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def font_face_css(fonts):
+    """Return minified @font-face rules for every weight."""
+    return ''.join(
+        f"@font-face{{font-family:'{FONT_FAMILY}';font-style:normal;font-weight:{weight};"
+        f"font-display:swap;src:url({href}) format('woff2')}}"
+        for weight, href in sorted(fonts.items(), key=lambda item: int(item[0]))
+    )
+
+def self_hosted_block(fonts, indent=None):
+    """Return the preload + @font-face markup that replaces Google Fonts.
+    
+    With an indent the tags go on their own lines, otherwise on one line.
+    """
+    lines = []
+    body = fonts.get(str(BODY_WEIGHT))
+    if body:
+        lines.append(f'<link rel="preload" href="{body}" as="font" type="font/woff2" crossorigin>')
+    lines.append(f'<style {SELF_HOSTED_MARKER}>{font_face_css(fonts)}</style>')
+    if indent is None:
+        return ''.join(lines)
+    return ''.join(f"{indent}{line}\n" for line in lines)
+
+def self_host_fonts(content, fonts):
+    """Swap a page's Google Fonts loading for the self-hosted fonts.
+    
+    The new block goes where the first Google Fonts tag was; every other
+    Google Fonts tag, loader script and gstatic @font-face rule is removed.
+    Returns the content unchanged if `fonts` is empty or the page never
+    loaded Inter from Google.
+    """
+    if not fonts:
+        return content
+    
+    document = parse_html(content)
+    splices = document.edit()
+    elements = google_font_elements(document)
+    spans = [(el.start, el.end) for el in elements]
+    spans += [(comment.start, comment.end) for comment in document.comments
+              if comment.data.strip().startswith(FONT_COMMENT)]
+    font_faces = [(style.inner_start + match.start(), style.inner_start + match.end())
+                  for style in document.select('style') if style not in elements
+                  for match in GSTATIC_FONT_FACE_RE.finditer(document.inner_html(style))]
+    count(GSTATIC_FONT_FACE_RE.pattern, len(font_faces))
+    if not spans and not font_faces:
+        return content
+    
+    first = indent = None
+    if spans:
+        tag_start, tag_end = min(spans)
+        first = splices.line_span(tag_start, tag_end)
+        if first[1] > tag_end:
+            # The first tag had its line to itself: lay the block out the same way
+            indent = content[first[0]:tag_start]
+    block = self_hosted_block(fonts, indent)
+    
+    pos = 0
+    for start, end in sorted([splices.line_span(*span) for span in spans] + font_faces):
+        if start < pos:
+            continue
+        splices.replace(start, end, block if (start, end) == first else '')
+        pos = end
+    
+    head = document.select_one('head')
+    if first is None and head is not None:
+        splices.insert(head.inner_end, block)
+    return splices.apply()
+
+def google_font_elements(document):
+    """Return the Google Fonts tags and earlier self-hosted blocks in a page.
+    
+    A <noscript> holding a Google Fonts link is returned in place of the
+    link, and inline scripts that load fonts.googleapis.com are included.
+    """
+    found = []
+    for el in document.iter():
+        if el.tag == '#document' or any(ancestor in found for ancestor in el.ancestors()):
+            continue
+        if el.tag == 'noscript':
+            if any(matches(child, GOOGLE_FONT_SELECTOR) for child in el.iter() if child is not el):
+                found.append(el)
+        elif el.tag == 'script':
+            if 'src' not in el.attrs and GOOGLE_FONTS_HOST in document.inner_html(el):
+                found.append(el)
+        elif matches(el, f'{GOOGLE_FONT_SELECTOR}, {SELF_HOSTED_SELECTOR}'):
+            found.append(el)
+    return found
+
+def self_host_fonts_file(file_path, dist_dir):
+    """Apply the self-hosted fonts to a single HTML file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        updated_content = self_host_fonts(content, load_fonts(str(dist_dir)))
+        if updated_content == content:
+            return False
+        
+        write_page(file_path, updated_content)
+        print(f"✅ Self-hosted fonts in: {file_path}")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error updating {file_path}: {e}")
+        return False
+
+def main():
+    """Subset Inter and switch every page in dist/ to the self-hosted copy."""
+    parser = argparse.ArgumentParser(description="Self-host subsetted Inter fonts")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    parser.add_argument('--fonts', type=Path, default=FONT_SOURCE_DIR,
+                        help="Directory with the Inter source files (default: fonts/)")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("🔤 SELF-HOSTING FONTS")
+    print("=" * 60)
+    if build_fonts(args.dist, args.fonts) is None:
+        return 1
+    
+    html_files = sorted(args.dist.rglob("*.html"))
+    print("-" * 40)
+    worker = partial(self_host_fonts_file, dist_dir=args.dist)
+    updated_count = sum(1 for page in run_pages(worker, html_files, args.jobs) if page.result)
+    print("-" * 40)
+    print(f"✅ Switched {updated_count} of {len(html_files)} files to self-hosted fonts")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
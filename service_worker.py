@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Service Worker and Precache Manifest
+====================================
+Walks dist/ after post-processing and writes /sw.js, a small service worker
+carrying a versioned precache manifest (URL + content hash) of the site
+shell: the homepage and blog index, the most recent posts, search-data.json
+and every same-origin stylesheet, script, font, icon and manifest those
+pages load. Every page gets a one-line script registering the worker.
+
+At runtime the worker serves page navigations stale-while-revalidate and
+content-hashed assets (/_astro/* and fingerprinted files) cache-first, so a
+repeat visit renders from the local cache. After a deploy the new worker
+copies every entry whose hash is unchanged from the old cache and only
+fetches the rest.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from fingerprint_assets import SITE_URL, load_fingerprints
+from html_tree import parse_html
+from netlify_headers import write_headers_section
+from page_manifest import hash_bytes
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+
+SW_NAME = "sw.js"
+SEARCH_DATA = "search-data.json"
+SHELL_PAGES = ('/', '/blog')
+TOP_POSTS = 6
+# The worker script itself must always be revalidated so deploys are picked up
+SW_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+# Elements whose same-origin URL is part of the shell; preloaded hero images
+# are left to the runtime cache
+SHELL_SELECTORS = [
+    'link[rel~=stylesheet][href]',
+    'link[rel=preload][as=style][href]',
+    'link[rel=preload][as=script][href]',
+    'link[rel=preload][as=font][href]',
+    'link[rel=modulepreload][href]',
+    'link[rel~=icon][href]',
+    'link[rel=apple-touch-icon][href]',
+    'link[rel=manifest][href]',
+    'script[src]',
+]
+
+REGISTER_MARKER = 'data-sw-register'
+REGISTER_SCRIPT = (f'<script {REGISTER_MARKER}>if("serviceWorker"in navigator)'
+                   f'addEventListener("load",()=>navigator.serviceWorker.register("/{SW_NAME}"))</script>')
+
+SW_TEMPLATE = r'''// Generated by service_worker.py - do not edit
+const PRECACHE = __PRECACHE__;
+const PRECACHE_CACHE = `precache-${PRECACHE.version}`, PAGES_CACHE = "pages", ASSETS_CACHE = "assets",
+  META_CACHE = "precache-meta", META_URL = "/__precache-meta", MAX_PAGES = 50, MAX_ASSETS = 300;
+const HASHED = /^\/_astro\/|\.[0-9a-f]{8}\.[a-z0-9]+$/;
+const PRECACHED = new Set(PRECACHE.entries.map(([url]) => url));
+
+async function previousManifest() {
+  const meta = await caches.open(META_CACHE), response = await meta.match(META_URL);
+  return response ? response.json() : {version: null, entries: []};
+}
+function clean(response) {
+  // Redirected responses cannot answer navigations
+  return response.redirected
+    ? new Response(response.body, {status: response.status, statusText: response.statusText, headers: response.headers})
+    : response;
+}
+async function trim(name, max) {
+  const cache = await caches.open(name), keys = await cache.keys();
+  await Promise.all(keys.slice(0, Math.max(0, keys.length - max)).map(key => cache.delete(key)));
+}
+
+self.addEventListener("install", event => {
+  event.waitUntil((async () => {
+    const previous = await previousManifest(), revisions = new Map(previous.entries);
+    const old = previous.version && await caches.has(`precache-${previous.version}`)
+      ? await caches.open(`precache-${previous.version}`) : null;
+    const cache = await caches.open(PRECACHE_CACHE);
+    await Promise.all(PRECACHE.entries.map(async ([url, revision]) => {
+      let response = old && revisions.get(url) === revision ? await old.match(url) : null;
+      if (!response) response = clean(await fetch(url, {cache: "no-cache"}));
+      if (response.ok) await cache.put(url, response);
+    }));
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener("activate", event => {
+  event.waitUntil((async () => {
+    const previous = await previousManifest(), revisions = new Map(previous.entries);
+    const pages = await caches.open(PAGES_CACHE);
+    // Pages whose precached copy changed must not be shadowed by a stale runtime copy
+    await Promise.all(PRECACHE.entries.filter(([url, revision]) => revisions.get(url) !== revision)
+      .map(([url]) => pages.delete(url)));
+    for (const name of await caches.keys())
+      if (name.startsWith("precache-") && name !== PRECACHE_CACHE && name !== META_CACHE) await caches.delete(name);
+    const meta = await caches.open(META_CACHE);
+    await meta.put(META_URL, new Response(JSON.stringify(PRECACHE), {headers: {"Content-Type": "application/json"}}));
+    await self.clients.claim();
+  })());
+});
+
+async function staleWhileRevalidate(event, request) {
+  const url = new URL(request.url), key = url.origin + url.pathname;
+  const cached = await caches.match(key);
+  const network = fetch(request).then(async response => {
+    if (response.ok) {
+      const pages = await caches.open(PAGES_CACHE);
+      await pages.put(key, clean(response.clone()));
+      await trim(PAGES_CACHE, MAX_PAGES);
+    }
+    return response;
+  });
+  if (cached) {
+    event.waitUntil(network.catch(() => {}));
+    return cached;
+  }
+  return network;
+}
+
+async function cacheFirst(request) {
+  const cached = await caches.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok && !PRECACHED.has(new URL(request.url).pathname)) {
+    const assets = await caches.open(ASSETS_CACHE);
+    await assets.put(request, response.clone());
+    await trim(ASSETS_CACHE, MAX_ASSETS);
+  }
+  return response;
+}
+
+self.addEventListener("fetch", event => {
+  const request = event.request, url = new URL(request.url);
+  if (request.method !== "GET" || url.origin !== location.origin) return;
+  if (request.mode === "navigate") event.respondWith(staleWhileRevalidate(event, request));
+  else if (HASHED.test(url.pathname) || PRECACHED.has(url.pathname)) event.respondWith(cacheFirst(request));
+});
+'''
+
+def page_file(dist_dir, url):
+    """Map a pretty URL such as /blog/my-post to its HTML file in dist_dir."""
+    path = Path(dist_dir) / url.strip('/')
+    if path.suffix == '.html':
+        return path
+    return path / "index.html"
+
+def local_path(url):
+    """Return the root-relative path of a same-origin URL, or None."""
+    if url.startswith(SITE_URL):
+        url = url[len(SITE_URL):]
+    if not url.startswith('/') or url.startswith('//'):
+        return None
+    return url.split('#')[0].split('?')[0]
+
+def top_posts(dist_dir, count=TOP_POSTS):
+    """Return the URLs of the most recent posts listed in search-data.json."""
+    try:
+        with open(Path(dist_dir) / SEARCH_DATA, 'r', encoding='utf-8') as f:
+            posts = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+    posts = sorted(posts, key=lambda post: post.get('date', ''), reverse=True)
+    return [post['url'] for post in posts[:count] if post.get('url')]
+
+def shell_assets(content):
+    """Return the same-origin URLs a page loads for its shell."""
+    document = parse_html(content)
+    urls = []
+    for selector in SHELL_SELECTORS:
+        for element in document.select(selector):
+            path = local_path(element.attrs.get('href') or element.attrs.get('src', ''))
+            if path and path not in urls:
+                urls.append(path)
+    return urls
+
+def precache_entries(dist_dir):
+    """Return {url: (file, content hash)} for every precached URL that exists in dist_dir."""
+    dist_dir = Path(dist_dir)
+    pages = list(SHELL_PAGES) + [url for url in top_posts(dist_dir) if url not in SHELL_PAGES]
+    entries = {}
+    assets = []
+    for url in pages:
+        path = page_file(dist_dir, url)
+        if not path.exists():
+            continue
+        data = path.read_bytes()
+        entries[url] = (path, hash_bytes(data)[:8])
+        assets.extend(a for a in shell_assets(data.decode('utf-8')) if a not in assets)
+    
+    search_data = load_fingerprints(str(dist_dir)).get(f"/{SEARCH_DATA}", f"/{SEARCH_DATA}")
+    for url in assets + [search_data]:
+        path = dist_dir / url.lstrip('/')
+        if url not in entries and path.is_file():
+            entries[url] = (path, hash_bytes(path.read_bytes())[:8])
+    return entries
+
+def write_service_worker(dist_dir):
+    """Write dist/sw.js with the current precache manifest. Returns the manifest.
+    
+    Runs after every page has been processed, so the hashes describe the
+    pages and assets as deployed.
+    """
+    dist_dir = Path(dist_dir)
+    entries = precache_entries(dist_dir)
+    revisions = sorted((url, revision) for url, (_, revision) in entries.items())
+    version = hash_bytes(json.dumps(revisions).encode('utf-8'))[:8]
+    manifest = {'version': version, 'entries': revisions}
+    
+    script = SW_TEMPLATE.replace('__PRECACHE__', json.dumps(manifest, separators=(',', ':')))
+    write_page(dist_dir / SW_NAME, script)
+    write_headers_section(dist_dir, 'service_worker.py', [(f"/{SW_NAME}", {'Cache-Control': SW_CACHE_CONTROL})])
+    
+    size = sum(path.stat().st_size for path, _ in entries.values())
+    print(f"📦 Service worker {version}: precaching {len(revisions)} URLs ({size / 1024:.1f} KB)")
+    return manifest
+
+def register_service_worker(content):
+    """Add the service worker registration script before </body>."""
+    document = parse_html(content)
+    if document.select_one(f'script[{REGISTER_MARKER}]') is not None:
+        return content
+    body = document.select_one('body')
+    if body is None:
+        return content
+    splices = document.edit()
+    splices.insert(body.inner_end, REGISTER_SCRIPT)
+    return splices.apply()
+
+def register_service_worker_file(file_path):
+    """Add the registration script to a single HTML file."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        updated_content = register_service_worker(content)
+        if updated_content == content:
+            return False
+        
+        write_page(file_path, updated_content)
+        print(f"✅ Registered service worker in: {file_path}")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error updating {file_path}: {e}")
+        return False
+
+def main():
+    """Register the service worker on every page and write dist/sw.js."""
+    parser = argparse.ArgumentParser(description="Generate the service worker and its precache manifest")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("📦 SERVICE WORKER")
+    print("=" * 60)
+    html_files = sorted(args.dist.rglob("*.html"))
+    updated_count = sum(1 for page in run_pages(register_service_worker_file, html_files, args.jobs)
+                        if page.result)
+    print(f"✅ Added the registration script to {updated_count} of {len(html_files)} files")
+    write_service_worker(args.dist)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Site Metadata Index
+===================
+Parses every page in dist/ once into a cached index (.site-metadata.json)
+and regenerates the files that used to repeat per-post metadata by hand:
+
+- sitemap.xml, with each page's `lastmod` moved forward only when the hash
+  of its text content changes
+- rss.xml, one item per post, newest first
+- search-data.json, in the format the search index and script read
+- the Twitter card image of each post, used by fix_twitter_images.py
+
+For each post (blog/<slug>/index.html) the index records the title,
+description, tags, publish date, author, social image and word count. Pages
+whose bytes match the cached hash are not parsed again.
+"""
+
+import argparse
+import fnmatch
+import html
+import json
+import re
+import subprocess
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from html.parser import HTMLParser
+from pathlib import Path, PurePosixPath
+
+from fingerprint_assets import SITE_URL, load_fingerprints, rewrite_references
+from html_tree import parse_html
+from page_manifest import hash_bytes, load_json_cache, save_json_cache
+from page_stream import write_if_changed
+from resolve_links import RouteTable, resolve_url
+
+METADATA_NAME = ".site-metadata.json"
+METADATA_VERSION = 1
+SITEMAP = "sitemap.xml"
+RSS = "rss.xml"
+SEARCH_DATA = "search-data.json"
+
+POST_PATTERN = 'blog/*/index.html'
+DEFAULT_AUTHOR = "Promptmakers Team"
+AUTHOR_EMAIL = "authors@promptmakers.app"
+
+# (page pattern, changefreq, priority) for pages not yet in the sitemap; first match wins
+SITEMAP_DEFAULTS = [
+    ('index.html', 'weekly', '1.0'),
+    ('blog/index.html', 'weekly', '0.9'),
+    ('blog/category/*/index.html', 'weekly', '0.9'),
+    ('topics/*/index.html', 'weekly', '0.8'),
+    (POST_PATTERN, 'monthly', '0.8'),
+    ('*', 'monthly', '0.7'),
+]
+
+RSS_CHANNEL = {
+    'title': "Promptmakers Blog - AI & Prompt Engineering",
+    'description': ("Master AI prompt engineering with practical guides, tips, and tutorials for ChatGPT, "
+                    "Gemini, Claude, and other AI models. Discover the latest AI trends and agent technologies."),
+    'image': "/images/logo.png",
+    'image_title': "Promptmakers Blog",
+}
+
+HASHED_SUFFIX_RE = re.compile(r'\.[0-9a-f]{8}(?=\.[^./]+$)')
+SITEMAP_URL_RE = re.compile(
+    r'<url>\s*<loc>([^<]*)</loc>\s*(?:<lastmod>([^<]*)</lastmod>\s*)?'
+    r'(?:<changefreq>([^<]*)</changefreq>\s*)?(?:<priority>([^<]*)</priority>\s*)?</url>')
+
+class _PageText(HTMLParser):
+    """Collect a page's visible body text, and separately its article text."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.in_body = False
+        self.skip = 0
+        self.article_depth = 0
+        self.text = []
+        self.article = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            self.in_body = True
+        if tag in ('script', 'style'):
+            self.skip += 1
+        if self.article_depth:
+            if tag not in ('br', 'img', 'hr', 'input', 'meta', 'link', 'source', 'wbr'):
+                self.article_depth += 1
+        elif 'article-content' in (dict(attrs).get('class') or '').split():
+            self.article_depth = 1
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self.skip:
+            self.skip -= 1
+        if self.article_depth:
+            self.article_depth -= 1
+
+    def handle_data(self, data):
+        if self.in_body and not self.skip:
+            self.text.append(data)
+            if self.article_depth:
+                self.article.append(data)
+
+def page_text(content):
+    """Return (body text, article text) with whitespace collapsed.
+    
+    Text nodes are joined with newlines, so whitespace the minifier drops
+    between tags does not change the result.
+    """
+    parser = _PageText()
+    parser.feed(content)
+    parser.close()
+    text = '\n'.join(filter(None, (' '.join(data.split()) for data in parser.text)))
+    return text, ' '.join(' '.join(parser.article).split())
+
+def original_url(url):
+    """Strip the content hash fingerprint_assets.py adds to a file name."""
+    if url.startswith(SITE_URL):
+        url = url[len(SITE_URL):]
+    return HASHED_SUFFIX_RE.sub('', url.split('?')[0])
+
+def element_text(document, element):
+    """Return the text inside an element, tags removed."""
+    inner = re.sub(r'<[^>]*>', ' ', document.inner_html(element))
+    return ' '.join(html.unescape(inner).split())
+
+def meta_content(document, *selectors):
+    """Return the first non-empty content of the meta tags matching selectors."""
+    for selector in selectors:
+        for meta in document.select(selector):
+            if meta.attrs.get('content', '').strip():
+                return meta.attrs['content'].strip()
+    return ''
+
+def json_ld_items(document):
+    """Yield every JSON-LD object in a page, flattening lists and @graph."""
+    for script in document.select('script[type="application/ld+json"]'):
+        try:
+            data = json.loads(document.inner_html(script))
+        except ValueError:
+            continue
+        stack = data if isinstance(data, list) else [data]
+        while stack:
+            item = stack.pop(0)
+            if isinstance(item, dict):
+                yield item
+                stack.extend(item.get('@graph', []))
+
+def slugify(tag):
+    return re.sub(r'[^a-z0-9]+', '-', tag.lower().lstrip('#')).strip('-')
+
+def post_tags(document):
+    """Return a post's tags as slugs: the visible #tags, else article:tag metas."""
+    tags = [element_text(document, el) for el in document.select('.article-tags .tag')]
+    if not tags:
+        tags = [meta.attrs.get('content', '') for meta in document.select('meta[property="article:tag"]')]
+    slugs = []
+    for tag in map(slugify, tags):
+        if tag and tag not in slugs:
+            slugs.append(tag)
+    return slugs
+
+def post_metadata(document, article_text):
+    """Extract the metadata of one post."""
+    ld = next((item for item in json_ld_items(document) if item.get('datePublished')), {})
+    heading = document.select_one('h1')
+    title_element = document.select_one('title')
+    title = (meta_content(document, 'meta[name=title]')
+             or (element_text(document, heading) if heading else '')
+             or (element_text(document, title_element) if title_element else ''))
+    date = (meta_content(document, 'meta[property="article:published_time"]')
+            or ld.get('datePublished', '')
+            or next((t.attrs['datetime'] for t in document.select('time.article-date[datetime]')), ''))
+    modified = meta_content(document, 'meta[property="article:modified_time"]') or ld.get('dateModified', '')
+    author = ld.get('author')
+    if isinstance(author, list):
+        author = author[0] if author else None
+    author = meta_content(document, 'meta[name=author]') or \
+        (author.get('name') if isinstance(author, dict) else author) or DEFAULT_AUTHOR
+    hero = document.select_one('.article-hero img[src]')
+    return {
+        'title': title,
+        'description': meta_content(document, 'meta[name=description]', 'meta[property="og:description"]'),
+        'tags': post_tags(document),
+        'date': date[:10],
+        'modified': modified[:10] or date[:10],
+        'author': author,
+        'og_image': original_url(meta_content(document, 'meta[property="og:image"]')),
+        'hero_image': original_url(hero.attrs['src']) if hero else '',
+        'words': len(re.findall(r'\w+', article_text)),
+    }
+
+def page_url(page, document=None):
+    """Return a page's absolute URL: its canonical link if on this site, else its path."""
+    if document is not None:
+        canonical = document.select_one('link[rel=canonical][href]')
+        if canonical is not None and canonical.attrs['href'].startswith(SITE_URL):
+            return canonical.attrs['href']
+    path = PurePosixPath(page)
+    if path.name == 'index.html':
+        parent = path.parent.as_posix()
+        return f"{SITE_URL}/" if parent == '.' else f"{SITE_URL}/{parent}/"
+    return f"{SITE_URL}/{path.as_posix()}"
+
+def extract_page(page, content):
+    """Parse one page into its index entry (without the sitemap fields)."""
+    document = parse_html(content)
+    text, article_text = page_text(content)
+    title_element = document.select_one('title')
+    title = element_text(document, title_element) if title_element else ''
+    description = meta_content(document, 'meta[name=description]')
+    entry = {
+        'url': page_url(page, document),
+        'content': hash_bytes(f"{title}\n{description}\n{text}".encode('utf-8'))[:16],
+        'noindex': 'noindex' in meta_content(document, 'meta[name=robots]').lower(),
+    }
+    if PurePosixPath(page).match(POST_PATTERN):
+        entry['post'] = post_metadata(document, article_text)
+    return entry
+
+def metadata_path(dist_dir):
+    return Path(dist_dir) / METADATA_NAME
+
+@lru_cache(maxsize=None)
+def load_site_metadata(dist_dir):
+    """Return {page: entry} from the last build_site_metadata() run (cached per process)."""
+    return load_json_cache(metadata_path(dist_dir), METADATA_VERSION, 'pages')
+
+def read_sitemap(dist_dir):
+    """Return {sitemap_key(url): (lastmod, changefreq, priority)} from the current sitemap.xml."""
+    try:
+        text = (Path(dist_dir) / SITEMAP).read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return {}
+    return {sitemap_key(html.unescape(m.group(1).strip())): m.groups()[1:] for m in SITEMAP_URL_RE.finditer(text)}
+
+def sitemap_defaults(page):
+    return next((freq, priority) for pattern, freq, priority in SITEMAP_DEFAULTS
+                if fnmatch.fnmatchcase(page, pattern))
+
+def iso_timestamp(date):
+    """Format a date the way sitemap.xml stores lastmod."""
+    return f"{date}T00:00:00.000Z"
+
+def commit_timestamp(path):
+    """Return the time of the last git commit touching a file as a lastmod, or None."""
+    path = Path(path)
+    try:
+        seconds = subprocess.run(['git', 'log', '-1', '--format=%ct', '--', path.name], capture_output=True,
+                                 text=True, cwd=path.parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    if not seconds:
+        return None
+    return datetime.fromtimestamp(int(seconds), timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+def page_lastmod(html_file, entry, changed=False):
+    """Return the lastmod for a page whose content is new or changed, or None.
+    
+    Taken from the post's modified date or the page's last git commit,
+    never the clock, so rebuilding the same tree gives the same sitemap. A
+    changed page prefers the commit, a new one the post date.
+    """
+    post_date = entry.get('post', {}).get('modified')
+    post_lastmod = iso_timestamp(post_date) if post_date else None
+    if changed:
+        return commit_timestamp(html_file) or post_lastmod
+    return post_lastmod or commit_timestamp(html_file)
+
+def sitemap_key(url):
+    """Reduce a page URL to a form shared by its /path, /path/ and /path.html spellings."""
+    for suffix in ('index.html', '.html'):
+        if url.endswith(suffix):
+            url = url[:-len(suffix)]
+            break
+    return url.rstrip('/')
+
+def build_site_metadata(dist_dir):
+    """Refresh the metadata index and regenerate the files built from it.
+    
+    A page keeps its sitemap lastmod until its content hash changes. Pages
+    seen for the first time take lastmod, changefreq and priority from the
+    existing sitemap.xml if it lists them under any spelling of their URL.
+    A page with no date to go by is listed without a lastmod. Returns
+    {page: entry}.
+    """
+    dist_dir = Path(dist_dir)
+    previous = load_site_metadata(str(dist_dir))
+    old_sitemap = None
+    pages = {}
+    parsed = 0
+    for html_file in sorted(dist_dir.rglob("*.html")):
+        page = html_file.relative_to(dist_dir).as_posix()
+        raw = html_file.read_bytes()
+        source = hash_bytes(raw)
+        old = previous.get(page)
+        if old is not None and old.get('source') == source:
+            pages[page] = old
+            continue
+        
+        entry = extract_page(page, raw.decode('utf-8'))
+        parsed += 1
+        entry['source'] = source
+        if old is not None:
+            changed = old.get('content') != entry['content']
+            entry['lastmod'] = page_lastmod(html_file, entry, changed=True) if changed else old.get('lastmod')
+            entry['changefreq'], entry['priority'] = old['changefreq'], old['priority']
+        else:
+            if old_sitemap is None:
+                old_sitemap = read_sitemap(dist_dir)
+            lastmod, freq, priority = old_sitemap.get(sitemap_key(entry['url']), (None, None, None))
+            default_freq, default_priority = sitemap_defaults(page)
+            entry['lastmod'] = lastmod or page_lastmod(html_file, entry)
+            entry['changefreq'] = freq or default_freq
+            entry['priority'] = priority or default_priority
+        pages[page] = entry
+    
+    # List pages under the URL that answers 200, not one netlify.toml redirects
+    routes = RouteTable(dist_dir)
+    for entry in pages.values():
+        entry['url'] = resolve_url(entry['url'], routes)[0]
+    
+    save_json_cache(metadata_path(dist_dir), METADATA_VERSION, 'pages', pages)
+    load_site_metadata.cache_clear()
+    load_image_mappings.cache_clear()
+    
+    assets = load_fingerprints(str(dist_dir))
+    written = [name for name, text in (
+        (SITEMAP, sitemap_xml(pages)),
+        (RSS, rewrite_references(rss_xml(pages), assets)),
+        (SEARCH_DATA, search_data_json(pages)),
+    ) if write_if_changed(dist_dir / name, text)]
+    
+    print(f"🗂  Site metadata: {len(pages)} pages ({parsed} parsed), {len(posts(pages))} posts"
+          + (f"; regenerated {', '.join(written)}" if written else ''))
+    return pages
+
+def posts(pages):
+    """Return [(slug, url, post metadata)] for every post, newest first."""
+    found = [(PurePosixPath(page).parent.name, entry['url'], entry['post'])
+             for page, entry in pages.items() if 'post' in entry and not entry['noindex']]
+    return sorted(found, key=lambda item: (item[2]['date'], item[0]), reverse=True)
+
+def social_image(post, shared_images):
+    """Return a post's own social image: og:image unless it is a site-wide default."""
+    if post['og_image'] and post['og_image'] not in shared_images:
+        return post['og_image']
+    return post['hero_image'] or post['og_image']
+
+def image_mappings(pages):
+    """Return {slug: file name in /images/} of each post's Twitter card image."""
+    og_images = [post['og_image'] for _, _, post in posts(pages) if post['og_image']]
+    shared = {image for image in og_images if og_images.count(image) > 1}
+    mappings = {}
+    for slug, _, post in posts(pages):
+        image = social_image(post, shared)
+        if image.startswith('/images/'):
+            mappings[slug] = image[len('/images/'):]
+    return mappings
+
+@lru_cache(maxsize=None)
+def load_image_mappings(dist_dir):
+    """Return image_mappings() of the cached index (cached per process)."""
+    return image_mappings(load_site_metadata(dist_dir))
+
+def sitemap_xml(pages):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for page, entry in sorted(pages.items(), key=lambda item: item[1]['url']):
+        if entry['noindex']:
+            continue
+        lines += ['  <url>', f"    <loc>{html.escape(entry['url'])}</loc>"]
+        if entry['lastmod']:
+            lines.append(f"    <lastmod>{entry['lastmod']}</lastmod>")
+        lines += [f"    <changefreq>{entry['changefreq']}</changefreq>",
+                  f"    <priority>{entry['priority']}</priority>",
+                  '  </url>']
+    lines.append('</urlset>')
+    return '\n'.join(lines) + '\n'
+
+def rss_date(date):
+    return format_datetime(datetime.strptime(date, '%Y-%m-%d').replace(tzinfo=timezone.utc), usegmt=True)
+
+def rss_xml(pages):
+    items = posts(pages)
+    og_images = [post['og_image'] for _, _, post in items if post['og_image']]
+    shared = {image for image in og_images if og_images.count(image) > 1}
+    e = html.escape
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/" '
+        'xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/">',
+        '  <channel>',
+        f"    <title>{e(RSS_CHANNEL['title'])}</title>",
+        f"    <description>{e(RSS_CHANNEL['description'])}</description>",
+        f"    <link>{SITE_URL}/</link>",
+        f'    <atom:link href="{SITE_URL}/{RSS}" rel="self" type="application/rss+xml"/>',
+        '    <language>en-us</language>',
+    ]
+    dates = [post['date'] for _, _, post in items if post['date']]
+    if dates:
+        lines.append(f"    <lastBuildDate>{rss_date(max(dates))}</lastBuildDate>")
+    lines += ['    <image>',
+              f"      <url>{SITE_URL}{RSS_CHANNEL['image']}</url>",
+              f"      <title>{e(RSS_CHANNEL['image_title'])}</title>",
+              f"      <link>{SITE_URL}/</link>",
+              '    </image>']
+    for _, url, post in items:
+        image = social_image(post, shared)
+        content = ''.join([
+            f'<img src="{e(SITE_URL + image)}" alt="{e(post["title"])}" />' if image else '',
+            f"<p>{e(post['description'])}</p>",
+            f'<p><a href="{e(url)}">Continue reading on the blog...</a></p>',
+        ]).replace(']]>', ']]&gt;')
+        lines += ['    <item>',
+                  f"      <title>{e(post['title'])}</title>",
+                  f"      <description>{e(post['description'])}</description>",
+                  f"      <content:encoded><![CDATA[{content}]]></content:encoded>",
+                  f"      <link>{e(url)}</link>",
+                  f'      <guid isPermaLink="true">{e(url)}</guid>']
+        if post['date']:
+            lines.append(f"      <pubDate>{rss_date(post['date'])}</pubDate>")
+        lines += [f"      <author>{AUTHOR_EMAIL} ({e(post['author'])})</author>",
+                  f"      <dc:creator>{e(post['author'])}</dc:creator>"]
+        lines += [f"      <category>{e(tag)}</category>" for tag in post['tags']]
+        lines.append('    </item>')
+    lines += ['  </channel>', '</rss>']
+    return '\n'.join(lines) + '\n'
+
+def search_data_json(pages):
+    """Format the posts as search-data.json, one field per line as before."""
+    blocks = []
+    for _, url, post in posts(pages):
+        fields = {
+            'title': post['title'],
+            'description': post['description'],
+            'url': PurePosixPath(url[len(SITE_URL):]).as_posix(),
+            'tags': post['tags'],
+            'date': post['date'],
+        }
+        body = ',\n'.join(f"    {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}"
+                          for key, value in fields.items())
+        blocks.append(f"  {{\n{body}\n  }}")
+    return "[\n" + ',\n'.join(blocks) + "\n]\n"
+
+def main():
+    """Rebuild the metadata index and regenerate sitemap.xml, rss.xml and search-data.json."""
+    parser = argparse.ArgumentParser(description="Regenerate the sitemap, RSS feed and search data from dist/")
+    parser.add_argument('--dist', type=Path, default=Path(__file__).parent / "dist",
+                        help="Directory containing the built site (default: dist/)")
+    args = parser.parse_args()
+    
+    if not args.dist.exists():
+        print(f"❌ Directory not found: {args.dist}")
+        return 1
+    
+    print("🗂  SITE METADATA")
+    print("=" * 60)
+    pages = build_site_metadata(args.dist)
+    for slug, image in sorted(image_mappings(pages).items()):
+        print(f"  🐦 {slug}: {image}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,33 @@
+import os
+
+from compress_assets import compress_file, remove_orphans
+
+CSS = 'body { color: red; }\n' * 100
+
+def test_sibling_removed_when_file_shrinks(tmp_path):
+    css = tmp_path / 'app.css'
+    css.write_text(CSS, encoding='utf-8')
+    assert compress_file(css, formats=('gz',))['gz'] is not None
+    assert (tmp_path / 'app.css.gz').exists()
+    
+    css.write_text('a{}', encoding='utf-8')
+    result = compress_file(css, formats=('gz',))
+    assert result['gz'] is None and result['removed'] == ['gz']
+    assert not (tmp_path / 'app.css.gz').exists()
+
+def test_outdated_sibling_of_unwritten_format_removed(tmp_path):
+    css = tmp_path / 'app.css'
+    css.write_text(CSS, encoding='utf-8')
+    (tmp_path / 'app.css.br').write_bytes(b'old')
+    os.utime(tmp_path / 'app.css.br', ns=(0, 0))
+    assert compress_file(css, formats=('gz',))['removed'] == ['br']
+    assert not (tmp_path / 'app.css.br').exists()
+
+def test_orphans_removed(tmp_path):
+    (tmp_path / 'gone.js.gz').write_bytes(b'x')
+    (tmp_path / 'gone.html.br').write_bytes(b'x')
+    (tmp_path / 'kept.css').write_text(CSS, encoding='utf-8')
+    (tmp_path / 'kept.css.gz').write_bytes(b'x')
+    (tmp_path / 'release.tar.gz').write_bytes(b'x')
+    assert remove_orphans(tmp_path) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['kept.css', 'kept.css.gz', 'release.tar.gz']
@@ -0,0 +1,55 @@
+from fingerprint_assets import fingerprint_assets, fingerprint_references, load_fingerprints
+
+PAGE = '<html><head></head><body><img src="/images/hero.png"></body></html>'
+ASTRO_JS = 'fetch("/images/hero.png")'
+
+def build_site(dist):
+    (dist / 'images').mkdir(parents=True)
+    (dist / '_astro').mkdir()
+    (dist / 'images' / 'hero.png').write_bytes(b'first')
+    (dist / '_astro' / 'app.js').write_text(ASTRO_JS, encoding='utf-8')
+    (dist / 'index.html').write_text(PAGE, encoding='utf-8')
+
+def process(dist):
+    """Run the fingerprint prepare step and rewrite the page, like the engine does."""
+    assets = fingerprint_assets(dist)
+    page = dist / 'index.html'
+    page.write_text(fingerprint_references(page.read_text(encoding='utf-8'),
+                                           load_fingerprints(str(dist))), encoding='utf-8')
+    return assets['/images/hero.png']
+
+def test_changed_asset_rerun_repoints_pages(tmp_path):
+    build_site(tmp_path)
+    first = process(tmp_path)
+    assert first in (tmp_path / 'index.html').read_text(encoding='utf-8')
+    
+    (tmp_path / 'images' / 'hero.png').write_bytes(b'second')
+    second = process(tmp_path)
+    assert second != first
+    page = (tmp_path / 'index.html').read_text(encoding='utf-8')
+    assert second in page and first not in page
+    # The previous copy stays for HTML cached from the last deploy
+    assert (tmp_path / first.lstrip('/')).exists()
+    assert (tmp_path / second.lstrip('/')).exists()
+    
+    (tmp_path / 'images' / 'hero.png').write_bytes(b'third')
+    third = process(tmp_path)
+    assert not (tmp_path / first.lstrip('/')).exists()
+    assert (tmp_path / second.lstrip('/')).exists()
+    assert third in (tmp_path / 'index.html').read_text(encoding='utf-8')
+
+def test_astro_files_are_not_rewritten(tmp_path):
+    build_site(tmp_path)
+    process(tmp_path)
+    assert (tmp_path / '_astro' / 'app.js').read_text(encoding='utf-8') == ASTRO_JS
+
+def test_fixers_accept_fingerprinted_links():
+    from fix_twitter_images import IMAGE_PREFIX, fix_twitter_image_content
+    from optimal_favicon_setup import OPTIMAL_FAVICON_TAGS, apply_favicon_setup
+    
+    links = ''.join(tag.replace('.png"', '.1a2b3c4d.png"') for tag in OPTIMAL_FAVICON_TAGS)
+    page = (f'<html><head>{links}'
+            f'<meta name="twitter:image" content="{IMAGE_PREFIX}post.5e6f7a8b.jpg"></head></html>')
+    assert apply_favicon_setup(page) == page
+    assert fix_twitter_image_content(page, 'post.jpg') == page
+    assert 'post-hero.jpg' in fix_twitter_image_content(page, 'post-hero.jpg')
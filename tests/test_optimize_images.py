@@ -0,0 +1,23 @@
+from optimize_images import responsive_pictures
+
+IMAGES = {'images/hero.jpg': {'variants': {
+    'webp': [(400, '/images/responsive/hero-400.webp'), (800, '/images/responsive/hero-800.webp')],
+    'jpeg': [(400, '/images/responsive/hero-400.jpg'), (800, '/images/responsive/hero-800.jpg')],
+}}}
+
+def picture(*tags):
+    return '<div class="post-image"><picture>\n' + ''.join(f'    {tag}\n' for tag in tags) + '</picture></div>'
+
+def test_hashed_src_uses_source_variants():
+    html = responsive_pictures(picture('<img src="/images/hero.1a2b3c4d.jpg" alt="">'), IMAGES)
+    assert 'srcset="/images/responsive/hero-400.webp 400w' in html
+    assert 'src="/images/hero.1a2b3c4d.jpg"' in html
+
+def test_authored_sources_are_kept():
+    art = '<source media="(max-width: 600px)" srcset="/images/hero-crop.jpg">'
+    png = '<source type="image/png" srcset="/images/hero.png">'
+    html = responsive_pictures(picture(art, png, '<img src="/images/hero.jpg" alt="">'), IMAGES)
+    assert html.index(art) < html.index('image/webp') < html.index(png) < html.index('<img')
+    # A second run replaces its own sources and keeps the author's
+    again = responsive_pictures(html, IMAGES)
+    assert again == html
@@ -0,0 +1,9 @@
+from page_manifest import load_json_cache, save_json_cache
+
+def test_json_cache_round_trip_and_version(tmp_path):
+    path = tmp_path / 'cache.json'
+    assert load_json_cache(path, 1, 'images') == {}
+    assert save_json_cache(path, 1, 'images', {'b.jpg': {'width': 2}, 'a.jpg': {'width': 1}})
+    assert not save_json_cache(path, 1, 'images', {'a.jpg': {'width': 1}, 'b.jpg': {'width': 2}})
+    assert list(load_json_cache(path, 1, 'images')) == ['a.jpg', 'b.jpg']
+    assert load_json_cache(path, 2, 'images') == {}
@@ -0,0 +1,19 @@
+import os
+
+from page_stream import remove_stale_temps, temp_path, write_page
+
+def test_temp_files_are_dotfiles(tmp_path):
+    page = tmp_path / 'index.html'
+    assert os.path.basename(temp_path(page)).startswith('.index.html.')
+    write_page(page, '<html></html>')
+    assert [p.name for p in tmp_path.iterdir()] == ['index.html']
+
+def test_only_stale_temps_are_removed(tmp_path):
+    (tmp_path / 'blog').mkdir()
+    old = tmp_path / 'blog' / 'index.html.4242.tmp'
+    recent = tmp_path / '.index.html.4343.tmp'
+    for path in (old, recent):
+        path.write_text('partial', encoding='utf-8')
+    os.utime(old, (0, 0))
+    assert remove_stale_temps(tmp_path) == 1
+    assert not old.exists() and recent.exists()
@@ -0,0 +1,37 @@
+from prune_css import analyze
+
+PAGE = ('<html><head><link rel="stylesheet" href="/_astro/app.css"></head>'
+        '<body><div class="card">x</div><ul id="list"></ul>'
+        '<script type="application/ld+json">{"name": "ld-only"}</script>'
+        '<script>document.body.classList.add(\'menu-open\')</script>'
+        '<script src="share.js"></script></body></html>')
+CSS = ('.card{color:red}.unused{color:blue}.js-row{color:green}#js-empty{display:none}.from-file{margin:0}'
+       '.menu-open{overflow:hidden}.share-copied{color:green}.ld-only{color:red}')
+SHARE = 'button.className = "share-copied"'
+SCRIPT = 'document.getElementById("list").innerHTML=`<li class="js-row">${x}</li>`;show("js-empty")'
+
+def build_site(dist):
+    (dist / '_astro').mkdir(parents=True)
+    (dist / '_astro' / 'app.css').write_text(CSS, encoding='utf-8')
+    (dist / '_astro' / 'app.js').write_text(SCRIPT, encoding='utf-8')
+    (dist / 'about').mkdir()
+    (dist / 'about' / 'index.html').write_text(PAGE, encoding='utf-8')
+    (dist / 'about' / 'share.js').write_text(SHARE, encoding='utf-8')
+
+def test_classes_added_by_scripts_are_kept(tmp_path):
+    build_site(tmp_path)
+    report, mapping = analyze(tmp_path)
+    dead = report['stylesheets']['/_astro/app.css']['dead_selectors']
+    assert '.unused' in dead and '.from-file' in dead and '.ld-only' in dead
+    assert '.js-row' not in dead and '#js-empty' not in dead
+    # Inline scripts and page-local script files count too
+    assert '.menu-open' not in dead and '.share-copied' not in dead
+    pruned = (tmp_path / mapping[('page', '/_astro/app.css')].lstrip('/')).read_text(encoding='utf-8')
+    assert '.js-row' in pruned and '.card' in pruned and '.unused' not in pruned
+
+def test_safelist_file(tmp_path):
+    build_site(tmp_path)
+    safelist = tmp_path / 'safelist.txt'
+    safelist.write_text('from-file\n', encoding='utf-8')
+    report, _ = analyze(tmp_path, safelist)
+    assert report['stylesheets']['/_astro/app.css']['dead_selectors'] == ['.unused', '.ld-only']
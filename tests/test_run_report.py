@@ -0,0 +1,36 @@
+import json
+
+from html_tree import parse_html
+from postprocess import Transform, apply_transforms
+from run_report import RunReport, warn
+
+def fallback(content, page, dist_dir):
+    warn("left unchanged")
+    return content
+
+def test_warnings_are_recorded_per_page(tmp_path):
+    transform = Transform('fallback', fallback, ('*.html',), 1)
+    stats = {}
+    content, applied = apply_transforms('<p>x</p>', 'index.html', tmp_path, [transform], stats)
+    assert (content, applied) == ('<p>x</p>', [])
+    
+    report = RunReport([transform], tmp_path / 'report.ndjson')
+    report.page('index.html', 'unchanged', stats)
+    report.close({})
+    records = [json.loads(line) for line in (tmp_path / 'report.ndjson').read_text().splitlines()]
+    page, totals = records[1], records[2]
+    assert page['transforms'][0]['warnings'] == ["left unchanged"]
+    assert (totals['misses'], totals['warnings']) == (1, 1)
+
+def find_links(content, page, dist_dir):
+    parse_html(content).select('a')
+    return content
+
+def test_selector_matches_are_counted(tmp_path):
+    transform = Transform('links', find_links)
+    stats = {}
+    apply_transforms('<a href="/">x</a><a>y</a>', 'index.html', tmp_path, [transform], stats)
+    apply_transforms('<p>x</p>', 'about.html', tmp_path, [transform], stats)
+    report = RunReport([transform])
+    report.page('pages', 'unchanged', stats)
+    assert report.totals['links'].patterns == {'a': {'matches': 2, 'pages': 1, 'misses': 1}}
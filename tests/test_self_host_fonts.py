@@ -0,0 +1,20 @@
+from self_host_fonts import remove_stale_fonts, self_host_fonts
+
+FONTS = {'400': '/_astro/fonts/inter-400.1a2b3c4d.woff2'}
+
+def test_google_fonts_block_is_replaced_once():
+    page = ('<html><head>\n'
+            '    <link rel="preconnect" href="https://fonts.googleapis.com">\n'
+            '    <noscript><link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Inter"></noscript>\n'
+            '    <title>x</title>\n'
+            '</head></html>')
+    html = self_host_fonts(page, FONTS)
+    assert 'fonts.googleapis.com' not in html and '<noscript>' not in html
+    assert html.startswith('<html><head>\n    <link rel="preload" href="/_astro/fonts/inter-400.1a2b3c4d.woff2"')
+    assert self_host_fonts(html, FONTS) == html
+
+def test_stale_fonts_are_removed(tmp_path):
+    for name in ('inter-400.1a2b3c4d.woff2', 'inter-400.00000000.woff2', 'fonts.json'):
+        (tmp_path / name).write_bytes(b'')
+    assert remove_stale_fonts(tmp_path, FONTS) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['fonts.json', 'inter-400.1a2b3c4d.woff2']
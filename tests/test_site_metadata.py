@@ -0,0 +1,28 @@
+from site_metadata import build_site_metadata, sitemap_key
+
+PAGE = '<html><head><title>About</title></head><body><p>About us</p></body></html>'
+OLD_SITEMAP = '''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url>
+    <loc>https://blog.promptmakers.app/about</loc>
+    <changefreq>yearly</changefreq>
+    <priority>0.3</priority>
+  </url>
+</urlset>
+'''
+
+def test_sitemap_key_ignores_url_spelling():
+    keys = {sitemap_key(f"https://blog.promptmakers.app/about{s}") for s in ('', '/', '/index.html', '.html')}
+    assert keys == {'https://blog.promptmakers.app/about'}
+
+def test_undated_page_keeps_old_sitemap_entry_without_lastmod(tmp_path):
+    (tmp_path / 'about').mkdir()
+    (tmp_path / 'about' / 'index.html').write_text(PAGE, encoding='utf-8')
+    (tmp_path / 'sitemap.xml').write_text(OLD_SITEMAP, encoding='utf-8')
+    
+    entry = build_site_metadata(tmp_path)['about/index.html']
+    assert (entry['changefreq'], entry['priority']) == ('yearly', '0.3')
+    # Not a post and not in git: no date to go by, so no lastmod rather than the clock
+    assert entry['lastmod'] is None
+    sitemap = (tmp_path / 'sitemap.xml').read_text(encoding='utf-8')
+    assert '<priority>0.3</priority>' in sitemap and '<lastmod>' not in sitemap
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import re
 from pathlib import Path
 
+from page_stream import write_page
+from parallel_pages import add_jobs_argument, run_pages
+
 def update_favicon_in_file(file_path):
     """Update favicon declarations in an HTML file."""
     try:
@@ -35,8 +39,7 @@ def update_favicon_in_file(file_path):
                 replacement = new_favicon_spaced if i == 0 else new_favicon_minified
                 updated_content = re.sub(pattern, replacement, content)
                 
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(updated_content)
+                write_page(file_path, updated_content)
                 print(f"✅ Updated favicon in: {file_path}")
                 updated = True
                 break
@@ -52,6 +55,10 @@ def update_favicon_in_file(file_path):
 
 def main():
     """Update favicon declarations in all HTML files."""
+    parser = argparse.ArgumentParser(description="Update favicon declarations in all HTML files")
+    add_jobs_argument(parser)
+    args = parser.parse_args()
+    
     dist_dir = Path("c:/Users/Yahya/Downloads/promptmakers-blog-dist/dist")
     
     if not dist_dir.exists():
@@ -59,14 +66,14 @@ def main():
         return
     
     # Find all HTML files
-    html_files = list(dist_dir.rglob("*.html"))
+    html_files = sorted(dist_dir.rglob("*.html"))
     
     print(f"🔍 Found {len(html_files)} HTML files")
     print("=" * 50)
     
     updated_count = 0
-    for html_file in html_files:
-        if update_favicon_in_file(html_file):
+    for page in run_pages(update_favicon_in_file, html_files, args.jobs):
+        if page.result:
             updated_count += 1
     
     print("=" * 50)